@@ -0,0 +1,124 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "rich",
+# ]
+# ///
+"""
+Build the upload bundle of the dist folder, or extract packages from a bundle:
+
+    build_bundle.py
+    build_bundle.py --extract dist-bundle.tar dist/ [package ...]
+"""
+
+import os
+import sys
+
+from rich.console import Console
+
+from common.bundle import (
+    BUNDLE_FILE_NAME,
+    DEFAULT_COMPRESSION_LEVEL,
+    BundleError,
+    BundleMember,
+    extract_member,
+    index_path,
+    read_index,
+    write_bundle,
+)
+from common.github_output import write_github_output
+
+console = Console(width=400, color_system="standard")
+
+
+def report_members(members: list[BundleMember]):
+    """
+    Print the stored size of every member of the bundle and the totals
+    """
+    for member in members:
+        console.print(
+            f"[blue]Bundled {member.name}: {member.original_size} bytes stored as "
+            f"{member.size} bytes ({member.compression})[/]"
+        )
+    console.print(
+        f"[blue]Bundled {len(members)} files, {sum(member.original_size for member in members)} bytes "
+        f"stored as {sum(member.size for member in members)} bytes[/]"
+    )
+
+
+def extract(bundle_path: str, target_dir: str, names: list[str]):
+    """
+    Extract the packages from the bundle, all the packages when no name is given
+
+    :param bundle_path: path of the bundle
+    :param target_dir: directory the packages are extracted to
+    :param names: names of the packages to extract
+    :return: None
+    """
+    members = read_index(bundle_path)
+    missing = [name for name in names if name not in members]
+    if missing:
+        console.print(f"[red]Error: packages missing from the bundle {missing}[/]")
+        sys.exit(1)
+
+    for name in names or list(members):
+        path = extract_member(bundle_path, members[name], target_dir)
+        console.print(f"[blue]Extracted {path}[/]")
+
+
+if __name__ == "__main__":
+    if "--extract" in sys.argv:
+        arguments = sys.argv[sys.argv.index("--extract") + 1 :]
+        if len(arguments) < 2:
+            console.print(
+                "[red]Error: --extract needs the path of the bundle and the target directory[/]"
+            )
+            sys.exit(1)
+        try:
+            extract(arguments[0], arguments[1], arguments[2:])
+        except (BundleError, OSError, ValueError) as e:
+            console.print(f"[red]Error: {e}[/]")
+            sys.exit(1)
+        sys.exit(0)
+
+    dist_path = os.environ.get("DIST_PATH")
+    bundle_dir = os.environ.get("BUNDLE_DIR")
+    if not dist_path or not bundle_dir:
+        console.print(
+            "[red]Error: DIST_PATH and BUNDLE_DIR not set[/]\n"
+            "You must set `DIST_PATH` and `BUNDLE_DIR` environment variables to run this script"
+        )
+        sys.exit(1)
+
+    with os.scandir(dist_path) as entries:
+        packages = sorted(entry.path for entry in entries if entry.is_file())
+    if not packages:
+        console.print(f"[red]No packages found to bundle in {dist_path}[/]")
+        sys.exit(1)
+
+    bundle_path = os.path.join(bundle_dir, BUNDLE_FILE_NAME)
+    members = write_bundle(
+        packages,
+        bundle_path,
+        level=int(os.environ.get("BUNDLE_COMPRESSION_LEVEL") or DEFAULT_COMPRESSION_LEVEL),
+    )
+    report_members(members)
+    write_github_output(bundle_path=bundle_path, bundle_index_path=index_path(bundle_path))
+    console.print(f"[blue]Bundle written to {bundle_path}[/]")
@@ -19,19 +19,34 @@
 # requires-python = ">=3.11"
 # dependencies = [
 #     "rich",
+#     "packaging",
+#     "requests",
 # ]
 # ///
 
 import json
 import os
 import re
-import subprocess
 import sys
+from collections import Counter
 from functools import cached_property
 from typing import Any
 
 from rich.console import Console
 
+from common.artifact_index import ArtifactIndex
+from common.github_output import write_github_output
+from common.manifest import load_manifest
+from common.package_index import (
+    CACHE_FILE_NAME as INDEX_CACHE_FILE_NAME,
+    DEFAULT_INDEX_URL,
+    DEFAULT_WORKERS as INDEX_WORKERS,
+    published_diff,
+)
+from common.package_metadata import CACHE_FILE_NAME, metadata_mismatches
+from common.staging import DEFAULT_WORKERS, StagedFile, stage_files
+from common.verification_cache import VerificationCache, cache_dir, cache_disabled
+
 console = Console(width=400, color_system="standard")
 
 # We always work on the path provided in the release config eg: below publisher.path is providers/ so
@@ -49,16 +64,25 @@ class PublishPackagesFinder:
     def artifacts_config(self):
         return json.loads(os.environ.get("ARTIFACTS_CONFIG", "{}"))
 
+    @cached_property
+    def artifact_index(self) -> ArtifactIndex:
+        """
+        Index of the files in the current directory, built from a single scan of the directory.
+        The runner sets the index of the release directory it checked out.
+        :return:
+        """
+        return ArtifactIndex.from_directory()
+
     @cached_property
     def dev_svn_files(self):
         """
         Get the list of files in the current directory
         :return:
         """
-        files = [file for file in os.listdir() if os.path.isfile(file)]
+        files = self.artifact_index.files
 
         if not files:
-            console.print(f"[red]No packages found in the {os.getcwd()}[/]")
+            console.print(f"[red]No packages found in the {os.path.abspath(self.artifact_index.directory)}[/]")
             sys.exit(1)
         return files
 
@@ -77,6 +101,124 @@ class PublishPackagesFinder:
             os.makedirs(dist_path)
         return dist_path
 
+    @cached_property
+    def verified_manifest(self) -> dict[str, dict[str, Any]]:
+        """
+        Artifacts verified by the checksum step with their size and digests, by name.
+        Empty when VERIFIED_MANIFEST is not set.
+        :return:
+        """
+        manifest_path = os.environ.get("VERIFIED_MANIFEST")
+        if not manifest_path:
+            return {}
+        return load_manifest(manifest_path)
+
+    def verified_entry(self, package: str) -> dict[str, Any] | None:
+        """
+        Manifest entry of the package, None when the package is not in the manifest or its size
+        changed since it was verified
+
+        :param package: name of the package in the index
+        :return:
+        """
+        entry = self.verified_manifest.get(os.path.basename(package))
+        if entry is None or os.stat(self.artifact_index.path(package)).st_size != entry["size"]:
+            return None
+        return entry
+
+    def trusted_digest(self, package: str, algorithm: str) -> str | None:
+        """
+        Digest of the package verified by the checksum step, so the package does not have to be
+        read again to get it
+
+        :param package: name of the package in the index
+        :param algorithm: algorithm of the digest eg: sha512
+        :return: hex digest or None when the package or the algorithm is not in the manifest
+        """
+        entry = self.verified_entry(package)
+        return entry["digests"].get(algorithm) if entry else None
+
+    def unverified_packages(self, packages: list[str]) -> list[str]:
+        """
+        Packages missing from the verified manifest or changed since they were verified
+
+        :param packages: names of the packages in the index
+        :return:
+        """
+        return [package for package in packages if self.verified_entry(package) is None]
+
+    def package_metadata_errors(self, packages: list[str]) -> list[str]:
+        """
+        Check that the wheels and sdists contain the name and the version of their file names,
+        the metadata is cached by the digest of the verified manifest when the package is in it
+
+        :param packages: names of the packages in the index
+        :return: the mismatches and the packages whose metadata cannot be read
+        """
+        cache = None
+        if not cache_disabled(sys.argv):
+            cache = VerificationCache(os.path.join(cache_dir(), CACHE_FILE_NAME))
+
+        path = self.artifact_index.path
+        errors = metadata_mismatches(
+            [path(package) for package in packages],
+            workers=self.artifacts_config.get("metadata_workers"),
+            cache=cache,
+            digests={
+                path(package): digest
+                for package in packages
+                if (digest := self.trusted_digest(package, "sha512"))
+            },
+        )
+        if cache is not None:
+            cache.save()
+        return errors
+
+    def unpublished_packages(self, packages: list[str]) -> list[str]:
+        """
+        Drop the packages already published to the index with the same sha256, eg: when a partially
+        failed release is run again. A package published with another sha256 fails the step,
+        the index would reject its upload. A package published without a sha256 can not be
+        compared, it is dropped with a warning.
+
+        :param packages: names of the packages in the index
+        :return: the packages not published yet
+        """
+        cache = None
+        if not cache_disabled(sys.argv):
+            cache = VerificationCache(os.path.join(cache_dir(), INDEX_CACHE_FILE_NAME))
+
+        index_url = self.artifacts_config.get("index_url") or DEFAULT_INDEX_URL
+        path = self.artifact_index.path
+        diff = published_diff(
+            [path(package) for package in packages],
+            index_url=index_url,
+            workers=self.artifacts_config.get("index_workers") or INDEX_WORKERS,
+            cache=cache,
+            digests={
+                path(package): digest
+                for package in packages
+                if (digest := self.trusted_digest(package, "sha256"))
+            },
+        )
+        if cache is not None:
+            cache.save()
+
+        if diff.conflicts:
+            console.print(
+                f"[red]Packages already published to {index_url} with another sha256: {diff.conflicts}[/]"
+            )
+            sys.exit(1)
+        for package in diff.published:
+            console.print(f"[blue]Skipping {package}, already published to {index_url}[/]")
+        for package in diff.without_sha256:
+            console.print(
+                f"[yellow]Warning: Skipping {package}, already published to {index_url} without a sha256 "
+                "to compare with[/]"
+            )
+        skipped = set(diff.published) | set(diff.without_sha256)
+        return [package for package in packages if path(package) not in skipped]
+
     @cached_property
     def exclude_config(self):
         return self.artifacts_config.get("exclude")
@@ -110,7 +252,8 @@ class PublishPackagesFinder:
 
     def move_packages_to_dist_folder(self, packages_path: str):
         """
-        Move the packages to dist folder
+        Stage the packages to the dist folder, in VERIFY mode the packages are linked or copied and the
+        checked out packages are left untouched
 
         :param packages_path: location of the packages, where the packages are checked out
         :return:
@@ -120,9 +263,34 @@ class PublishPackagesFinder:
             console.print("[red]No packages found to move[/]")
             sys.exit(1)
 
-        for package_name in self.final_packages_to_publish:
-            full_path = os.path.join(packages_path, package_name)
-            subprocess.run(["mv", full_path, self.dist_path], check=True)
+        staged_files = stage_files(
+            [
+                os.path.join(packages_path, package_name)
+                for package_name in self.final_packages_to_publish
+            ],
+            self.dist_path,
+            move=os.environ.get("MODE", "VERIFY") != "VERIFY",
+            workers=self.artifacts_config.get("staging_workers") or DEFAULT_WORKERS,
+        )
+        self.report_staged_files(staged_files)
+
+    @staticmethod
+    def report_staged_files(staged_files: list[StagedFile]):
+        """
+        Print the strategy and the bytes of every staged file, and the totals
+        :param staged_files:
+        :return:
+        """
+        for staged_file in staged_files:
+            console.print(
+                f"[blue]Staged {staged_file.name} ({staged_file.size} bytes) with {staged_file.strategy}[/]"
+            )
+        strategies = Counter(staged_file.strategy for staged_file in staged_files)
+        console.print(
+            f"[blue]Staged {len(staged_files)} files, "
+            f"{sum(staged_file.size for staged_file in staged_files)} bytes: "
+            f"{', '.join(f'{count} {strategy}' for strategy, count in sorted(strategies.items()))}[/]"
+        )
 
     def run(self):
         try:
@@ -133,7 +301,43 @@ class PublishPackagesFinder:
                 self.dev_svn_files, self.exclude_config
             )
 
-            self.move_packages_to_dist_folder(os.getcwd())
+            if self.verified_manifest:
+                unverified_packages = self.unverified_packages(
+                    self.final_packages_to_publish
+                )
+                if unverified_packages:
+                    console.print(
+                        f"[red]Packages not verified by the checksum check: {unverified_packages}[/]"
+                    )
+                    sys.exit(1)
+
+            if self.artifacts_config.get("check_metadata"):
+                metadata_errors = self.package_metadata_errors(
+                    self.final_packages_to_publish
+                )
+                if metadata_errors:
+                    console.print("[red]Packages with metadata not matching their file names:[/]")
+                    for error in metadata_errors:
+                        console.print(f"[red]{error}[/]")
+                    sys.exit(1)
+                console.print("[blue]Metadata of the packages matches their file names[/]")
+
+            # Only a release uploads the packages, a dry run stages all of them
+            if (
+                self.artifacts_config.get("skip_published")
+                and os.environ.get("MODE", "VERIFY") == "RELEASE"
+            ):
+                self.final_packages_to_publish = self.unpublished_packages(
+                    self.final_packages_to_publish
+                )
+                if not self.final_packages_to_publish:
+                    console.print("[blue]All the packages are already published, nothing to stage[/]")
+                    # The workflow skips the upload and the publish steps
+                    write_github_output(nothing_to_publish="true")
+                    return
+
+            self.move_packages_to_dist_folder(self.artifact_index.directory)
+            write_github_output(nothing_to_publish="false")
 
             if os.environ.get("MODE", "VERIFY") == "VERIFY":
                 console.print(
@@ -15,14 +15,22 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import hashlib
+import io
 import json
 import os.path
+import tarfile
 import tempfile
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
 
 import pytest
 from pytest_unordered import unordered
 
 from artifacts.publish_packages_finder import PublishPackagesFinder
+from common.manifest import ManifestWriter
 
 
 def write_data(files, path):
@@ -33,6 +41,64 @@ def write_data(files, path):
             f.write("test")
 
 
+def write_package(path, name, version):
+    metadata = f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n\n".encode()
+    if path.endswith(".whl"):
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr(f"{name.replace('-', '_')}-{version}.dist-info/METADATA", metadata)
+        return
+    with tarfile.open(path, "w:gz") as archive:
+        info = tarfile.TarInfo(f"{name.replace('-', '_')}-{version}/PKG-INFO")
+        info.size = len(metadata)
+        archive.addfile(info, io.BytesIO(metadata))
+
+
+class SimpleIndexHandler(BaseHTTPRequestHandler):
+    """
+    JSON simple index with the published files of apache-airflow-providers-amazon
+    """
+
+    # Content of the published files, None for a file published without a sha256
+    published: dict[str, bytes | None] = {}
+
+    def do_GET(self):
+        if self.path != "/simple/apache-airflow-providers-amazon/":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = json.dumps(
+            {
+                "meta": {"api-version": "1.0"},
+                "name": "apache-airflow-providers-amazon",
+                "files": [
+                    {
+                        "filename": filename,
+                        "url": filename,
+                        "hashes": {"sha256": hashlib.sha256(content).hexdigest()} if content is not None else {},
+                    }
+                    for filename, content in SimpleIndexHandler.published.items()
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.pypi.simple.v1+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def index_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SimpleIndexHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/simple/"
+    server.shutdown()
+
+
 class TestPublishPackagesFinder:
     @pytest.mark.parametrize(
         "packages, exclude_config, expected",
@@ -216,3 +282,186 @@ class TestPublishPackagesFinder:
             publish_packages_finder.run()
             assert publish_packages_finder.final_packages_to_publish == unordered(expected)
             assert os.listdir(dist_folder.name) == unordered(expected)
+
+    def test_run_should_fail_for_packages_not_in_verified_manifest(self, monkeypatch):
+        packages = [
+            "apache_airflow_providers_amazon-9.1.0rc1.tar.gz",
+            "apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl",
+        ]
+        monkeypatch.setenv(
+            "ARTIFACTS_CONFIG",
+            json.dumps({"id": "artifact", "description": "Find publish packages to PyPI", "exclude": []}),
+        )
+        dist_folder = tempfile.TemporaryDirectory()
+        monkeypatch.setenv("DIST_PATH", dist_folder.name)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_data(packages, temp_dir)
+            with ManifestWriter(os.path.join(temp_dir, "manifest")) as manifest:
+                manifest.add(packages[0], 4, {"sha512": "a" * 128})
+            monkeypatch.setenv("VERIFIED_MANIFEST", manifest.path)
+            os.chdir(temp_dir)
+            with pytest.raises(SystemExit):
+                PublishPackagesFinder().run()
+            assert os.listdir(dist_folder.name) == []
+
+    @pytest.mark.parametrize("sdist_version, passes", [("9.1.0rc1", True), ("9.1.0", False)])
+    def test_run_should_check_metadata(self, monkeypatch, sdist_version, passes):
+        monkeypatch.setenv(
+            "ARTIFACTS_CONFIG",
+            json.dumps(
+                {"id": "artifact", "description": "Find publish packages to PyPI", "exclude": [], "check_metadata": True}
+            ),
+        )
+        dist_folder = tempfile.TemporaryDirectory()
+        monkeypatch.setenv("DIST_PATH", dist_folder.name)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            monkeypatch.setenv("GH_PUB_CACHE_DIR", os.path.join(temp_dir, "cache"))
+            packages_dir = os.path.join(temp_dir, "packages")
+            os.makedirs(packages_dir)
+            write_package(
+                os.path.join(packages_dir, "apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl"),
+                "apache-airflow-providers-amazon",
+                "9.1.0rc1",
+            )
+            write_package(
+                os.path.join(packages_dir, "apache_airflow_providers_amazon-9.1.0rc1.tar.gz"),
+                "apache-airflow-providers-amazon",
+                sdist_version,
+            )
+            os.chdir(packages_dir)
+            if passes:
+                PublishPackagesFinder().run()
+                assert len(os.listdir(dist_folder.name)) == 2
+            else:
+                with pytest.raises(SystemExit):
+                    PublishPackagesFinder().run()
+                assert os.listdir(dist_folder.name) == []
+
+    @pytest.mark.parametrize(
+        "published, expected",
+        [
+            ({}, ["apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl", "apache_airflow_providers_amazon-9.1.0rc1.tar.gz"]),
+            (
+                {"apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl": b"test"},
+                ["apache_airflow_providers_amazon-9.1.0rc1.tar.gz"],
+            ),
+            (
+                {
+                    "apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl": b"test",
+                    "apache_airflow_providers_amazon-9.1.0rc1.tar.gz": b"test",
+                },
+                [],
+            ),
+            # Published with another sha256
+            ({"apache_airflow_providers_amazon-9.1.0rc1.tar.gz": b"other"}, None),
+            # Published without a sha256
+            (
+                {"apache_airflow_providers_amazon-9.1.0rc1.tar.gz": None},
+                ["apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl"],
+            ),
+        ],
+    )
+    def test_run_should_skip_published_packages(self, monkeypatch, index_url, published, expected):
+        SimpleIndexHandler.published = published
+        monkeypatch.setenv(
+            "ARTIFACTS_CONFIG",
+            json.dumps(
+                {
+                    "id": "artifact",
+                    "description": "Find publish packages to PyPI",
+                    "exclude": [{"type": "regex", "pattern": r".*(.asc)$"}],
+                    "skip_published": True,
+                    "index_url": index_url,
+                }
+            ),
+        )
+        monkeypatch.setenv("MODE", "RELEASE")
+        dist_folder = tempfile.TemporaryDirectory()
+        monkeypatch.setenv("DIST_PATH", dist_folder.name)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            monkeypatch.setenv("GH_PUB_CACHE_DIR", os.path.join(temp_dir, "cache"))
+            github_output = os.path.join(temp_dir, "github_output")
+            monkeypatch.setenv("GITHUB_OUTPUT", github_output)
+            packages_dir = os.path.join(temp_dir, "packages")
+            write_data(
+                [
+                    "apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl",
+                    "apache_airflow_providers_amazon-9.1.0rc1.tar.gz",
+                    "apache_airflow_providers_amazon-9.1.0rc1.tar.gz.asc",
+                ],
+                packages_dir,
+            )
+            os.chdir(packages_dir)
+            if expected is None:
+                with pytest.raises(SystemExit):
+                    PublishPackagesFinder().run()
+                assert os.listdir(dist_folder.name) == []
+            else:
+                PublishPackagesFinder().run()
+                assert os.listdir(dist_folder.name) == unordered(expected)
+                with open(github_output) as output:
+                    assert output.read() == f"nothing-to-publish={str(not expected).lower()}\n"
+
+    def test_run_should_not_skip_published_packages_in_verify_mode(self, monkeypatch, index_url):
+        SimpleIndexHandler.published = {"apache_airflow_providers_amazon-9.1.0rc1.tar.gz": b"other"}
+        monkeypatch.setenv(
+            "ARTIFACTS_CONFIG",
+            json.dumps(
+                {
+                    "id": "artifact",
+                    "description": "Find publish packages to PyPI",
+                    "exclude": [],
+                    "skip_published": True,
+                    "index_url": index_url,
+                }
+            ),
+        )
+        monkeypatch.setenv("MODE", "VERIFY")
+        dist_folder = tempfile.TemporaryDirectory()
+        monkeypatch.setenv("DIST_PATH", dist_folder.name)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            monkeypatch.setenv("GH_PUB_CACHE_DIR", os.path.join(temp_dir, "cache"))
+            write_data(["apache_airflow_providers_amazon-9.1.0rc1.tar.gz"], temp_dir)
+            os.chdir(temp_dir)
+            with patch("artifacts.publish_packages_finder.published_diff") as published_diff:
+                PublishPackagesFinder().run()
+            published_diff.assert_not_called()
+            assert os.listdir(dist_folder.name) == ["apache_airflow_providers_amazon-9.1.0rc1.tar.gz"]
+
+    def test_trusted_digest(self, monkeypatch):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_data(["package-1.0.0.tar.gz", "package-2.0.0.tar.gz"], temp_dir)
+            with ManifestWriter(os.path.join(temp_dir, "manifest")) as manifest:
+                manifest.add("package-1.0.0.tar.gz", 4, {"sha512": "a" * 128})
+                manifest.add("package-2.0.0.tar.gz", 5, {"sha512": "b" * 128})
+            monkeypatch.setenv("VERIFIED_MANIFEST", manifest.path)
+            os.chdir(temp_dir)
+
+            publish_packages_finder = PublishPackagesFinder()
+            assert publish_packages_finder.trusted_digest("package-1.0.0.tar.gz", "sha512") == "a" * 128
+            assert publish_packages_finder.trusted_digest("package-1.0.0.tar.gz", "sha256") is None
+            # The size changed since the package was verified
+            assert publish_packages_finder.trusted_digest("package-2.0.0.tar.gz", "sha512") is None
+            assert publish_packages_finder.unverified_packages(
+                ["package-1.0.0.tar.gz", "package-2.0.0.tar.gz"]
+            ) == ["package-2.0.0.tar.gz"]
+
+    @pytest.mark.parametrize(
+        "mode, left_in_svn",
+        [pytest.param("VERIFY", True, id="verify"), pytest.param("RELEASE", False, id="release")],
+    )
+    def test_run_should_leave_svn_packages_in_verify_mode(self, monkeypatch, mode, left_in_svn):
+        packages = ["apache_airflow_providers_amazon-9.1.0rc1.tar.gz"]
+        monkeypatch.setenv(
+            "ARTIFACTS_CONFIG",
+            json.dumps({"id": "artifact", "description": "Find publish packages to PyPI", "exclude": []}),
+        )
+        monkeypatch.setenv("MODE", mode)
+        dist_folder = tempfile.TemporaryDirectory()
+        monkeypatch.setenv("DIST_PATH", dist_folder.name)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_data(packages, temp_dir)
+            os.chdir(temp_dir)
+            PublishPackagesFinder().run()
+            assert os.listdir(dist_folder.name) == packages
+            assert os.path.exists(os.path.join(temp_dir, packages[0])) == left_in_svn
@@ -0,0 +1,94 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark of the dist bundle against a single zlib compression of every package.
+
+The synthetic dist folder holds compressed packages (random data) with their text checksum and
+signature files, as the dist folder of a providers release. The zip deflate archive stands for
+the upload-artifact compression.
+
+Run from the root of the repository:
+
+    python -m benchmarks.bundle_compression --packages 100 --package-kb 2048
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import zipfile
+
+from common.bundle import DEFAULT_COMPRESSION_LEVEL, write_bundle
+
+
+def write_dist(directory: str, packages: int, package_kb: int) -> list[str]:
+    paths = []
+    for number in range(packages):
+        name = f"apache_airflow_providers_package{number}-1.0.0.tar.gz"
+        path = os.path.join(directory, name)
+        with open(path, "wb") as data_file:
+            data_file.write(b"\x1f\x8b")
+            data_file.write(os.urandom(package_kb * 1024))
+        with open(path + ".sha512", "w") as checksum_file:
+            checksum_file.write(f"{'0123456789abcdef' * 8}  {name}\n")
+        with open(path + ".asc", "w") as signature_file:
+            signature_file.write("-----BEGIN PGP SIGNATURE-----\n" + "A" * 64 * 10 + "\n")
+        paths += [path, path + ".sha512", path + ".asc"]
+    return sorted(paths)
+
+
+def zip_deflate(paths: list[str], archive_path: str, level: int):
+    with zipfile.ZipFile(
+        archive_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=level
+    ) as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--packages", type=int, default=100)
+    parser.add_argument("--package-kb", type=int, default=2048)
+    parser.add_argument("--level", type=int, default=DEFAULT_COMPRESSION_LEVEL)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--dir", default=None, help="Directory to create the files in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        dist = os.path.join(temp_dir, "dist")
+        os.makedirs(dist)
+        paths = write_dist(dist, args.packages, args.package_kb)
+        total = sum(os.path.getsize(path) for path in paths)
+
+        start = time.perf_counter()
+        archive_path = os.path.join(temp_dir, "dist.zip")
+        zip_deflate(paths, archive_path, args.level)
+        zip_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bundle_path = os.path.join(temp_dir, "bundle", "dist-bundle.tar")
+        write_bundle(paths, bundle_path, args.level, args.workers)
+        bundle_time = time.perf_counter() - start
+
+        print(f"{len(paths)} files, {total / 2**20:.1f}MB")
+        print(f"zip deflate: {zip_time:.2f}s, {os.path.getsize(archive_path) / 2**20:.1f}MB")
+        print(f"bundle:      {bundle_time:.2f}s, {os.path.getsize(bundle_path) / 2**20:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark the parallel checksum verification against the serial loop.
+
+Creates a synthetic tree of artifacts with their .sha512 files and measures the wall-clock
+time of the previous implementation, one hashlib.file_digest per file in a loop, which is the
+reference of the speedups, and of validate_checksum with one worker and with a pool of workers.
+
+Run from the root of the repository:
+
+    python -m benchmarks.checksum_parallel --total-mb 4096 --files 200
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from checksum.checksum_check import invalid_checksums, validate_checksum
+
+BLOCK_SIZE = 1024 * 1024
+
+
+def create_tree(path: str, total_mb: int, files: int) -> list[dict[str, str]]:
+    block = os.urandom(BLOCK_SIZE)
+    file_mb = max(total_mb // files, 1)
+    check_sum_files = []
+    for index in range(files):
+        check_file = os.path.join(path, f"apache_airflow_providers_{index}-1.0.0.tar.gz")
+        digest = hashlib.sha512()
+        with open(check_file, "wb") as data_file:
+            for _ in range(file_mb):
+                # Prefix every block with the file index so the files have different digests
+                chunk = index.to_bytes(8, "big") + block[8:]
+                data_file.write(chunk)
+                digest.update(chunk)
+        with open(check_file + ".sha512", "w") as sha_file:
+            sha_file.write(f"{digest.hexdigest()} {os.path.basename(check_file)}")
+        check_sum_files.append(
+            {"sha_file": check_file + ".sha512", "check_file": check_file}
+        )
+    return check_sum_files
+
+
+def baseline_validate_checksum(check_sum_files: list[dict[str, str]], algorithm: str) -> list[str]:
+    """
+    The previous implementation, the files are hashed one after the other
+    """
+    invalid = []
+    for file_dict in check_sum_files:
+        with open(file_dict["check_file"], "rb") as chk:
+            actual_sha = hashlib.file_digest(chk, algorithm).hexdigest()
+        with open(file_dict["sha_file"], "rb") as shf:
+            expected_sha = shf.read().decode("utf-8").strip().split()[0]
+        if actual_sha != expected_sha:
+            invalid.append(file_dict["sha_file"])
+    return invalid
+
+
+def timed_baseline(check_sum_files: list[dict[str, str]]) -> float:
+    start = time.perf_counter()
+    invalid = baseline_validate_checksum(check_sum_files, "sha512")
+    elapsed = time.perf_counter() - start
+    if invalid:
+        raise RuntimeError(f"Unexpected checksum failures: {invalid}")
+    return elapsed
+
+
+def timed(check_sum_files: list[dict[str, str]], workers: int, executor: str) -> float:
+    invalid_checksums.clear()
+    start = time.perf_counter()
+    validate_checksum(check_sum_files, "sha512", workers=workers, executor=executor)
+    elapsed = time.perf_counter() - start
+    if invalid_checksums:
+        raise RuntimeError(f"Unexpected checksum failures: {invalid_checksums}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--total-mb", type=int, default=4096)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--dir", default=None, help="Directory to create the tree in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        check_sum_files = create_tree(temp_dir, args.total_mb, args.files)
+        print(f"Created {args.files} files, {args.total_mb} MB in {temp_dir}")
+
+        # Warm up the page cache, so the baseline run is not penalised by a cold read
+        timed_baseline(check_sum_files)
+
+        baseline = timed_baseline(check_sum_files)
+        print(f"baseline file_digest  : {baseline:8.2f}s")
+        runs = [("thread", 1)] + [(executor, args.workers) for executor in ("thread", "process")]
+        for executor, workers in runs:
+            elapsed = timed(check_sum_files, workers, executor)
+            print(
+                f"{executor:7} x {workers:<3} workers : {elapsed:8.2f}s "
+                f"speedup {baseline / elapsed:5.2f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
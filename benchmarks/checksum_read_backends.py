@@ -0,0 +1,95 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Micro-benchmark of the checksum read backends across file sizes.
+
+Every backend hashes the same file a few times, the best time is reported. With --cold the
+file is evicted from the page cache (POSIX_FADV_DONTNEED) before every run.
+
+Run from the root of the repository:
+
+    python -m benchmarks.checksum_read_backends --sizes-kb 64 1024 16384 262144 --cold
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from checksum.checksum_check import (
+    DEFAULT_BUFFER_SIZE,
+    HAS_FADVISE,
+    READ_BACKENDS,
+    compute_digests,
+)
+
+
+def evict(file_path: str):
+    if not HAS_FADVISE:
+        return
+    with open(file_path, "rb") as data_file:
+        os.fsync(data_file.fileno())
+        os.posix_fadvise(data_file.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
+def best_time(
+    file_path: str, read_backend: str, buffer_size: int, repeat: int, cold: bool
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        if cold:
+            evict(file_path)
+        start = time.perf_counter()
+        compute_digests(
+            file_path, ["sha512"], read_backend=read_backend, buffer_size=buffer_size
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes-kb", type=int, nargs="+", default=[64, 1024, 16384, 262144])
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--cold", action="store_true", help="Evict the file before every run")
+    parser.add_argument("--dir", default=None, help="Directory to create the files in")
+    args = parser.parse_args()
+
+    print(f"{'size':>10} " + " ".join(f"{backend:>10}" for backend in READ_BACKENDS))
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        for size_kb in args.sizes_kb:
+            file_path = os.path.join(temp_dir, f"artifact-{size_kb}.tar.gz")
+            with open(file_path, "wb") as data_file:
+                block = os.urandom(1024)
+                for _ in range(size_kb):
+                    data_file.write(block)
+
+            timings = [
+                best_time(file_path, backend, args.buffer_size, args.repeat, args.cold)
+                for backend in READ_BACKENDS
+            ]
+            print(
+                f"{size_kb:>8}KB "
+                + " ".join(f"{timing * 1000:>8.2f}ms" for timing in timings)
+            )
+            os.remove(file_path)
+
+
+if __name__ == "__main__":
+    main()
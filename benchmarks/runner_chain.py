@@ -0,0 +1,233 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark the gh-pub runner against the chain of one script per action.
+
+Signs a synthetic release directory with a throwaway key, serves its KEYS file over http and
+measures the wall-clock time of a full verify run: the config parser, svn, checksum, signature
+and artifact scripts, one interpreter each as in the chain of actions, against the runner that
+runs all the stages in one interpreter. Every run starts from a fresh copy of the directory and
+with the caches disabled. The setup-python and uv steps of every action are not included, in
+GitHub Actions they add to the time of every action of the chain.
+
+Run from the root of the repository:
+
+    python -m benchmarks.runner_chain --files 200 --size-kb 1024
+"""
+
+import argparse
+import functools
+import hashlib
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import yaml
+
+from benchmarks.signature_parallel import create_tree
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def release_config(keys_url: str, method: str) -> dict:
+    return {
+        "project": {"name": "benchmark", "description": "Synthetic release"},
+        "publisher": {"name": "benchmark", "url": "https://example.com/", "path": "release/"},
+        "checks": {
+            "svn": [
+                {
+                    "id": "extension",
+                    "description": "Validate svn package extensions",
+                    "identifiers": [
+                        {"type": "regex", "pattern": ".*(tar.gz|tar.gz.asc|tar.gz.sha512)$"}
+                    ],
+                },
+                {
+                    "id": "package_name",
+                    "description": "Validate svn package names",
+                    "identifiers": [
+                        {"type": "regex", "pattern": ".*(apache_airflow_providers.*)$"}
+                    ],
+                },
+            ],
+            "checksum": [
+                {"id": "checksum", "description": "Validate check sum", "algorithm": "sha512"}
+            ],
+            "signature": [
+                {
+                    "id": "signature",
+                    "description": "Validate signatures",
+                    "method": method,
+                    "keys": keys_url,
+                }
+            ],
+            "artifact": {
+                "id": "artifact",
+                "description": "Find artifacts to publish",
+                "exclude": [{"type": "regex", "pattern": ".*(.asc|.sha512)$"}],
+            },
+        },
+    }
+
+
+def create_release(path: str, files: int, size_kb: int) -> str:
+    """
+    Create the signed release directory with its checksum files, the KEYS file is left in path
+    """
+    source = os.path.join(path, "source")
+    os.makedirs(source)
+    create_tree(source, files, size_kb)
+    shutil.move(os.path.join(source, "KEYS"), os.path.join(path, "KEYS"))
+    shutil.rmtree(os.path.join(source, "signing-home"))
+    for name in os.listdir(source):
+        if name.endswith(".tar.gz"):
+            with open(os.path.join(source, name), "rb") as f:
+                digest = hashlib.file_digest(f, "sha512").hexdigest()
+            with open(os.path.join(source, f"{name}.sha512"), "w") as f:
+                f.write(f"{digest}  {name}\n")
+    return source
+
+
+def run_script(script: str, env: dict[str, str], cwd: str, *args: str):
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, script), *args],
+        env=env,
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+
+def run_chain(config: dict, config_path: str, env: dict[str, str], cwd: str):
+    checks = config["checks"]
+    run_script(
+        "read-config/config_parser.py",
+        {**env, "RELEASE_CONFIG_FILE": config_path},
+        cwd,
+    )
+    run_script("svn/svn_check.py", {**env, "SVN_CHECK_CONFIG": json.dumps(checks["svn"])}, cwd)
+    run_script(
+        "checksum/checksum_check.py",
+        {
+            **env,
+            "CHECK_SUM_CONFIG": json.dumps(checks["checksum"]),
+            "SIGNATURE_CHECK_CONFIG": json.dumps(checks["signature"]),
+        },
+        cwd,
+    )
+    manifest = os.path.join(env["MANIFEST_DIR"], "verified-manifest.json")
+    run_script(
+        "signature/signature_check.py",
+        {
+            **env,
+            "SIGNATURE_CHECK_CONFIG": json.dumps(checks["signature"]),
+            "VERIFIED_MANIFEST": manifest,
+        },
+        cwd,
+    )
+    run_script(
+        "artifacts/publish_packages_finder.py",
+        {**env, "ARTIFACTS_CONFIG": json.dumps(checks["artifact"]), "VERIFIED_MANIFEST": manifest},
+        cwd,
+    )
+
+
+def run_runner(config: dict, config_path: str, env: dict[str, str], cwd: str):
+    run_script("runner/gh_pub.py", {**env, "RELEASE_CONFIG_FILE": config_path}, cwd)
+
+
+def timed(run, config: dict, config_path: str, env: dict[str, str], source: str, work: str) -> float:
+    release = os.path.join(work, "release")
+    shutil.rmtree(work, ignore_errors=True)
+    shutil.copytree(source, release)
+    run_env = {
+        **env,
+        "MANIFEST_DIR": os.path.join(work, "manifest"),
+        "DIST_PATH": os.path.join(work, "dist"),
+        "GITHUB_OUTPUT": os.path.join(work, "github-output"),
+    }
+    start = time.perf_counter()
+    run(config, config_path, run_env, release)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--method", choices=("gpg", "native"), default="gpg")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--dir", default=None, help="Directory to create the tree in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        source = create_release(temp_dir, args.files, args.size_kb)
+        server = ThreadingHTTPServer(
+            ("127.0.0.1", 0),
+            functools.partial(QuietHandler, directory=temp_dir),
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        config = release_config(
+            f"http://127.0.0.1:{server.server_address[1]}/KEYS", args.method
+        )
+        config_path = os.path.join(temp_dir, "release-config.yml")
+        with open(config_path, "w") as config_file:
+            yaml.safe_dump(config, config_file)
+
+        env = {
+            **os.environ,
+            "PYTHONPATH": ROOT,
+            "GH_PUB_NO_CACHE": "true",
+            "RELEASE_CONFIG_SCHEMA": os.path.join(
+                ROOT, "read-config", "release-config-schema.yml.schema.json"
+            ),
+            "REPO_PATH": "release/",
+        }
+        print(
+            f"Signed {args.files} files of {args.size_kb} KB in {source}, "
+            f"{args.method} signature check"
+        )
+
+        try:
+            for name, run in (("chain", run_chain), ("runner", run_runner)):
+                elapsed = [
+                    timed(run, config, config_path, env, source, os.path.join(temp_dir, "work"))
+                    for _ in range(args.runs)
+                ]
+                print(
+                    f"{name:6} : median {statistics.median(elapsed):8.2f}s "
+                    f"min {min(elapsed):8.2f}s"
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark the parallel gpg signature verification against the serial loop.
+
+Generates a throwaway signing key, signs a synthetic tree of artifacts with detached .asc files
+and measures the wall-clock time of verify_signatures with one worker and with a pool of workers,
+with gpg and with the in-process verifier of the native method.
+
+Run from the root of the repository:
+
+    python -m benchmarks.signature_parallel --files 200 --size-kb 1024
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest.mock import patch
+
+import gnupg
+
+from common.artifact_index import ArtifactIndex
+from common.openpgp import Keyring
+from signature.signature_check import import_keys, invalid_signature_files, verify_signatures
+
+PASSPHRASE = "benchmark"
+
+
+def create_tree(path: str, files: int, size_kb: int) -> list[str]:
+    signing_home = os.path.join(path, "signing-home")
+    os.makedirs(signing_home, mode=0o700)
+    gpg = gnupg.GPG(gnupghome=signing_home)
+    key = gpg.gen_key(
+        gpg.gen_key_input(
+            name_email="benchmark@apache.org", key_type="RSA", key_length=2048, passphrase=PASSPHRASE
+        )
+    )
+    with open(os.path.join(path, "KEYS"), "w") as keys_file:
+        keys_file.write(gpg.export_keys(key.fingerprint))
+
+    artifacts = []
+    for index in range(files):
+        data_file = os.path.join(path, f"apache_airflow_providers_{index}-1.0.0.tar.gz")
+        with open(data_file, "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        # Pass an open file, python-gnupg closes the files it opens before it finished reading them
+        with open(data_file, "rb") as f:
+            gpg.sign_file(
+                f, keyid=key.fingerprint, passphrase=PASSPHRASE, detach=True, output=data_file + ".asc"
+            )
+        artifacts.extend([data_file, data_file + ".asc"])
+    return artifacts
+
+
+def timed(verifier: gnupg.GPG | Keyring, artifact_index: ArtifactIndex, workers: int) -> float:
+    invalid_signature_files.clear()
+    start = time.perf_counter()
+    # Keep the "signed by" lines out of the timings
+    with patch("signature.signature_check.console"):
+        verify_signatures(verifier, artifact_index, workers=workers)
+    elapsed = time.perf_counter() - start
+    if invalid_signature_files:
+        raise RuntimeError(f"Unexpected signature failures: {invalid_signature_files}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=1024)
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) + 4))
+    parser.add_argument("--dir", default=None, help="Directory to create the tree in")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as temp_dir:
+        artifact_index = ArtifactIndex(create_tree(temp_dir, args.files, args.size_kb))
+        keys_file_path = os.path.join(temp_dir, "KEYS")
+        verifiers = {
+            "gpg": import_keys(keys_file_path, os.path.join(temp_dir, "verify-home")),
+            "native": Keyring.from_file(keys_file_path),
+        }
+        print(f"Signed {args.files} files of {args.size_kb} KB in {temp_dir}")
+
+        serial = timed(verifiers["gpg"], artifact_index, 1)
+        for method, verifier in verifiers.items():
+            for workers in (1, args.workers):
+                elapsed = serial if (method, workers) == ("gpg", 1) else timed(
+                    verifier, artifact_index, workers
+                )
+                print(
+                    f"{method:6} x {workers:<3} workers : {elapsed:8.2f}s "
+                    f"speedup {serial / elapsed:5.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
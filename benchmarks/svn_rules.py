@@ -0,0 +1,154 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Benchmark the svn check rule engine on synthetic file names.
+
+Classifies growing lists of file names, with the extension and package name identifiers of the
+release config, and prints the time per file to show that the check scales linearly with the
+number of files. The previous implementation, one re.match per file and identifier and a
+list.remove per matched file, is measured as a reference unless --no-reference is given.
+The extension check is then timed with a growing number of configured suffixes, matched with
+the suffix trie and, as a reference, with the same suffixes as a single regex.
+
+Run from the root of the repository:
+
+    python -m benchmarks.svn_rules --files 50000
+"""
+
+import argparse
+import re
+import time
+
+from svn.svn_check import (
+    check_files_with_identifiers,
+    check_with_regex,
+    unknown_file_extensions,
+    unknown_files,
+)
+
+CHECKS = {
+    "extension": [
+        {
+            "type": "regex",
+            "pattern": ".*(py3-none-any.whl|py3-none-any.whl.asc|py3-none-any.whl.sha512|"
+            "tar.gz|tar.gz.asc|tar.gz.sha512)$",
+        },
+    ],
+    "package_name": [
+        {"type": "regex", "pattern": ".*(apache-airflow.*)$"},
+        {"type": "regex", "pattern": ".*(apache_airflow_providers.*)$"},
+    ],
+}
+
+SUFFIXES = [
+    "-py3-none-any.whl",
+    "-py3-none-any.whl.asc",
+    "-py3-none-any.whl.sha512",
+    ".tar.gz",
+    ".tar.gz.asc",
+    ".tar.gz.sha512",
+]
+
+
+def file_names(count: int) -> list[str]:
+    names = []
+    for index in range(count):
+        # One file in a hundred is unknown, to exercise the whole list of identifiers
+        prefix = "apache_unknown" if index % 100 == 0 else "apache_airflow_providers"
+        names.append(f"{prefix}_{index // len(SUFFIXES)}-1.0.0{SUFFIXES[index % len(SUFFIXES)]}")
+    return names
+
+
+def reference_check(identifiers, files, check_type):
+    files_copy = files.copy()
+    for identifier in identifiers:
+        pattern = identifier["pattern"]
+        for file in files:
+            match = re.match(pattern, file)
+            if match and (
+                file.endswith(match.group(1))
+                if check_type == "extension"
+                else match.group(1) in file
+            ):
+                files_copy.remove(file)
+    return files_copy
+
+
+def timed(check, files: list[str]) -> float:
+    unknown_files.clear()
+    unknown_file_extensions.clear()
+    start = time.perf_counter()
+    for check_type, identifiers in CHECKS.items():
+        check(identifiers, files, check_type)
+    return time.perf_counter() - start
+
+
+def time_suffixes(files: list[str], count: int) -> tuple[float, float]:
+    """
+    Time of the extension check with the suffix trie and with the regex, with count suffixes
+    """
+    # Unused suffixes, only the last ones match the files
+    suffixes = [f"ext{index}" for index in range(count - len(SUFFIXES))]
+    suffixes += [suffix.lstrip("-.") for suffix in SUFFIXES]
+
+    start = time.perf_counter()
+    check_files_with_identifiers([{"type": "suffix", "suffixes": suffixes}], files, "extension")
+    trie = time.perf_counter() - start
+
+    pattern = re.compile(f".*({'|'.join(suffixes)})$")
+    start = time.perf_counter()
+    for file in files:
+        check_with_regex(file, pattern, "extension")
+    regex = time.perf_counter() - start
+    return trie, regex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=50000)
+    parser.add_argument("--steps", type=int, default=4)
+    parser.add_argument("--no-reference", action="store_true")
+    args = parser.parse_args()
+
+    for step in range(1, args.steps + 1):
+        files = file_names(args.files * step // args.steps)
+        elapsed = timed(check_files_with_identifiers, files)
+        line = (
+            f"{len(files):7} files : rule engine {elapsed:8.3f}s "
+            f"{elapsed / len(files) * 1e6:6.2f}us/file"
+        )
+        if not args.no_reference:
+            reference = timed(reference_check, files)
+            line += (
+                f" | re.match + list.remove {reference:8.3f}s "
+                f"{reference / len(files) * 1e6:8.2f}us/file"
+            )
+        print(line)
+
+    files = file_names(args.files)
+    for count in (6, 60, 600):
+        unknown_file_extensions.clear()
+        trie, regex = time_suffixes(files, count)
+        print(
+            f"{count:7} suffixes : suffix trie {trie:8.3f}s {trie / len(files) * 1e6:6.2f}us/file"
+            f" | regex {regex:8.3f}s {regex / len(files) * 1e6:8.2f}us/file"
+        )
+
+
+if __name__ == "__main__":
+    main()
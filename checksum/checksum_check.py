@@ -19,58 +19,691 @@
 # requires-python = ">=3.11"
 # dependencies = [
 #     "rich",
+#     "requests",
+#     "python-gnupg",
+#     "cryptography",
 # ]
 # ///
 import hashlib
 import json
+import mmap
+import multiprocessing
 import os
+import subprocess
 import sys
+import threading
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from contextlib import ExitStack
+from functools import partial
 from typing import Any
+from xml.etree import ElementTree
 
 from rich.console import Console
 
-console = Console(width=400, color_system="standard")
+from common.artifact_index import COMPANION_KINDS, SIGNATURE_KIND, ArtifactIndex
+from common.github_output import write_github_output
+from common.manifest import MANIFEST_FILE_NAME, ManifestWriter
+from common.openpgp import Keyring, SignatureFile, Verification
+from common.verification_cache import VerificationCache, cache_dir, cache_disabled
+from signature.signature_check import (
+    KeysDownloadError,
+    download_keys,
+    select_signing_keys,
+)
 
-svn_files = os.listdir()
+console = Console(width=400, color_system="standard")
 
 invalid_checksums = []
+orphaned_checksum_files = []
+invalid_signature_files = []
 
+EXECUTORS: dict[str, type[Executor]] = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
 
-def validate_checksum(check_sum_files: list[dict[str, str]], algorithm: str):
-    for file_dict in check_sum_files:
-        sha_file, check_file = file_dict.values()
 
-        with open(check_file, "rb") as chk:
-            digest = hashlib.file_digest(chk, algorithm)
+CACHE_FILE_NAME = "checksum-cache.json"
 
-        actual_sha = digest.hexdigest()
+# Buffer of the readinto loops, large reads cut the number of syscalls on big sdists
+DEFAULT_BUFFER_SIZE = 2**20
 
-        with open(sha_file, "rb") as shf:
-            content = shf.read().decode("utf-8").strip()
+# Files from this size on are hashed from a memory map by the auto backend
+MMAP_THRESHOLD = 2**24
 
-        expected_sha = content.split()[0]
+READ_BACKENDS = ("auto", "mmap", "readinto", "fadvise")
 
-        if actual_sha != expected_sha:
-            invalid_checksums.append(
-                {
-                    "file": sha_file,
-                    "expected_sha": expected_sha,
-                    "actual_sha": actual_sha,
-                }
+HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def select_read_backend(size: int) -> str:
+    """
+    Pick the read backend for a file of the given size. Small files are read with a plain
+    readinto loop, the cost of setting up a memory map is not worth it. Large files are hashed
+    straight from the page cache through a memory map, without copying them to a buffer.
+    """
+    if size >= MMAP_THRESHOLD:
+        return "mmap"
+    return "readinto"
+
+
+def prefetch(file_path: str):
+    """
+    Ask the kernel to start reading the file in the background, so it is in the page cache
+    by the time it is hashed. This is only a hint, it is a no-op where posix_fadvise is missing.
+    """
+    if not HAS_FADVISE:
+        return
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+
+class VerificationCancelled(Exception):
+    """
+    Raised in a worker when the verification is cancelled, eg: another artifact failed in fail_fast mode
+    """
+
+
+def check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise VerificationCancelled()
+
+
+def hash_with_readinto(chk, hashes: list, buffer_size: int, cancel_event=None):
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    while size := chk.readinto(buffer):
+        check_cancelled(cancel_event)
+        for digest in hashes:
+            digest.update(view[:size])
+
+
+def hash_with_mmap(chk, hashes: list, size: int, cancel_event=None):
+    with mmap.mmap(chk.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            # Feed the map in chunks, a single update would hold the whole file in one call
+            for offset in range(0, size, DEFAULT_BUFFER_SIZE):
+                check_cancelled(cancel_event)
+                chunk = view[offset : offset + DEFAULT_BUFFER_SIZE]
+                for digest in hashes:
+                    digest.update(chunk)
+                chunk.release()
+        finally:
+            view.release()
+
+
+def compute_digests(
+    check_file: str,
+    algorithms: list[str],
+    prefetch_file: str | None = None,
+    trailers: dict[str, tuple[str, bytes]] | None = None,
+    read_backend: str = "auto",
+    buffer_size: int | None = None,
+    cancel_event=None,
+) -> dict[str, str]:
+    """
+    Compute the hex digests of the file for all the algorithms in a single read of the file
+
+    This is a module level function, so it can be pickled and sent to a process pool.
+
+    :param check_file: path of the file to hash
+    :param algorithms: algorithms supported by hashlib eg: ["sha512", "sha256"]
+    :param prefetch_file: file hashed next, the kernel starts reading it in the background
+    :param trailers: (algorithm, trailer) by label, the digest of the file followed by the trailer
+        is returned under the label. The OpenPGP signatures hash the data followed by a trailer,
+        so they are checked from the same read; a trailer of an algorithm that is also in
+        algorithms shares its hash of the file.
+    :param read_backend: how the file is read, one of READ_BACKENDS, "auto" picks by file size
+        - mmap: hash the file from a memory map, without copying it to a buffer
+        - readinto: read the file in a loop into a reusable buffer of buffer_size bytes
+        - fadvise: readinto loop with a sequential access hint to the kernel
+    :param buffer_size: size of the readinto buffer, defaults to DEFAULT_BUFFER_SIZE
+    :param cancel_event: threading or multiprocessing event, when it is set the read stops at the
+        next chunk with VerificationCancelled
+    :return: hex digest of the file by algorithm, and by label for the trailers
+    """
+    if read_backend not in READ_BACKENDS:
+        raise ValueError(
+            f"Unknown read backend {read_backend}, supported backends: {', '.join(READ_BACKENDS)}"
+        )
+
+    hashes = {algorithm: hashlib.new(algorithm) for algorithm in algorithms}
+    for algorithm, _ in (trailers or {}).values():
+        if algorithm not in hashes:
+            hashes[algorithm] = hashlib.new(algorithm)
+
+    check_cancelled(cancel_event)
+    if prefetch_file:
+        prefetch(prefetch_file)
+
+    with open(check_file, "rb", buffering=0) as chk:
+        size = os.fstat(chk.fileno()).st_size
+        if read_backend == "auto":
+            read_backend = select_read_backend(size)
+
+        if read_backend == "mmap" and size:
+            hash_with_mmap(chk, list(hashes.values()), size, cancel_event)
+        else:
+            if read_backend == "fadvise" and HAS_FADVISE:
+                os.posix_fadvise(chk.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            hash_with_readinto(
+                chk,
+                list(hashes.values()),
+                buffer_size or DEFAULT_BUFFER_SIZE,
+                cancel_event,
             )
 
+    digests = {algorithm: hashes[algorithm].hexdigest() for algorithm in algorithms}
+    for label, (algorithm, trailer) in (trailers or {}).items():
+        digest = hashes[algorithm].copy()
+        digest.update(trailer)
+        digests[label] = digest.hexdigest()
+    return digests
+
+
+def read_expected_checksum(sha_file: str) -> str:
+    with open(sha_file, "rb") as shf:
+        content = shf.read().decode("utf-8").strip()
+    return content.split()[0]
+
 
-def get_valid_files(algorithm: str, files: list[str]) -> list[dict[str, str]]:
-    eligible_files = []
-    for file in files:
-        if file.endswith(algorithm):
-            eligible_files.append(
+def get_svn_revisions(path: str = ".") -> dict[str, str]:
+    """
+    Get the url and last changed revision of the files in the svn working copy
+
+    :param path: path of the svn working copy
+    :return: "url@revision" by file name, empty when the path is not a svn working copy
+    """
+    try:
+        output = subprocess.run(
+            ["svn", "info", "--xml", "--depth", "files", path],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        entries = ElementTree.fromstring(output).iter("entry")
+    except (OSError, subprocess.CalledProcessError, ElementTree.ParseError):
+        return {}
+
+    revisions = {}
+    for entry in entries:
+        commit = entry.find("commit")
+        if entry.get("kind") == "file" and commit is not None:
+            revisions[os.path.basename(entry.get("path"))] = (
+                f"{entry.findtext('url')}@{commit.get('revision')}"
+            )
+    return revisions
+
+
+def checksum_cache_key(
+    check_file: str, algorithm: str, svn_revisions: dict[str, str] | None = None
+) -> str:
+    """
+    Key of the verified digest in the cache, the identity of the file on disk or its svn revision.
+    Any change of the file changes its size, mtime or inode and the file is hashed again.
+    """
+    stat = os.stat(check_file)
+    name = os.path.basename(check_file)
+    if svn_revisions and name in svn_revisions:
+        return f"{algorithm}:svn:{svn_revisions[name]}:{stat.st_size}"
+    return (
+        f"{algorithm}:{os.path.abspath(check_file)}:"
+        f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
+    )
+
+
+def verify_checksums(
+    checksum_tasks: dict[str, dict[str, str]],
+    workers: int | None = None,
+    executor: str = "thread",
+    cache: VerificationCache | None = None,
+    svn_revisions: dict[str, str] | None = None,
+    read_backend: str = "auto",
+    buffer_size: int | None = None,
+    fail_fast: bool = False,
+    manifest: ManifestWriter | None = None,
+    manifest_algorithms: list[str] | None = None,
+    keyring: Keyring | None = None,
+    signature_files: dict[str, SignatureFile] | None = None,
+):
+    """
+    Verify the checksums of the artifacts, hashing runs concurrently in a pool of workers.
+
+    Every artifact is read once and all of its checksum files are verified from that read.
+    hashlib releases the GIL while hashing large buffers, so the default thread pool uses all
+    cores of the runner. Failures are reported sorted by file name, independent of the order in
+    which the workers finish.
+
+    In fail_fast mode the first mismatch cancels the artifacts waiting for a worker and stops the
+    reads in progress at their next chunk, only the first failure found is reported.
+
+    :param checksum_tasks: paths of the checksum files by algorithm for every artifact path,
+        eg: {"file.tar.gz": {"sha512": "file.tar.gz.sha512"}}
+    :param workers: number of workers, defaults to the number of cpus, 1 hashes the files serially
+    :param executor: type of the pool, "thread" or "process"
+    :param cache: cache of the verified digests, artifacts verified in a previous run are skipped
+    :param svn_revisions: "url@revision" by file name, used as cache key instead of the file identity
+    :param read_backend: how the artifacts are read, see compute_digests
+    :param buffer_size: size of the readinto buffer, see compute_digests
+    :param fail_fast: stop at the first checksum mismatch
+    :param manifest: every verified artifact is written to the manifest with its size and digests
+    :param manifest_algorithms: algorithms computed in the same pass only to be written to the
+        manifest, eg: sha256 for the later comparison with the digests published on PyPI
+    :param keyring: keys to check the signatures with, in the same read as the checksums
+    :param signature_files: signature file by artifact, the artifacts must be in checksum_tasks.
+        Artifacts with a signature are read even when their checksums are cached.
+    :return: None
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(
+            f"Unknown executor {executor}, supported executors: {', '.join(EXECUTORS)}"
+        )
+
+    workers = workers or os.cpu_count() or 1
+    expected_shas = {
+        check_file: {
+            algorithm: read_expected_checksum(sha_file)
+            for algorithm, sha_file in tasks.items()
+        }
+        for check_file, tasks in checksum_tasks.items()
+    }
+
+    signature_files = signature_files if keyring is not None else {}
+    # Signatures checked from the read of the checksums, text documents are read on their own
+    trailers = {
+        check_file: signature_file.trailers()
+        for check_file, signature_file in signature_files.items()
+        if signature_file.fusable
+    }
+
+    cache_keys: dict[tuple[str, str], str] = {}
+    # Digests of the artifacts known without reading them, from the cache
+    known_digests: dict[str, dict[str, str]] = {}
+    pending: dict[str, list[str]] = {}
+    for check_file, tasks in expected_shas.items():
+        known_digests[check_file] = {}
+        extra_algorithms = [
+            algorithm
+            for algorithm in manifest_algorithms or []
+            if algorithm not in tasks
+        ]
+        for algorithm in [*tasks, *extra_algorithms]:
+            if cache is not None:
+                key = checksum_cache_key(check_file, algorithm, svn_revisions)
+                cache_keys[check_file, algorithm] = key
+                cached_digest = (cache.get(key) or {}).get("digest")
+                # Manifest only algorithms have no expected digest, any cached digest is reused
+                expected_sha = tasks.get(algorithm, cached_digest)
+                if cached_digest and cached_digest == expected_sha:
+                    known_digests[check_file][algorithm] = cached_digest
+                    continue
+            pending.setdefault(check_file, []).append(algorithm)
+        if check_file in trailers:
+            pending.setdefault(check_file, [])
+
+    if cache is not None:
+        console.print(
+            f"[blue]Skipping {len(checksum_tasks) - len(pending)} artifacts already verified "
+            f"in a previous run[/]"
+        )
+
+    def add_to_manifest(check_file: str, digests: dict[str, str]):
+        if manifest is not None:
+            # The manifest lists the artifacts by name, whatever the directory they are in
+            manifest.add(os.path.basename(check_file), os.stat(check_file).st_size, digests)
+
+    for check_file in expected_shas:
+        if check_file not in pending:
+            add_to_manifest(check_file, known_digests[check_file])
+
+    check_files = list(pending)
+    algorithms = list(pending.values())
+    file_trailers = [trailers.get(check_file) for check_file in check_files]
+    hash_file = partial(
+        compute_digests, read_backend=read_backend, buffer_size=buffer_size
+    )
+
+    failures = []
+    signature_failures = []
+
+    def check_signature(check_file: str, verification: Verification) -> bool:
+        signature_file = signature_files[check_file].path
+        if not verification.valid:
+            signature_failures.append(
                 {
-                    "sha_file": file,
-                    "check_file": file.replace(algorithm, "").rstrip("."),
+                    "file": signature_file,
+                    "status": verification.valid,
+                    "problems": verification.problems,
                 }
             )
-    return eligible_files
+        else:
+            console.print(f"[blue]File {signature_file} signed by {verification.username}[/]")
+        return verification.valid
+
+    def check_digests(check_file: str, actual_shas: dict[str, str]) -> bool:
+        signature_digests = {
+            label: digest
+            for label, digest in actual_shas.items()
+            if label in trailers.get(check_file, {})
+        }
+        actual_shas = {
+            algorithm: digest
+            for algorithm, digest in actual_shas.items()
+            if algorithm not in signature_digests
+        }
+        valid = True
+        for algorithm, actual_sha in actual_shas.items():
+            # Manifest only algorithms have no expected digest to compare with
+            expected_sha = expected_shas[check_file].get(algorithm, actual_sha)
+
+            if actual_sha != expected_sha:
+                valid = False
+                failures.append(
+                    {
+                        "file": checksum_tasks[check_file][algorithm],
+                        "expected_sha": expected_sha,
+                        "actual_sha": actual_sha,
+                    }
+                )
+            elif cache is not None:
+                cache.set(cache_keys[check_file, algorithm], {"digest": actual_sha})
+        if signature_digests:
+            verification = signature_files[check_file].verify(keyring, signature_digests)
+            valid = check_signature(check_file, verification) and valid
+        if valid:
+            add_to_manifest(check_file, {**known_digests[check_file], **actual_shas})
+        return valid
+
+    if workers == 1 or len(check_files) <= 1:
+        # While a file is hashed, the next one is read ahead by the kernel
+        prefetch_files = check_files[1:] + [None]
+        for check_file, check_algorithms, prefetch_file, check_trailers in zip(
+            check_files, algorithms, prefetch_files, file_trailers
+        ):
+            actual_shas = hash_file(
+                check_file, check_algorithms, prefetch_file, check_trailers
+            )
+            if not check_digests(check_file, actual_shas) and fail_fast:
+                break
+    elif not fail_fast:
+        # Every worker prefetches the file it will most likely pick up next
+        prefetch_files = check_files[workers:] + [None] * workers
+        with EXECUTORS[executor](max_workers=workers) as pool:
+            for check_file, actual_shas in zip(
+                check_files,
+                pool.map(
+                    hash_file, check_files, algorithms, prefetch_files, file_trailers
+                ),
+            ):
+                check_digests(check_file, actual_shas)
+    else:
+        prefetch_files = check_files[workers:] + [None] * workers
+        with ExitStack() as stack:
+            if executor == "process":
+                cancel_event = stack.enter_context(multiprocessing.Manager()).Event()
+            else:
+                cancel_event = threading.Event()
+            pool = EXECUTORS[executor](max_workers=workers)
+            # Pending artifacts are dropped and in flight reads are cancelled on exit
+            stack.callback(pool.shutdown, wait=True, cancel_futures=True)
+            stack.callback(cancel_event.set)
+
+            futures = {
+                pool.submit(
+                    hash_file,
+                    check_file,
+                    check_algorithms,
+                    prefetch_file,
+                    check_trailers,
+                    cancel_event=cancel_event,
+                ): check_file
+                for check_file, check_algorithms, prefetch_file, check_trailers in zip(
+                    check_files, algorithms, prefetch_files, file_trailers
+                )
+            }
+            for future in as_completed(futures):
+                if not check_digests(futures[future], future.result()):
+                    break
+
+    for check_file, signature_file in signature_files.items():
+        if check_file not in trailers and not (fail_fast and (failures or signature_failures)):
+            check_signature(check_file, keyring.verify_file(signature_file.path, check_file))
+
+    invalid_checksums.extend(sorted(failures, key=lambda failure: failure["file"]))
+    invalid_signature_files.extend(
+        sorted(signature_failures, key=lambda failure: failure["file"])
+    )
+
+
+def validate_checksum(
+    check_sum_files: list[dict[str, str]],
+    algorithm: str,
+    workers: int | None = None,
+    executor: str = "thread",
+    cache: VerificationCache | None = None,
+):
+    """
+    Validate the checksum of the files with a single algorithm
+
+    :param check_sum_files: list of {"sha_file": ..., "check_file": ...} dicts
+    :param algorithm: any algorithm supported by hashlib eg: sha512
+    :param workers: number of workers, defaults to the number of cpus, 1 hashes the files serially
+    :param executor: type of the pool, "thread" or "process"
+    :param cache: cache of the verified digests, artifacts verified in a previous run are skipped
+    :return: None
+    """
+    verify_checksums(
+        {
+            file_dict["check_file"]: {algorithm: file_dict["sha_file"]}
+            for file_dict in check_sum_files
+        },
+        workers=workers,
+        executor=executor,
+        cache=cache,
+    )
+
+
+def validate_checksums(
+    check_sum_config: list[dict[str, Any]],
+    files: list[str] | ArtifactIndex,
+    cache: VerificationCache | None = None,
+    manifest: ManifestWriter | None = None,
+    keyring: Keyring | None = None,
+    executor: str | None = None,
+):
+    """
+    Validate all the configured checksum checks in a single pass over the artifacts
+
+    When several algorithms are configured, eg: sha512 and sha256, every artifact is still read
+    from disk only once. With a keyring the signatures of the artifacts are verified from that
+    same read, instead of a second read by the signature check.
+
+    :param check_sum_config: list of checksum checks from the release config
+    :param files: list of files from the SVN directory or their index
+    :param cache: cache of the verified digests, artifacts verified in a previous run are skipped
+    :param manifest: every verified artifact is written to the manifest with its size and digests
+    :param keyring: keys of the native signature check, None to leave the signatures to the
+        signature check
+    :param executor: type of the pool, overrides the executor of the config
+    :return: None
+    """
+    if not isinstance(files, ArtifactIndex):
+        files = ArtifactIndex(
+            files,
+            COMPANION_KINDS | {check.get("algorithm") for check in check_sum_config},
+        )
+
+    checksum_tasks: dict[str, dict[str, str]] = {}
+    for check in check_sum_config:
+        algorithm = check.get("algorithm")
+        orphaned_checksum_files.extend(files.orphaned_companions(algorithm))
+        for file_dict in get_valid_files(algorithm, files):
+            if file_dict["check_file"] in files:
+                checksum_tasks.setdefault(files.path(file_dict["check_file"]), {})[algorithm] = (
+                    files.path(file_dict["sha_file"])
+                )
+
+    signature_files: dict[str, SignatureFile] = {}
+    if keyring is not None:
+        for file in files.orphaned_companions(SIGNATURE_KIND):
+            invalid_signature_files.append(
+                {"file": file, "status": False, "problems": ["data file missing"]}
+            )
+        for signature_file, check_file in files.with_companion(SIGNATURE_KIND):
+            if check_file in files:
+                signature_files[files.path(check_file)] = SignatureFile(files.path(signature_file))
+                checksum_tasks.setdefault(files.path(check_file), {})
+
+    # All the checks share one pass over the artifacts, the first check that configures an option wins
+    def pass_option(name: str, default: Any = None) -> Any:
+        return next(
+            (check[name] for check in check_sum_config if check.get(name)), default
+        )
+
+    svn_revisions = None
+    if cache is not None and pass_option("cache_key") == "svn-revision":
+        svn_revisions = get_svn_revisions(files.directory)
+
+    verify_checksums(
+        checksum_tasks,
+        workers=pass_option("workers"),
+        executor=executor or pass_option("executor", "thread"),
+        cache=cache,
+        svn_revisions=svn_revisions,
+        read_backend=pass_option("read_backend", "auto"),
+        buffer_size=pass_option("buffer_size"),
+        fail_fast=pass_option("fail_fast", False),
+        manifest=manifest,
+        manifest_algorithms=pass_option("manifest_algorithms"),
+        keyring=keyring,
+        signature_files=signature_files,
+    )
+
+
+def get_valid_files(
+    algorithm: str, files: list[str] | ArtifactIndex
+) -> list[dict[str, str]]:
+    """
+    Get the checksum files of the algorithm with the file they are the checksum of
+
+    :param algorithm: any algorithm supported by hashlib eg: sha512
+    :param files: list of files from the SVN directory or their index
+    :return: list of {"sha_file": ..., "check_file": ...} dicts, in the order of the checksum files
+    """
+    if not isinstance(files, ArtifactIndex):
+        files = ArtifactIndex(files, COMPANION_KINDS | {algorithm})
+
+    return [
+        {"sha_file": sha_file, "check_file": check_file}
+        for sha_file, check_file in files.with_companion(algorithm)
+    ]
+
+
+def run_checksum_check(
+    check_sum_config: list[dict[str, Any]],
+    artifact_index: ArtifactIndex,
+    signature_check_config: list[dict[str, Any]] | None = None,
+    use_cache: bool = True,
+    manifest_dir: str | None = None,
+    executor: str | None = None,
+) -> bool:
+    """
+    Run the checksum checks on the files of the release directory and report the errors
+
+    :param check_sum_config: list of checksum checks from the release config
+    :param artifact_index: index of the files of the release directory
+    :param signature_check_config: list of signature checks from the release config, a native
+        signature check runs in the same read of the artifacts as the checksums
+    :param use_cache: skip the artifacts verified in a previous run
+    :param manifest_dir: directory the manifest of the verified artifacts is written to
+    :param executor: type of the pool, overrides the executor of the config, eg: "thread" when
+        other stages run threads in the same process
+    :return: True when all the checks passed
+    """
+    for check in check_sum_config:
+        console.print(f"[blue]{check.get('description')}[/]")
+
+    cache = None
+    if use_cache:
+        cache = VerificationCache(os.path.join(cache_dir(), CACHE_FILE_NAME))
+
+    native_check = next(
+        (
+            check
+            for check in signature_check_config or []
+            if check.get("method") == "native"
+        ),
+        None,
+    )
+
+    keyring = None
+    if native_check is not None:
+        console.print(f"[blue]{native_check.get('description')}[/]")
+        keys_file_path = download_keys(native_check.get("keys"), use_cache=use_cache)
+        # Signatures of unknown issuers are reported by the keyring as made by no public key
+        keys, _ = select_signing_keys(keys_file_path, artifact_index)
+        if keys is None:
+            keyring = Keyring.from_file(keys_file_path)
+        else:
+            keyring = Keyring.from_bytes(keys)
+    with ExitStack() as stack:
+        manifest = None
+        if manifest_dir:
+            manifest = stack.enter_context(ManifestWriter(manifest_dir))
+
+        validate_checksums(
+            check_sum_config,
+            artifact_index,
+            cache=cache,
+            manifest=manifest,
+            keyring=keyring,
+            executor=executor,
+        )
+
+    if cache is not None:
+        cache.save()
+
+    if orphaned_checksum_files or invalid_checksums or invalid_signature_files:
+        console.print("[red]Checksum validation failed[/]")
+        for orphaned in orphaned_checksum_files:
+            console.print(f"[red]Error: data file missing for checksum file {orphaned}[/]")
+        for invalid in invalid_checksums:
+            console.print(f"[red]File: {invalid.get('file')}[/]")
+            console.print(f"[red]Expected SHA: {invalid.get('expected_sha')}[/]")
+            console.print(f"[red]Actual SHA: {invalid.get('actual_sha')}[/]")
+        for error in invalid_signature_files:
+            console.print(
+                f"[red]Error: Invalid signature found for {error.get('file')} status: {error.get('status')} problems: {error.get('problems')}[/]"
+            )
+        return False
+
+    if manifest is not None:
+        write_github_output(manifest_path=manifest.path, manifest_dir=manifest.directory)
+        console.print(f"[blue]Verified artifacts written to {manifest.path}[/]")
+
+    console.print("[blue]Checksum validation passed[/]")
+    return True
+
+
+def manifest_path(manifest_dir: str) -> str:
+    """
+    Path of the manifest run_checksum_check writes to the manifest directory
+    """
+    return os.path.join(manifest_dir, MANIFEST_FILE_NAME)
 
 
 if __name__ == "__main__":
@@ -85,23 +718,31 @@ if __name__ == "__main__":
         )
         sys.exit(1)
 
-    if not svn_files:
+    artifact_index = ArtifactIndex.from_directory(
+        companion_kinds=COMPANION_KINDS
+        | {check.get("algorithm") for check in check_sum_config}
+    )
+
+    if not artifact_index.files:
         console.print(
             f"[red]Error: No files found in SVN directory at {os.environ.get('REPO_PATH')}[/]"
         )
         sys.exit(1)
 
-    for check in check_sum_config:
-        console.print(f"[blue]{check.get('description')}[/]")
-        valid_files = get_valid_files(check.get("algorithm"), svn_files)
-        validate_checksum(valid_files, check.get("algorithm"))
-
-    if invalid_checksums:
-        console.print("[red]Checksum validation failed[/]")
-        for invalid in invalid_checksums:
-            console.print(f"[red]File: {invalid.get('file')}[/]")
-            console.print(f"[red]Expected SHA: {invalid.get('expected_sha')}[/]")
-            console.print(f"[red]Actual SHA: {invalid.get('actual_sha')}[/]")
+    # The native signature check runs in the same read of the artifacts as the checksums
+    signature_check_config: list[dict[str, Any]] = json.loads(
+        os.environ.get("SIGNATURE_CHECK_CONFIG") or "[]"
+    )
+    try:
+        passed = run_checksum_check(
+            check_sum_config,
+            artifact_index,
+            signature_check_config,
+            use_cache=not cache_disabled(sys.argv),
+            manifest_dir=os.environ.get("MANIFEST_DIR"),
+        )
+    except KeysDownloadError as e:
+        console.print(f"[red]Error: {e}[/]")
+        sys.exit(1)
+    if not passed:
         sys.exit(1)
-
-    console.print("[blue]Checksum validation passed[/]")
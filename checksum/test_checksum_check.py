@@ -16,16 +16,39 @@
 # under the License.
 #
 
+import hashlib
 import os
 import tarfile
 import tempfile
-from unittest.mock import patch
+import threading
+from unittest.mock import ANY, patch
+
+import gnupg
+import pytest
 
 from checksum.checksum_check import (
+    DEFAULT_BUFFER_SIZE,
+    MMAP_THRESHOLD,
+    READ_BACKENDS,
+    VerificationCancelled,
+    checksum_cache_key,
+    compute_digests,
+    get_svn_revisions,
     get_valid_files,
+    hash_with_readinto,
     invalid_checksums,
+    invalid_signature_files,
+    orphaned_checksum_files,
+    prefetch,
+    select_read_backend,
     validate_checksum,
+    validate_checksums,
+    verify_checksums,
 )
+from common.artifact_index import ArtifactIndex
+from common.manifest import ManifestWriter, load_manifest
+from common.openpgp import Keyring
+from common.verification_cache import VerificationCache
 
 
 def test_get_valid_files_sha512():
@@ -68,9 +91,11 @@ def test_get_valid_files_with_sha256():
     ]
 
 
-@patch("hashlib.file_digest")
-def test_validate_checksum(mock_file_digest):
-    mock_file_digest.return_value.hexdigest.return_value = "bbc759357eb1980e7f80ba0b016e9ed02120e26fcd008129b5777baf8086208c45e170e3c98cf35bd96a246d59484bde3220a897e5e6a7f688a69a40bcd451bd"
+@patch("checksum.checksum_check.compute_digests")
+def test_validate_checksum(mock_compute_digests):
+    mock_compute_digests.return_value = {
+        "sha512": "bbc759357eb1980e7f80ba0b016e9ed02120e26fcd008129b5777baf8086208c45e170e3c98cf35bd96a246d59484bde3220a897e5e6a7f688a69a40bcd451bd"
+    }
 
     invalid_checksums.clear()
     temp_dir = tempfile.TemporaryDirectory()
@@ -100,9 +125,11 @@ def test_validate_checksum(mock_file_digest):
     assert not invalid_checksums
 
 
-@patch("hashlib.file_digest")
-def test_validate_checksum_invalid(mock_file_digest):
-    mock_file_digest.return_value.hexdigest.return_value = "bbc759357eb1980e7f80ba0b016e9ed02120e26fcd008129b5777baf8086208c45e170e3c98cf35bd96a246d59484bde3220a897e5e6a7f688a69a40bcd451bd12"
+@patch("checksum.checksum_check.compute_digests")
+def test_validate_checksum_invalid(mock_compute_digests):
+    mock_compute_digests.return_value = {
+        "sha512": "bbc759357eb1980e7f80ba0b016e9ed02120e26fcd008129b5777baf8086208c45e170e3c98cf35bd96a246d59484bde3220a897e5e6a7f688a69a40bcd451bd12"
+    }
     invalid_checksums.clear()
     temp_dir = tempfile.TemporaryDirectory()
     temp_file = tempfile.NamedTemporaryFile()
@@ -135,3 +162,539 @@ def test_validate_checksum_invalid(mock_file_digest):
             "actual_sha": "bbc759357eb1980e7f80ba0b016e9ed02120e26fcd008129b5777baf8086208c45e170e3c98cf35bd96a246d59484bde3220a897e5e6a7f688a69a40bcd451bd12",
         }
     ]
+
+
+def write_artifacts(path, count):
+    check_sum_files = []
+    for index in range(count):
+        check_file = os.path.join(path, f"apache_airflow_providers_{index}-1.0.0.tar.gz")
+        with open(check_file, "wb") as data_file:
+            data_file.write(os.urandom(1024) * (index + 1))
+        with open(check_file, "rb") as data_file:
+            digest = hashlib.file_digest(data_file, "sha512").hexdigest()
+        with open(check_file + ".sha512", "w") as sha_file:
+            sha_file.write(f"{digest} {os.path.basename(check_file)}")
+        check_sum_files.append(
+            {"sha_file": check_file + ".sha512", "check_file": check_file}
+        )
+    return check_sum_files
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_validate_checksum_parallel(executor):
+    invalid_checksums.clear()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        check_sum_files = write_artifacts(temp_dir, 8)
+        validate_checksum(check_sum_files, "sha512", workers=4, executor=executor)
+    assert not invalid_checksums
+
+
+def test_validate_checksum_parallel_failures_sorted_by_file():
+    invalid_checksums.clear()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        check_sum_files = write_artifacts(temp_dir, 8)
+        for file_dict in reversed(check_sum_files[2:5]):
+            with open(file_dict["check_file"], "ab") as data_file:
+                data_file.write(b"tampered")
+        validate_checksum(list(reversed(check_sum_files)), "sha512", workers=4)
+        assert [invalid["file"] for invalid in invalid_checksums] == [
+            file_dict["sha_file"] for file_dict in check_sum_files[2:5]
+        ]
+
+
+def test_validate_checksum_unknown_executor():
+    with pytest.raises(ValueError, match="Unknown executor"):
+        validate_checksum([], "sha512", executor="fiber")
+
+
+def test_compute_digests_reads_file_once_for_all_algorithms():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        check_file = os.path.join(temp_dir, "apache_airflow-2.10.3.tar.gz")
+        data = os.urandom(3 * DEFAULT_BUFFER_SIZE + 17)
+        with open(check_file, "wb") as data_file:
+            data_file.write(data)
+
+        with patch("builtins.open", wraps=open) as mock_open:
+            digests = compute_digests(check_file, ["sha512", "sha256", "md5"])
+        mock_open.assert_called_once()
+
+    assert digests == {
+        "sha512": hashlib.sha512(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "md5": hashlib.md5(data).hexdigest(),
+    }
+
+
+def test_validate_checksums_with_multiple_algorithms():
+    invalid_checksums.clear()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        write_artifacts(temp_dir, 3)
+        os.chdir(temp_dir)
+        check_file = "apache_airflow_providers_1-1.0.0.tar.gz"
+        with open(check_file, "rb") as data_file:
+            sha256 = hashlib.sha256(data_file.read()).hexdigest()
+        with open(check_file + ".sha256", "w") as sha_file:
+            sha_file.write(f"{sha256} {check_file}")
+        with open("apache_airflow_providers_2-1.0.0.tar.gz.sha256", "w") as sha_file:
+            sha_file.write("0" * 64)
+
+        check_sum_config = [
+            {"id": "checksum", "description": "sha512", "algorithm": "sha512"},
+            {"id": "checksum-256", "description": "sha256", "algorithm": "sha256"},
+        ]
+        with patch(
+            "checksum.checksum_check.compute_digests", wraps=compute_digests
+        ) as mock_compute_digests:
+            validate_checksums(check_sum_config, sorted(os.listdir()))
+
+    assert mock_compute_digests.call_count == 3
+    assert [invalid["file"] for invalid in invalid_checksums] == [
+        "apache_airflow_providers_2-1.0.0.tar.gz.sha256"
+    ]
+
+
+def test_verify_checksums_skips_artifacts_verified_in_cache(tmp_path):
+    invalid_checksums.clear()
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    check_sum_files = write_artifacts(str(artifacts), 3)
+
+    validate_checksum(check_sum_files, "sha512", workers=1, cache=cache)
+    assert not invalid_checksums
+    assert len(cache.entries) == 3
+
+    with patch(
+        "checksum.checksum_check.compute_digests", wraps=compute_digests
+    ) as mock_compute_digests:
+        validate_checksum(check_sum_files, "sha512", workers=1, cache=cache)
+    mock_compute_digests.assert_not_called()
+    assert not invalid_checksums
+
+
+def test_verify_checksums_rehashes_changed_artifacts(tmp_path):
+    invalid_checksums.clear()
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    check_sum_files = write_artifacts(str(tmp_path), 2)
+    validate_checksum(check_sum_files, "sha512", workers=1, cache=cache)
+
+    with open(check_sum_files[0]["check_file"], "ab") as data_file:
+        data_file.write(b"tampered")
+
+    with patch(
+        "checksum.checksum_check.compute_digests", wraps=compute_digests
+    ) as mock_compute_digests:
+        validate_checksum(check_sum_files, "sha512", workers=1, cache=cache)
+    mock_compute_digests.assert_called_once()
+    assert [invalid["file"] for invalid in invalid_checksums] == [
+        check_sum_files[0]["sha_file"]
+    ]
+
+
+def test_verify_checksums_does_not_cache_failures(tmp_path):
+    invalid_checksums.clear()
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    check_sum_files = write_artifacts(str(tmp_path), 1)
+    with open(check_sum_files[0]["sha_file"], "w") as sha_file:
+        sha_file.write("0" * 128)
+
+    validate_checksum(check_sum_files, "sha512", workers=1, cache=cache)
+    assert invalid_checksums
+    assert not cache.entries
+
+
+def test_checksum_cache_key_with_svn_revision(tmp_path):
+    os.chdir(tmp_path)
+    with open("apache_airflow-2.10.3.tar.gz", "wb") as data_file:
+        data_file.write(b"data")
+
+    svn_revisions = {"apache_airflow-2.10.3.tar.gz": "https://dist/airflow@42"}
+    key = checksum_cache_key("apache_airflow-2.10.3.tar.gz", "sha512", svn_revisions)
+    assert key == "sha512:svn:https://dist/airflow@42:4"
+
+    # Touching the file does not change the key, the svn revision identifies the content
+    os.utime("apache_airflow-2.10.3.tar.gz", ns=(0, 0))
+    assert checksum_cache_key("apache_airflow-2.10.3.tar.gz", "sha512", svn_revisions) == key
+    assert checksum_cache_key("apache_airflow-2.10.3.tar.gz", "sha512") != key
+
+
+def test_get_svn_revisions_outside_working_copy(tmp_path):
+    assert get_svn_revisions(str(tmp_path)) == {}
+
+
+@pytest.mark.parametrize("read_backend", READ_BACKENDS)
+@pytest.mark.parametrize(
+    "size",
+    [0, 1, DEFAULT_BUFFER_SIZE, 2 * DEFAULT_BUFFER_SIZE + 1],
+    ids=["empty", "one_byte", "one_buffer", "over_two_buffers"],
+)
+def test_compute_digests_read_backends(tmp_path, read_backend, size):
+    check_file = tmp_path / "apache_airflow-2.10.3.tar.gz"
+    data = os.urandom(size)
+    check_file.write_bytes(data)
+
+    digests = compute_digests(
+        str(check_file),
+        ["sha512", "sha256"],
+        prefetch_file=str(check_file),
+        read_backend=read_backend,
+        buffer_size=4096,
+    )
+    assert digests == {
+        "sha512": hashlib.sha512(data).hexdigest(),
+        "sha256": hashlib.sha256(data).hexdigest(),
+    }
+
+
+def test_compute_digests_unknown_read_backend(tmp_path):
+    with pytest.raises(ValueError, match="Unknown read backend"):
+        compute_digests(str(tmp_path), ["sha512"], read_backend="io_uring")
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [
+        pytest.param(0, "readinto", id="empty"),
+        pytest.param(MMAP_THRESHOLD - 1, "readinto", id="small"),
+        pytest.param(MMAP_THRESHOLD, "mmap", id="large"),
+    ],
+)
+def test_select_read_backend(size, expected):
+    assert select_read_backend(size) == expected
+
+
+def test_prefetch_ignores_missing_file(tmp_path):
+    prefetch(str(tmp_path / "missing.tar.gz"))
+
+
+@pytest.mark.parametrize("read_backend", ["mmap", "fadvise"])
+def test_validate_checksums_with_read_backend(tmp_path, read_backend):
+    invalid_checksums.clear()
+    write_artifacts(str(tmp_path), 3)
+    os.chdir(tmp_path)
+    check_sum_config = [
+        {
+            "id": "checksum",
+            "description": "sha512",
+            "algorithm": "sha512",
+            "read_backend": read_backend,
+            "buffer_size": 4096,
+        }
+    ]
+    with patch(
+        "checksum.checksum_check.compute_digests", wraps=compute_digests
+    ) as mock_compute_digests:
+        validate_checksums(check_sum_config, sorted(os.listdir()))
+
+    assert not invalid_checksums
+    assert {call.kwargs["read_backend"] for call in mock_compute_digests.call_args_list} == {
+        read_backend
+    }
+
+
+def test_get_valid_files_requires_algorithm_extension():
+    files = [
+        "apache_airflow-2.10.3.tar.gz.sha512",
+        "apache_airflow-2.10.3.tar.gzsha512",
+    ]
+    assert get_valid_files("sha512", files) == [
+        {
+            "sha_file": "apache_airflow-2.10.3.tar.gz.sha512",
+            "check_file": "apache_airflow-2.10.3.tar.gz",
+        }
+    ]
+
+
+def test_validate_checksums_reports_orphaned_checksum_files(tmp_path):
+    invalid_checksums.clear()
+    orphaned_checksum_files.clear()
+    write_artifacts(str(tmp_path), 2)
+    os.chdir(tmp_path)
+    os.remove("apache_airflow_providers_0-1.0.0.tar.gz")
+
+    check_sum_config = [{"id": "checksum", "description": "sha512", "algorithm": "sha512"}]
+    validate_checksums(check_sum_config, ArtifactIndex.from_directory())
+
+    assert orphaned_checksum_files == ["apache_airflow_providers_0-1.0.0.tar.gz.sha512"]
+    assert not invalid_checksums
+
+
+def test_verify_checksums_fail_fast_serial(tmp_path):
+    invalid_checksums.clear()
+    check_sum_files = write_artifacts(str(tmp_path), 4)
+    for file_dict in check_sum_files[:2]:
+        with open(file_dict["check_file"], "ab") as data_file:
+            data_file.write(b"tampered")
+
+    with patch(
+        "checksum.checksum_check.compute_digests", wraps=compute_digests
+    ) as mock_compute_digests:
+        verify_checksums(
+            {
+                file_dict["check_file"]: {"sha512": file_dict["sha_file"]}
+                for file_dict in check_sum_files
+            },
+            workers=1,
+            fail_fast=True,
+        )
+    mock_compute_digests.assert_called_once()
+    assert [invalid["file"] for invalid in invalid_checksums] == [
+        check_sum_files[0]["sha_file"]
+    ]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_verify_checksums_fail_fast_parallel(tmp_path, executor):
+    invalid_checksums.clear()
+    check_sum_files = write_artifacts(str(tmp_path), 8)
+    for file_dict in check_sum_files:
+        with open(file_dict["check_file"], "ab") as data_file:
+            data_file.write(b"tampered")
+
+    verify_checksums(
+        {
+            file_dict["check_file"]: {"sha512": file_dict["sha_file"]}
+            for file_dict in check_sum_files
+        },
+        workers=2,
+        executor=executor,
+        fail_fast=True,
+    )
+    assert len(invalid_checksums) == 1
+
+
+def test_verify_checksums_fail_fast_passes(tmp_path):
+    invalid_checksums.clear()
+    write_artifacts(str(tmp_path), 8)
+    os.chdir(tmp_path)
+    check_sum_config = [
+        {
+            "id": "checksum",
+            "description": "sha512",
+            "algorithm": "sha512",
+            "workers": 4,
+            "fail_fast": True,
+        }
+    ]
+    validate_checksums(check_sum_config, sorted(os.listdir()))
+    assert not invalid_checksums
+
+
+@pytest.mark.parametrize("read_backend", ["mmap", "readinto"])
+def test_compute_digests_stops_when_cancelled(tmp_path, read_backend):
+    check_file = tmp_path / "apache_airflow-2.10.3.tar.gz"
+    check_file.write_bytes(os.urandom(DEFAULT_BUFFER_SIZE))
+    cancel_event = threading.Event()
+    cancel_event.set()
+
+    with pytest.raises(VerificationCancelled):
+        compute_digests(
+            str(check_file),
+            ["sha512"],
+            read_backend=read_backend,
+            cancel_event=cancel_event,
+        )
+
+
+def test_hash_with_readinto_stops_at_next_chunk(tmp_path):
+    check_file = tmp_path / "apache_airflow-2.10.3.tar.gz"
+    check_file.write_bytes(os.urandom(4 * 4096))
+    cancel_event = threading.Event()
+    digest = hashlib.sha512()
+
+    class CancellingHash:
+        chunks = 0
+
+        def update(self, data):
+            self.chunks += 1
+            digest.update(data)
+            cancel_event.set()
+
+    cancelling_hash = CancellingHash()
+    with open(check_file, "rb", buffering=0) as chk:
+        with pytest.raises(VerificationCancelled):
+            hash_with_readinto(chk, [cancelling_hash], 4096, cancel_event)
+    assert cancelling_hash.chunks == 1
+
+
+def test_verify_checksums_writes_manifest(tmp_path):
+    invalid_checksums.clear()
+    artifacts = tmp_path / "artifacts"
+    artifacts.mkdir()
+    check_sum_files = write_artifacts(str(artifacts), 3)
+    with open(check_sum_files[2]["check_file"], "ab") as data_file:
+        data_file.write(b"tampered")
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    checksum_tasks = {
+        file_dict["check_file"]: {"sha512": file_dict["sha_file"]}
+        for file_dict in check_sum_files
+    }
+
+    for run in ("first", "cached"):
+        with ManifestWriter(str(tmp_path / run)) as manifest:
+            verify_checksums(
+                checksum_tasks,
+                workers=1,
+                cache=cache,
+                manifest=manifest,
+                manifest_algorithms=["sha256"],
+            )
+        entries = load_manifest(manifest.path)
+        assert sorted(entries) == sorted(
+            os.path.basename(file_dict["check_file"]) for file_dict in check_sum_files[:2]
+        )
+        for file_dict in check_sum_files[:2]:
+            with open(file_dict["check_file"], "rb") as data_file:
+                data = data_file.read()
+            name = os.path.basename(file_dict["check_file"])
+            assert entries[name] == {
+                "name": name,
+                "size": len(data),
+                "digests": {
+                    "sha512": hashlib.sha512(data).hexdigest(),
+                    "sha256": hashlib.sha256(data).hexdigest(),
+                },
+            }
+
+
+@pytest.fixture(scope="module")
+def signing_key(tmp_path_factory):
+    gpg = gnupg.GPG(gnupghome=str(tmp_path_factory.mktemp("gnupg")))
+    key = gpg.gen_key(
+        gpg.gen_key_input(
+            name_email="release@apache.org",
+            passphrase="test",
+            key_type="EDDSA",
+            key_curve="ed25519",
+        )
+    )
+    return gpg, key.fingerprint
+
+
+def sign(signing_key, check_file, *extra_args):
+    gpg, fingerprint = signing_key
+    # Pass an open file, python-gnupg closes the files it opens before it finished reading them
+    with open(check_file, "rb") as data_file:
+        gpg.sign_file(
+            data_file,
+            keyid=fingerprint,
+            passphrase="test",
+            detach=True,
+            output=check_file + ".asc",
+            extra_args=list(extra_args),
+        )
+
+
+def write_sha512(check_file):
+    with open(check_file, "rb") as data_file:
+        digest = hashlib.file_digest(data_file, "sha512").hexdigest()
+    with open(check_file + ".sha512", "w") as sha_file:
+        sha_file.write(f"{digest} {os.path.basename(check_file)}")
+
+
+def write_signed_artifacts(path, signing_key):
+    """
+    Four signed artifacts: binary data with a binary signature, tampered after it was signed
+    (with a matching checksum), a text file signed as a text document, and without a checksum file
+    """
+    check_sum_files = write_artifacts(path, 3)
+    check_files = [file_dict["check_file"] for file_dict in check_sum_files]
+    check_files.append(os.path.join(path, "apache_airflow_providers_3-1.0.0.tar.gz"))
+    with open(check_files[3], "wb") as data_file:
+        data_file.write(os.urandom(1024))
+    # Fixed text, the text document signature covers the canonical text of the data
+    with open(check_files[2], "w") as data_file:
+        data_file.write("Apache Airflow providers\nrelease notes\n" * 64)
+    write_sha512(check_files[2])
+    for check_file in check_files:
+        sign(signing_key, check_file, *(["--textmode"] if check_file == check_files[2] else []))
+
+    with open(check_files[1], "ab") as data_file:
+        data_file.write(b"tampered")
+    write_sha512(check_files[1])
+
+    files = [file for file_dict in check_sum_files for file in file_dict.values()]
+    files += [check_file + ".asc" for check_file in check_files] + [check_files[3]]
+    return check_files, files
+
+
+@pytest.mark.parametrize("executor, workers", [("thread", 1), ("thread", 4), ("process", 4)])
+def test_validate_checksums_verifies_signatures(tmp_path, signing_key, executor, workers):
+    invalid_checksums.clear()
+    invalid_signature_files.clear()
+    check_files, files = write_signed_artifacts(str(tmp_path), signing_key)
+    keyring = Keyring.from_bytes(signing_key[0].export_keys(signing_key[1]).encode())
+
+    with ManifestWriter(str(tmp_path / "manifest")) as manifest:
+        validate_checksums(
+            [{"algorithm": "sha512", "workers": workers, "executor": executor}],
+            files,
+            manifest=manifest,
+            keyring=keyring,
+        )
+
+    assert invalid_checksums == []
+    assert invalid_signature_files == [
+        {
+            "file": check_files[1] + ".asc",
+            "status": False,
+            "problems": [{"status": "signature bad", "keyid": ANY}],
+        }
+    ]
+    assert sorted(load_manifest(manifest.path)) == [
+        os.path.basename(check_files[0]),
+        os.path.basename(check_files[2]),
+        os.path.basename(check_files[3]),
+    ]
+
+
+def test_validate_checksums_reads_signed_artifacts_once(tmp_path, signing_key):
+    invalid_checksums.clear()
+    invalid_signature_files.clear()
+    check_files, files = write_signed_artifacts(str(tmp_path), signing_key)
+    keyring = Keyring.from_bytes(signing_key[0].export_keys(signing_key[1]).encode())
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+
+    # Text documents are hashed as canonical text, they are read again by the verification, the
+    # other signed artifacts are read even when their checksums are cached
+    for expected_reads in ([1, 1, 2, 1], [1, 1, 1, 1]):
+        invalid_signature_files.clear()
+        with patch("builtins.open", wraps=open) as mock_open:
+            validate_checksums(
+                [{"algorithm": "sha512", "workers": 1}], files, cache=cache, keyring=keyring
+            )
+        reads = [call.args[0] for call in mock_open.call_args_list]
+        assert [reads.count(check_file) for check_file in check_files] == expected_reads
+        assert [error["file"] for error in invalid_signature_files] == [check_files[1] + ".asc"]
+
+
+def test_validate_checksums_reports_orphaned_signatures(tmp_path):
+    invalid_signature_files.clear()
+    validate_checksums(
+        [{"algorithm": "sha512"}], ["apache_airflow-2.10.3.tar.gz.asc"], keyring=Keyring([])
+    )
+    assert invalid_signature_files == [
+        {
+            "file": "apache_airflow-2.10.3.tar.gz.asc",
+            "status": False,
+            "problems": ["data file missing"],
+        }
+    ]
+
+
+def test_compute_digests_with_trailers(tmp_path):
+    check_file = tmp_path / "apache_airflow-2.10.3.tar.gz"
+    data = os.urandom(DEFAULT_BUFFER_SIZE + 17)
+    check_file.write_bytes(data)
+
+    digests = compute_digests(
+        str(check_file),
+        ["sha512"],
+        trailers={"first": ("sha512", b"trailer"), "second": ("sha256", b"other")},
+    )
+
+    assert digests == {
+        "sha512": hashlib.sha512(data).hexdigest(),
+        "first": hashlib.sha512(data + b"trailer").hexdigest(),
+        "second": hashlib.sha256(data + b"other").hexdigest(),
+    }
@@ -0,0 +1,211 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import annotations
+
+import hashlib
+import os
+from collections.abc import Iterable
+
+SIGNATURE_KIND = "asc"
+
+# Extensions of the companion files, the signature and a checksum file for every hashlib algorithm
+COMPANION_KINDS = frozenset(
+    {SIGNATURE_KIND}
+    | {algorithm.lower() for algorithm in hashlib.algorithms_available}
+)
+
+
+class ArtifactRecord:
+    """
+    A distribution file and its companion files, eg: file.tar.gz with file.tar.gz.asc and
+    file.tar.gz.sha512. A record is also created when only companions of the file are found,
+    exists is False in that case.
+    """
+
+    __slots__ = ("name", "exists", "companions")
+
+    def __init__(self, name: str, exists: bool = False):
+        self.name = name
+        self.exists = exists
+        # Companion file name by kind, eg: {"asc": "file.tar.gz.asc"}
+        self.companions: dict[str, str] = {}
+
+    def __repr__(self):
+        return f"ArtifactRecord({self.name!r}, exists={self.exists}, companions={self.companions})"
+
+
+class ArtifactIndex:
+    """
+    Index of the files of a release directory, every distribution grouped with its companions.
+
+    The index is built once from a single listing of the directory and answers all the lookups
+    of the checks from dictionaries, without scanning the directory or the list of files again.
+    The files are indexed by name, the checks open them with path(), relative to the directory.
+    """
+
+    __slots__ = (
+        "files",
+        "records",
+        "companion_of",
+        "companions_by_kind",
+        "companion_kinds",
+        "directory",
+    )
+
+    def __init__(
+        self,
+        files: Iterable[str],
+        companion_kinds: Iterable[str] = COMPANION_KINDS,
+        directory: str = ".",
+    ):
+        self.files: list[str] = list(files)
+        self.directory = directory
+        self.companion_kinds = frozenset(companion_kinds)
+        self.records: dict[str, ArtifactRecord] = {}
+        # (data file name, kind) by companion file name
+        self.companion_of: dict[str, tuple[str, str]] = {}
+        # Companion file names by kind, in the order of the files
+        self.companions_by_kind: dict[str, list[str]] = {}
+
+        for file in self.files:
+            record = self.records.get(file)
+            if record is None:
+                self.records[file] = ArtifactRecord(file, exists=True)
+            else:
+                record.exists = True
+
+            data_file, _, kind = file.rpartition(".")
+            if data_file and kind in self.companion_kinds:
+                record = self.records.get(data_file)
+                if record is None:
+                    record = self.records[data_file] = ArtifactRecord(data_file)
+                record.companions[kind] = file
+                self.companion_of[file] = (data_file, kind)
+                self.companions_by_kind.setdefault(kind, []).append(file)
+
+    @classmethod
+    def from_directory(
+        cls, path: str = ".", companion_kinds: Iterable[str] = COMPANION_KINDS
+    ) -> ArtifactIndex:
+        """
+        Build the index from a single scan of the directory, only regular files are indexed
+        """
+        with os.scandir(path) as entries:
+            return cls(
+                (entry.name for entry in entries if entry.is_file()), companion_kinds, path
+            )
+
+    def path(self, file: str) -> str:
+        """
+        Path of a file of the index, the name itself for the current directory
+        """
+        if self.directory == ".":
+            return file
+        return os.path.join(self.directory, file)
+
+    def __len__(self):
+        return len(self.files)
+
+    def __contains__(self, file: str) -> bool:
+        record = self.records.get(file)
+        return record is not None and record.exists
+
+    def get(self, file: str) -> ArtifactRecord | None:
+        return self.records.get(file)
+
+    def is_companion(self, file: str) -> bool:
+        return file in self.companion_of
+
+    def companion(self, file: str, kind: str) -> str | None:
+        record = self.records.get(file)
+        return record.companions.get(kind) if record else None
+
+    def with_companion(self, kind: str) -> list[tuple[str, str]]:
+        """
+        (companion file, data file) pairs of the given kind, in the order of the companion files
+        """
+        return [
+            (file, self.companion_of[file][0])
+            for file in self.companions_by_kind.get(kind, [])
+        ]
+
+    def subset(self, files: Iterable[str]) -> ArtifactIndex:
+        """
+        Index of the given files with the data files and companions they belong with, eg: to check
+        only the changed files, a changed signature brings its data file and the other companions
+        """
+        names = set()
+        for file in files:
+            data_file = self.companion_of[file][0] if file in self.companion_of else file
+            record = self.records.get(data_file)
+            if record is None:
+                continue
+            if record.exists:
+                names.add(data_file)
+            names.update(record.companions.values())
+        return ArtifactIndex(
+            [file for file in self.files if file in names], self.companion_kinds, self.directory
+        )
+
+    def data_files(self) -> list[str]:
+        """
+        Files that are not a companion of another file of the index
+        """
+        return [file for file in self.files if file not in self.companion_of]
+
+    def orphaned_companions(self, kind: str | None = None) -> list[str]:
+        """
+        Companion files whose data file is missing, eg: file.tar.gz.asc without file.tar.gz
+        """
+        return [
+            file
+            for file, (data_file, companion_kind) in self.companion_of.items()
+            if not self.records[data_file].exists
+            and (kind is None or companion_kind == kind)
+        ]
+
+    def missing_data_files(self) -> list[str]:
+        """
+        Data files referenced by companion files that are not in the index
+        """
+        return [
+            record.name
+            for record in self.records.values()
+            if not record.exists and record.companions
+        ]
+
+    def missing_companions(self, kind: str) -> list[str]:
+        """
+        Data files without a companion of the given kind, eg: file.tar.gz without file.tar.gz.sha512
+        """
+        return [
+            file
+            for file in self.data_files()
+            if kind not in self.records[file].companions
+        ]
+
+
+def load_changed_files(path: str | None) -> set[str] | None:
+    """
+    Names of the files changed since the last verified revision, listed one per line by the
+    fetch step, None when no list was given and every file must be checked
+    """
+    if not path:
+        return None
+    with open(path) as changed_files:
+        return {line.rstrip("\n") for line in changed_files if line.strip()}
@@ -0,0 +1,284 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Bundle of the dist folder for upload, built in a single streaming pass.
+
+The bundle is an uncompressed tar. Members that are already compressed, eg: wheels and sdists,
+are stored as they are, the other members are compressed with gzip in a pool of threads and
+stored with a .gz suffix, unless compressing them does not save anything. An index of the offset
+and size of the data of every member is written next to the bundle, so a single package can be
+read from the bundle with a seek, without reading the members before it. The index also holds
+the sha512 of every file, an extracted file is checked against it:
+
+    {"version": 2, "members": [
+    {"name": "file.whl", "member": "file.whl", "offset": 512, "size": 1024, "original_size": 1024,
+     "compression": "none", "sha512": "..."},
+    ...
+    ]}
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tarfile
+import tempfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from typing import Any
+
+BUNDLE_VERSION = 2
+BUNDLE_FILE_NAME = "dist-bundle.tar"
+INDEX_SUFFIX = ".index.json"
+
+NONE = "none"
+GZIP = "gzip"
+
+DEFAULT_COMPRESSION_LEVEL = 6
+
+CHUNK_SIZE = 2**20
+
+# Extensions of the files that are compressed already, compressing them again saves nothing
+COMPRESSED_EXTENSIONS = (
+    ".whl",
+    ".zip",
+    ".gz",
+    ".tgz",
+    ".bz2",
+    ".xz",
+    ".zst",
+    ".jar",
+)
+
+# Leading bytes of the compressed formats, for the files without a known extension
+COMPRESSED_MAGIC = (
+    b"\x1f\x8b",  # gzip
+    b"PK\x03\x04",  # zip, wheel
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"\x28\xb5\x2f\xfd",  # zstd
+)
+
+# A member is stored compressed only when it shrinks to this ratio of its size, or less
+MIN_COMPRESSION_RATIO = 0.95
+
+
+class BundleError(Exception):
+    pass
+
+
+class BundleMember:
+    """
+    A file of the bundle, with the offset and the size of its data in the bundle and the sha512
+    of the file
+    """
+
+    __slots__ = ("name", "member", "offset", "size", "original_size", "compression", "sha512")
+
+    def __init__(
+        self,
+        name: str,
+        member: str,
+        offset: int,
+        size: int,
+        original_size: int,
+        compression: str,
+        sha512: str,
+    ):
+        self.name = name
+        self.member = member
+        self.offset = offset
+        self.size = size
+        self.original_size = original_size
+        self.compression = compression
+        self.sha512 = sha512
+
+    def to_dict(self) -> dict[str, Any]:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __repr__(self):
+        return (
+            f"BundleMember({self.name!r}, offset={self.offset}, size={self.size}, "
+            f"compression={self.compression!r})"
+        )
+
+
+def index_path(bundle_path: str) -> str:
+    return bundle_path + INDEX_SUFFIX
+
+
+def is_compressed(path: str) -> bool:
+    """
+    Whether the file is compressed already, from its extension or its leading bytes
+    """
+    if path.endswith(COMPRESSED_EXTENSIONS):
+        return True
+    with open(path, "rb") as f:
+        head = f.read(8)
+    return head.startswith(COMPRESSED_MAGIC)
+
+
+def compress_file(path: str, level: int, directory: str) -> tuple[str | None, str]:
+    """
+    Compress the file with gzip into a temporary file, and hash it in the same read
+
+    :param path: path of the file
+    :param level: gzip compression level, from 1 to 9
+    :param directory: directory of the temporary file
+    :return: path of the compressed file, None when the file is compressed already or compressing
+        it does not save anything, and the sha512 of the file
+    """
+    digest = hashlib.sha512()
+    if is_compressed(path):
+        with open(path, "rb") as source:
+            while chunk := source.read(CHUNK_SIZE):
+                digest.update(chunk)
+        return None, digest.hexdigest()
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    with open(path, "rb") as source, tempfile.NamedTemporaryFile(
+        dir=directory, suffix=".gz", delete=False
+    ) as target:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+            target.write(compressor.compress(chunk))
+        target.write(compressor.flush())
+
+    if os.path.getsize(target.name) > os.path.getsize(path) * MIN_COMPRESSION_RATIO:
+        os.unlink(target.name)
+        return None, digest.hexdigest()
+    return target.name, digest.hexdigest()
+
+
+def write_bundle(
+    paths: list[str],
+    bundle_path: str,
+    level: int = DEFAULT_COMPRESSION_LEVEL,
+    workers: int | None = None,
+) -> list[BundleMember]:
+    """
+    Write the files into the bundle and its index, in the order of the paths
+
+    The files are compressed in a pool of threads, every member is appended to the bundle as soon
+    as it and the members before it are ready.
+
+    :param paths: paths of the files
+    :param bundle_path: path of the bundle, the index is written to index_path(bundle_path)
+    :param level: gzip compression level of the members that are not compressed already
+    :param workers: number of files compressed concurrently, the default of ThreadPoolExecutor
+    :return: the members of the bundle
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(bundle_path)), exist_ok=True)
+    members = []
+    with ExitStack() as stack:
+        temp_dir = stack.enter_context(
+            tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(bundle_path)))
+        )
+        tar = stack.enter_context(tarfile.open(bundle_path, "w", format=tarfile.PAX_FORMAT))
+        pool = stack.enter_context(ThreadPoolExecutor(max_workers=workers))
+        for path, (compressed_path, sha512) in zip(
+            paths, pool.map(partial(compress_file, level=level, directory=temp_dir), paths)
+        ):
+            name = os.path.basename(path)
+            data_path = compressed_path or path
+            member = name + ".gz" if compressed_path else name
+            info = tar.gettarinfo(data_path, arcname=member)
+            # The data follows the header, the header of a long name is longer than one block
+            offset = tar.offset + len(info.tobuf(tar.format, tar.encoding, tar.errors))
+            with open(data_path, "rb") as data:
+                tar.addfile(info, data)
+            members.append(
+                BundleMember(
+                    name,
+                    member,
+                    offset,
+                    info.size,
+                    os.path.getsize(path),
+                    GZIP if compressed_path else NONE,
+                    sha512,
+                )
+            )
+            if compressed_path:
+                os.unlink(compressed_path)
+
+    # One member per line, as the manifest
+    with open(index_path(bundle_path), "w") as index_file:
+        index_file.write(f'{{"version": {BUNDLE_VERSION}, "members": [\n')
+        index_file.write(",\n".join(json.dumps(member.to_dict()) for member in members))
+        index_file.write("\n]}\n")
+    return members
+
+
+def read_index(bundle_path: str) -> dict[str, BundleMember]:
+    """
+    Read the index of the bundle
+
+    :param bundle_path: path of the bundle
+    :return: members of the bundle by name
+    """
+    with open(index_path(bundle_path)) as index_file:
+        index = json.load(index_file)
+    if index.get("version") != BUNDLE_VERSION:
+        raise BundleError(f"Unsupported bundle index version in {index_path(bundle_path)}")
+    return {entry["name"]: BundleMember(**entry) for entry in index["members"]}
+
+
+def extract_member(bundle_path: str, member: BundleMember, target_dir: str) -> str:
+    """
+    Extract a file of the bundle, reading only its data from the bundle. The extracted file is
+    removed when it does not have the size and the sha512 of the index.
+
+    :param bundle_path: path of the bundle
+    :param member: the member of the file from the index
+    :param target_dir: directory the file is extracted to
+    :return: path of the extracted file
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    target_path = os.path.join(target_dir, os.path.basename(member.name))
+    decompressor = zlib.decompressobj(31) if member.compression == GZIP else None
+    digest = hashlib.sha512()
+    try:
+        with open(bundle_path, "rb") as bundle, open(target_path, "wb") as target:
+            bundle.seek(member.offset)
+            remaining = member.size
+            while remaining:
+                chunk = bundle.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise BundleError(f"Bundle {bundle_path} is truncated in {member.member}")
+                remaining -= len(chunk)
+                data = decompressor.decompress(chunk) if decompressor else chunk
+                digest.update(data)
+                target.write(data)
+            if decompressor:
+                data = decompressor.flush()
+                digest.update(data)
+                target.write(data)
+        if os.path.getsize(target_path) != member.original_size:
+            raise BundleError(f"Extracted {member.name} has not the size of the index")
+        if digest.hexdigest() != member.sha512:
+            raise BundleError(f"Extracted {member.name} has not the sha512 of the index")
+    except zlib.error as e:
+        os.unlink(target_path)
+        raise BundleError(f"Member {member.member} of {bundle_path} is not valid gzip: {e}") from e
+    except BundleError:
+        os.unlink(target_path)
+        raise
+    return target_path
@@ -0,0 +1,162 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from common.http import DEFAULT_TIMEOUT, create_session
+
+# Size of the reads of a response, the bytes of a read interrupted by a dropped connection
+# are lost and downloaded again, keep it small
+CHUNK_SIZE = 64 * 1024
+
+# Suffix of a file being downloaded, the download resumes from it
+PARTIAL_SUFFIX = ".part"
+
+DEFAULT_WORKERS = 8
+
+
+class DownloadError(Exception):
+    pass
+
+
+class DownloadResult:
+    """
+    Outcome of the download of a file, resumed is the number of bytes kept from a previous attempt
+    """
+
+    __slots__ = ("url", "path", "size", "resumed", "skipped")
+
+    def __init__(self, url: str, path: str, size: int, resumed: int = 0, skipped: bool = False):
+        self.url = url
+        self.path = path
+        self.size = size
+        self.resumed = resumed
+        self.skipped = skipped
+
+    def __repr__(self):
+        return (
+            f"DownloadResult({self.url!r}, {self.path!r}, size={self.size}, "
+            f"resumed={self.resumed}, skipped={self.skipped})"
+        )
+
+
+def complete_size(response: requests.Response, size: int | None) -> int | None:
+    """
+    Size of the file, the listed size or the size of the Content-Range header, eg: bytes */1024
+    """
+    if size is not None:
+        return size
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+def download_file(
+    session: requests.Session,
+    url: str,
+    path: str,
+    size: int | None = None,
+    attempts: int = 5,
+) -> DownloadResult:
+    """
+    Download a file, resuming an interrupted download with a Range request
+
+    The file is written to path + ".part" and renamed when complete, a partial file left by
+    a previous run or a dropped connection is continued from its size. A server that ignores
+    the Range header sends the whole file again, which is written from the start.
+
+    :param session: http session
+    :param url: url of the file
+    :param path: destination path
+    :param size: expected size, from the listing, a complete file of this size is not downloaded again
+    :param attempts: number of requests before giving up on a dropped connection
+    :return: DownloadResult
+    """
+    if size is not None and os.path.isfile(path) and os.path.getsize(path) == size:
+        return DownloadResult(url, path, size, skipped=True)
+
+    partial_path = path + PARTIAL_SUFFIX
+    resumed = 0
+    for attempt in range(attempts):
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        if size is not None and offset > size:
+            os.remove(partial_path)
+            offset = 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=DEFAULT_TIMEOUT) as response:
+                if response.status_code == 416 and offset and offset == complete_size(
+                    response, size
+                ):
+                    # The partial file is already complete
+                    break
+                if response.status_code == 206 and offset:
+                    mode = "ab"
+                    if attempt == 0:
+                        resumed = offset
+                elif response.status_code == 200:
+                    mode = "wb"
+                    resumed = 0
+                else:
+                    raise DownloadError(f"GET {url} failed with status {response.status_code}")
+                with open(partial_path, mode) as partial_file:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        partial_file.write(chunk)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            if attempt == attempts - 1:
+                raise DownloadError(f"GET {url} failed after {attempts} attempts") from None
+            continue
+
+        downloaded = os.path.getsize(partial_path)
+        if size is None or downloaded == size:
+            break
+        if downloaded > size:
+            raise DownloadError(f"{url} is larger than the listed size {size}")
+    else:
+        raise DownloadError(f"GET {url} failed after {attempts} attempts")
+
+    os.replace(partial_path, path)
+    return DownloadResult(url, path, os.path.getsize(path), resumed=resumed)
+
+
+def download_files(
+    files: list[tuple[str, str, int | None]],
+    workers: int | None = None,
+    session: requests.Session | None = None,
+) -> list[DownloadResult]:
+    """
+    Download files concurrently over a pool of connections
+
+    :param files: (url, destination path, expected size or None) of every file
+    :param workers: number of concurrent downloads
+    :param session: http session, a session with a connection pool of the size of workers
+        is created when not provided
+    :return: the results, in the order of the files
+    """
+    workers = workers or DEFAULT_WORKERS
+    session = session or create_session(pool_maxsize=workers)
+    for _, path, _ in files:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    if workers == 1 or len(files) <= 1:
+        return [download_file(session, url, path, size) for url, path, size in files]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda file: download_file(session, *file), files))
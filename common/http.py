@@ -0,0 +1,54 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds of every request
+DEFAULT_TIMEOUT = (10, 60)
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(
+    retries: int = 5, backoff_factor: float = 0.5, pool_maxsize: int = 10
+) -> requests.Session:
+    """
+    Create a session with a pool of connections, that retries failed requests with an
+    exponential backoff
+
+    :param retries: number of retries of a failed request
+    :param backoff_factor: the retries wait backoff_factor * 2 ** (retry - 1) seconds
+    :param pool_maxsize: number of connections kept open by host, set it to the number of
+        concurrent requests
+    :return: requests.Session
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=("GET", "HEAD", "PROPFIND"),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry, pool_connections=pool_maxsize, pool_maxsize=pool_maxsize
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
@@ -0,0 +1,113 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Manifest of the verified artifacts, written by the checksum check and read by the later steps.
+
+The json manifest is written one artifact per line, so it is streamed to disk while the artifacts
+are verified and can be read back line by line:
+
+    {"version": 1, "artifacts": [
+    {"name": "file.tar.gz", "size": 1024, "digests": {"sha512": "..."}},
+    ...
+    ]}
+
+Next to it a SHA512SUMS style file is written for every algorithm, eg: SHA512SUMS, SHA256SUMS.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from collections.abc import Iterator
+from typing import Any
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE_NAME = "verified-manifest.json"
+
+_HEADER = f'{{"version": {MANIFEST_VERSION}, "artifacts": [\n'
+_FOOTER = "]}\n"
+
+
+def sums_file_name(algorithm: str) -> str:
+    return f"{algorithm.upper()}SUMS"
+
+
+class ManifestWriter:
+    """
+    Streaming writer of the manifest, every artifact is written as soon as it is added,
+    nothing is kept in memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE_NAME)
+        self._manifest = None
+        self._sums_files: dict[str, Any] = {}
+        self._count = 0
+
+    def __enter__(self) -> ManifestWriter:
+        os.makedirs(self.directory, exist_ok=True)
+        self._manifest = open(self.path, "w")
+        self._manifest.write(_HEADER)
+        return self
+
+    def add(self, name: str, size: int, digests: dict[str, str]):
+        entry = json.dumps({"name": name, "size": size, "digests": digests})
+        self._manifest.write(f",\n{entry}" if self._count else entry)
+        self._count += 1
+
+        for algorithm, digest in digests.items():
+            sums_file = self._sums_files.get(algorithm)
+            if sums_file is None:
+                sums_file = self._sums_files[algorithm] = open(
+                    os.path.join(self.directory, sums_file_name(algorithm)), "w"
+                )
+            sums_file.write(f"{digest}  {name}\n")
+
+    def __exit__(self, *exc_info):
+        self._manifest.write(f"\n{_FOOTER}" if self._count else _FOOTER)
+        self._manifest.close()
+        for sums_file in self._sums_files.values():
+            sums_file.close()
+
+    @property
+    def sums_paths(self) -> list[str]:
+        return [sums_file.name for sums_file in self._sums_files.values()]
+
+
+def iter_manifest(path: str) -> Iterator[dict[str, Any]]:
+    """
+    Read the artifacts of the manifest one by one, without loading the whole manifest
+    """
+    with open(path) as manifest:
+        header = manifest.readline()
+        if json.loads(header.rstrip().removesuffix("[") + "[]}").get("version") != (
+            MANIFEST_VERSION
+        ):
+            raise ValueError(f"Unsupported manifest version in {path}")
+        for line in manifest:
+            line = line.rstrip().removesuffix(",")
+            if line and line != _FOOTER.strip():
+                yield json.loads(line)
+
+
+def load_manifest(path: str) -> dict[str, dict[str, Any]]:
+    """
+    Load the artifacts of the manifest by name
+    """
+    return {entry["name"]: entry for entry in iter_manifest(path)}
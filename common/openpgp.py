@@ -0,0 +1,871 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+In-process verification of detached OpenPGP signatures against a KEYS file.
+
+Only the subset of RFC 4880 / RFC 9580 used by release signatures is implemented: ASCII armor,
+v4 public keys and subkeys with their self-signatures, and v4 signatures made with RSA or
+Ed25519 (EdDSA) keys. Signatures made with anything else are reported as an error, never
+accepted.
+
+The statuses of the problems are the ones python-gnupg reports for the same gpg outcome, so the
+results of both verifiers can be reported and compared the same way.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import time
+from collections.abc import Iterator
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding, rsa
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from cryptography.hazmat.primitives.asymmetric.utils import Prehashed
+
+# Packet tags
+SIGNATURE_PACKET = 2
+PUBLIC_KEY_PACKET = 6
+USER_ID_PACKET = 13
+PUBLIC_SUBKEY_PACKET = 14
+
+# Public key algorithms: RSA (encrypt or sign), RSA sign only, EdDSA legacy and Ed25519
+RSA_ALGORITHMS = frozenset({1, 3})
+EDDSA_LEGACY = 22
+ED25519 = 27
+
+# 1.3.6.1.4.1.11591.15.1, the curve of the EdDSA legacy keys
+ED25519_OID = bytes.fromhex("2b06010401da470f01")
+
+# Hash algorithm id: (hashlib name, cryptography hash)
+HASH_ALGORITHMS = {
+    2: ("sha1", hashes.SHA1),
+    8: ("sha256", hashes.SHA256),
+    9: ("sha384", hashes.SHA384),
+    10: ("sha512", hashes.SHA512),
+    11: ("sha224", hashes.SHA224),
+}
+
+# Data signatures made with these hash algorithms are rejected, self-signatures of old keys still
+# use SHA-1 and are accepted
+WEAK_HASH_ALGORITHMS = frozenset({2})
+
+# Signature types
+BINARY_DOCUMENT = 0x00
+TEXT_DOCUMENT = 0x01
+CERTIFICATIONS = frozenset({0x10, 0x11, 0x12, 0x13})
+SUBKEY_BINDING = 0x18
+PRIMARY_KEY_BINDING = 0x19
+KEY_REVOCATION = 0x20
+SUBKEY_REVOCATION = 0x28
+
+# Signature subpackets
+SIGNATURE_CREATION_TIME = 2
+SIGNATURE_EXPIRATION_TIME = 3
+KEY_EXPIRATION_TIME = 9
+ISSUER_KEY_ID = 16
+PRIMARY_USER_ID = 25
+KEY_FLAGS = 27
+EMBEDDED_SIGNATURE = 32
+ISSUER_FINGERPRINT = 33
+
+CAN_SIGN = 0x02
+
+# Problem statuses, as reported by python-gnupg
+SIGNATURE_BAD = "signature bad"
+SIGNATURE_ERROR = "signature error"
+SIGNATURE_EXPIRED = "signature expired"
+NO_PUBLIC_KEY = "no public key"
+KEY_EXPIRED = "signing key has expired"
+KEY_REVOKED = "signing key was revoked"
+
+READ_SIZE = 2**20
+
+
+class OpenPGPError(ValueError):
+    """
+    Malformed or unsupported OpenPGP data
+    """
+
+
+class PacketReader:
+    """
+    Sequential reader of the fields of a packet, raises OpenPGPError instead of reading past the end
+    """
+
+    __slots__ = ("data", "offset")
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.offset = 0
+
+    def at_end(self) -> bool:
+        return self.offset >= len(self.data)
+
+    def read(self, length: int) -> bytes:
+        if self.offset + length > len(self.data):
+            raise OpenPGPError("Truncated OpenPGP packet")
+        value = self.data[self.offset : self.offset + length]
+        self.offset += length
+        return value
+
+    def byte(self) -> int:
+        return self.read(1)[0]
+
+    def integer(self, size: int) -> int:
+        return int.from_bytes(self.read(size), "big")
+
+    def mpi(self) -> bytes:
+        bits = self.integer(2)
+        return self.read((bits + 7) // 8)
+
+
+def dearmor(data: bytes) -> list[bytes]:
+    """
+    Binary content of all the ASCII armored blocks in data, or data itself when it is binary
+
+    The text around the blocks is skipped, the KEYS files list every key before its block. The
+    CRC24 line is ignored as allowed by RFC 9580, the content is authenticated by the signatures.
+    """
+    if data[:1] and data[0] & 0x80:
+        return [data]
+
+    blocks = []
+    block: list[str] | None = None
+    in_headers = False
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        line = line.strip()
+        if block is None:
+            if line.startswith("-----BEGIN PGP "):
+                block, in_headers = [], True
+        elif line.startswith("-----END PGP "):
+            try:
+                blocks.append(base64.b64decode("".join(block), validate=True))
+            except binascii.Error as e:
+                raise OpenPGPError(f"Invalid ASCII armor: {e}") from e
+            block = None
+        elif in_headers and (not line or ":" in line):
+            # The armor headers, eg: "Comment: ...", end with an empty line
+            in_headers = bool(line)
+        elif not line.startswith("="):
+            in_headers = False
+            block.append(line)
+    return blocks
+
+
+def iter_packets(data: bytes) -> Iterator[tuple[int, bytes]]:
+    """
+    Tag and body of all the packets in data, in both the old and the new packet format
+    """
+    reader = PacketReader(data)
+    while not reader.at_end():
+        header = reader.byte()
+        if not header & 0x80:
+            raise OpenPGPError(f"Invalid OpenPGP packet header {header:#04x}")
+        if header & 0x40:
+            yield header & 0x3F, read_new_format_body(reader)
+        else:
+            length_type = header & 0x03
+            if length_type == 3:
+                length = len(data) - reader.offset
+            else:
+                length = reader.integer(1 << length_type)
+            yield (header >> 2) & 0x0F, reader.read(length)
+
+
+def read_new_format_body(reader: PacketReader) -> bytes:
+    chunks = []
+    while True:
+        first = reader.byte()
+        if first < 192:
+            length = first
+        elif first < 224:
+            length = ((first - 192) << 8) + reader.byte() + 192
+        elif first == 255:
+            length = reader.integer(4)
+        else:
+            # Partial body length, another length follows the chunk
+            chunks.append(reader.read(1 << (first & 0x1F)))
+            continue
+        chunks.append(reader.read(length))
+        return b"".join(chunks)
+
+
+def iter_subpackets(data: bytes) -> Iterator[tuple[int, bytes]]:
+    reader = PacketReader(data)
+    while not reader.at_end():
+        first = reader.byte()
+        if first < 192:
+            length = first
+        elif first < 255:
+            length = ((first - 192) << 8) + reader.byte() + 192
+        else:
+            length = reader.integer(4)
+        body = reader.read(length)
+        if not body:
+            raise OpenPGPError("Empty OpenPGP signature subpacket")
+        # The top bit of the type is the critical flag
+        yield body[0] & 0x7F, body[1:]
+
+
+class PublicKey:
+    """
+    A v4 primary key or subkey of the KEYS file, with what its self-signatures say about it
+    """
+
+    __slots__ = (
+        "packet",
+        "fingerprint",
+        "key_id",
+        "algorithm",
+        "created",
+        "key",
+        "primary",
+        "username",
+        "expires",
+        "revoked",
+        "can_sign",
+        "cross_certified",
+        "self_signatures",
+    )
+
+    def __init__(self, packet: bytes, primary: PublicKey | None = None):
+        reader = PacketReader(packet)
+        version = reader.byte()
+        if version != 4:
+            raise OpenPGPError(f"Unsupported public key version {version}")
+        self.packet = packet
+        self.created = reader.integer(4)
+        self.algorithm = reader.byte()
+        self.key = read_public_key(self.algorithm, reader)
+        self.fingerprint = hashlib.sha1(self.hash_material()).hexdigest().upper()
+        self.key_id = self.fingerprint[-16:]
+        self.primary = primary
+        self.username: str | None = None
+        self.expires: int | None = None
+        self.revoked = False
+        self.can_sign = True
+        # A signing subkey must sign the primary key back, in the binding signature
+        self.cross_certified = False
+        # Verified certifications (primary key) or bindings (subkey), with the certified user id
+        self.self_signatures: list[tuple[Signature, bytes | None]] = []
+
+    def __repr__(self):
+        return f"PublicKey({self.fingerprint!r}, algorithm={self.algorithm})"
+
+    def hash_material(self) -> bytes:
+        return b"\x99" + len(self.packet).to_bytes(2, "big") + self.packet
+
+    def is_expired(self, now: float) -> bool:
+        return self.expires is not None and now >= self.expires
+
+    def apply_self_signatures(self):
+        """
+        Take the expiration, the capabilities and the user name from the newest self-signature
+        """
+        signature, _ = max(self.self_signatures, key=lambda item: item[0].created)
+        if signature.key_expires_after:
+            self.expires = self.created + signature.key_expires_after
+        self.can_sign = signature.key_flags is None or bool(signature.key_flags & CAN_SIGN)
+        if self.primary is not None:
+            primary_material = self.primary.hash_material()
+            self.cross_certified = any(
+                embedded.signature_type == PRIMARY_KEY_BINDING
+                and verify_self_signature(self, embedded, primary_material, self.hash_material())
+                for embedded in signature.embedded_signatures
+            )
+            # Like gpg, a subkey that did not sign the primary key back cannot sign
+            self.can_sign = self.can_sign and self.cross_certified
+        if self.primary is None:
+            # The user id flagged as primary, the most recently certified one otherwise
+            _, user_id = max(
+                self.self_signatures,
+                key=lambda item: (item[0].primary_user_id, item[0].created),
+            )
+            self.username = user_id.decode("utf-8", errors="replace")
+
+
+def read_public_key(algorithm: int, reader: PacketReader):
+    """
+    Key of a supported algorithm, None for the others so their signatures can be reported
+    """
+    if algorithm in RSA_ALGORITHMS:
+        modulus = int.from_bytes(reader.mpi(), "big")
+        exponent = int.from_bytes(reader.mpi(), "big")
+        return rsa.RSAPublicNumbers(exponent, modulus).public_key()
+    if algorithm == EDDSA_LEGACY:
+        oid = reader.read(reader.byte())
+        point = reader.mpi()
+        # The point is prefixed with 0x40, the native encoding follows
+        if oid == ED25519_OID and len(point) == 33 and point[0] == 0x40:
+            return Ed25519PublicKey.from_public_bytes(point[1:])
+        return None
+    if algorithm == ED25519:
+        return Ed25519PublicKey.from_public_bytes(reader.read(32))
+    return None
+
+
+class Signature:
+    """
+    A v4 signature packet, the subpackets used by the verification are parsed
+    """
+
+    __slots__ = (
+        "signature_type",
+        "algorithm",
+        "hash_algorithm",
+        "hashed_data",
+        "hash_prefix",
+        "values",
+        "created",
+        "expires_after",
+        "key_expires_after",
+        "issuer_key_id",
+        "issuer_fingerprint",
+        "primary_user_id",
+        "key_flags",
+        "embedded_signatures",
+    )
+
+    def __init__(self, packet: bytes):
+        reader = PacketReader(packet)
+        version = reader.byte()
+        if version != 4:
+            raise OpenPGPError(f"Unsupported signature version {version}")
+        self.signature_type = reader.byte()
+        self.algorithm = reader.byte()
+        self.hash_algorithm = reader.byte()
+        hashed_subpackets = reader.read(reader.integer(2))
+        # The signature hashes its packet from the version to the end of the hashed subpackets
+        self.hashed_data = packet[: reader.offset]
+        unhashed_subpackets = reader.read(reader.integer(2))
+        self.hash_prefix = reader.read(2)
+        if self.algorithm in RSA_ALGORITHMS:
+            self.values = (reader.mpi(),)
+        elif self.algorithm == EDDSA_LEGACY:
+            self.values = (reader.mpi(), reader.mpi())
+        elif self.algorithm == ED25519:
+            self.values = (reader.read(64),)
+        else:
+            self.values = ()
+
+        self.created = 0
+        self.expires_after = 0
+        self.key_expires_after = 0
+        self.issuer_key_id: str | None = None
+        self.issuer_fingerprint: str | None = None
+        self.primary_user_id = False
+        self.key_flags: int | None = None
+        self.embedded_signatures: list[Signature] = []
+        for subpacket_type, body in iter_subpackets(hashed_subpackets):
+            if subpacket_type == SIGNATURE_CREATION_TIME:
+                self.created = int.from_bytes(body, "big")
+            elif subpacket_type == SIGNATURE_EXPIRATION_TIME:
+                self.expires_after = int.from_bytes(body, "big")
+            elif subpacket_type == KEY_EXPIRATION_TIME:
+                self.key_expires_after = int.from_bytes(body, "big")
+            elif subpacket_type == PRIMARY_USER_ID:
+                self.primary_user_id = body[:1] != b"\x00"
+            elif subpacket_type == KEY_FLAGS:
+                self.key_flags = body[0] if body else 0
+            else:
+                self.read_any_area(subpacket_type, body)
+        # The issuer is only a hint to find the key, it is allowed in the unhashed area, and so is
+        # the embedded signature, it is signed by itself
+        for subpacket_type, body in iter_subpackets(unhashed_subpackets):
+            self.read_any_area(subpacket_type, body)
+
+    def read_any_area(self, subpacket_type: int, body: bytes):
+        if subpacket_type == EMBEDDED_SIGNATURE:
+            try:
+                self.embedded_signatures.append(Signature(body))
+            except OpenPGPError:
+                pass
+        else:
+            self.read_issuer(subpacket_type, body)
+
+    def read_issuer(self, subpacket_type: int, body: bytes):
+        if subpacket_type == ISSUER_KEY_ID and self.issuer_key_id is None:
+            self.issuer_key_id = body.hex().upper()
+        elif subpacket_type == ISSUER_FINGERPRINT and self.issuer_fingerprint is None:
+            # Key version followed by the fingerprint
+            self.issuer_fingerprint = body[1:].hex().upper()
+
+    @property
+    def key_id(self) -> str | None:
+        if self.issuer_fingerprint:
+            return self.issuer_fingerprint[-16:]
+        return self.issuer_key_id
+
+    def hash_context(self):
+        """
+        New hash of the algorithm of the signature, None when the algorithm is not supported
+        """
+        return hashlib.new(self.hash_name) if self.hash_name else None
+
+    @property
+    def hash_name(self) -> str | None:
+        algorithm = HASH_ALGORITHMS.get(self.hash_algorithm)
+        return algorithm[0] if algorithm else None
+
+    @property
+    def trailer(self) -> bytes:
+        """
+        Bytes hashed after the signed data
+        """
+        return self.hashed_data + b"\x04\xff" + len(self.hashed_data).to_bytes(4, "big")
+
+    def finish(self, context) -> bytes:
+        """
+        Digest of the signed data hashed in context, followed by the signature trailer
+        """
+        context.update(self.trailer)
+        return context.digest()
+
+    def is_issued_by(self, key: PublicKey) -> bool:
+        if self.issuer_fingerprint:
+            return self.issuer_fingerprint == key.fingerprint
+        return self.issuer_key_id in (None, key.key_id)
+
+
+def verify_digest(key: PublicKey, signature: Signature, digest: bytes) -> bool:
+    """
+    Check the signature of the digest with the key
+    """
+    if key.key is None or signature.algorithm != key.algorithm or not signature.values:
+        return False
+    if digest[:2] != signature.hash_prefix:
+        return False
+    try:
+        if key.algorithm in RSA_ALGORITHMS:
+            size = (key.key.key_size + 7) // 8
+            key.key.verify(
+                signature.values[0].rjust(size, b"\x00"),
+                digest,
+                padding.PKCS1v15(),
+                Prehashed(HASH_ALGORITHMS[signature.hash_algorithm][1]()),
+            )
+        elif key.algorithm == EDDSA_LEGACY:
+            r, s = signature.values
+            key.key.verify(r.rjust(32, b"\x00") + s.rjust(32, b"\x00"), digest)
+        else:
+            key.key.verify(signature.values[0], digest)
+    except InvalidSignature:
+        return False
+    return True
+
+
+def verify_self_signature(key: PublicKey, signature: Signature, *parts: bytes) -> bool:
+    context = signature.hash_context()
+    if context is None or not signature.is_issued_by(key):
+        return False
+    for part in parts:
+        context.update(part)
+    return verify_digest(key, signature, signature.finish(context))
+
+
+def read_keys(data: bytes) -> list[PublicKey]:
+    """
+    Primary keys and subkeys of a KEYS file that are bound by a valid self-signature
+
+    Keys of unsupported versions and the rest of a malformed block are skipped, like gpg does on
+    import; signatures made with them are reported as made by an unknown key.
+    """
+    keys = []
+    for block in dearmor(data):
+        primary = subkey = user_id = None
+        try:
+            for tag, body in iter_packets(block):
+                if tag == PUBLIC_KEY_PACKET:
+                    primary = subkey = user_id = None
+                    primary = PublicKey(body)
+                    keys.append(primary)
+                elif primary is None:
+                    continue
+                elif tag == PUBLIC_SUBKEY_PACKET:
+                    subkey = user_id = None
+                    subkey = PublicKey(body, primary)
+                    keys.append(subkey)
+                elif tag == USER_ID_PACKET:
+                    subkey, user_id = None, body
+                elif tag == SIGNATURE_PACKET:
+                    apply_signature(primary, subkey, user_id, Signature(body))
+        except OpenPGPError:
+            continue
+
+    bound_keys = []
+    for key in keys:
+        if key.self_signatures and (key.primary is None or key.primary.self_signatures):
+            key.apply_self_signatures()
+            bound_keys.append(key)
+    return bound_keys
+
+
+def apply_signature(
+    primary: PublicKey, subkey: PublicKey | None, user_id: bytes | None, signature: Signature
+):
+    primary_material = primary.hash_material()
+    if user_id is not None and signature.signature_type in CERTIFICATIONS:
+        certified = b"\xb4" + len(user_id).to_bytes(4, "big") + user_id
+        if verify_self_signature(primary, signature, primary_material, certified):
+            primary.self_signatures.append((signature, user_id))
+    elif subkey is not None and signature.signature_type == SUBKEY_BINDING:
+        if verify_self_signature(primary, signature, primary_material, subkey.hash_material()):
+            subkey.self_signatures.append((signature, None))
+    elif subkey is not None and signature.signature_type == SUBKEY_REVOCATION:
+        if verify_self_signature(primary, signature, primary_material, subkey.hash_material()):
+            subkey.revoked = True
+    elif signature.signature_type == KEY_REVOCATION:
+        if verify_self_signature(primary, signature, primary_material):
+            primary.revoked = True
+
+
+def encode_packet(tag: int, body: bytes) -> bytes:
+    """
+    Packet in the new format, with a one, two or five byte length
+    """
+    length = len(body)
+    if length < 192:
+        header = bytes([length])
+    elif length < 8384:
+        length -= 192
+        header = bytes([(length >> 8) + 192, length & 0xFF])
+    else:
+        header = b"\xff" + length.to_bytes(4, "big")
+    return bytes([0xC0 | tag]) + header + body
+
+
+class KeyIndex:
+    """
+    The transferable public keys of a KEYS file indexed by the fingerprints and key ids of their
+    primary keys and subkeys, to export the keys of the issuers of some signatures only.
+
+    Nothing is verified here, the index only selects packets. Keys that can not be indexed, eg:
+    of a newer version, are always exported, their signatures are left to the verifier.
+    """
+
+    __slots__ = ("keys", "by_fingerprint", "by_key_id", "unindexed")
+
+    def __init__(self, data: bytes):
+        # Packets of every transferable key, from its primary key to the next one
+        self.keys: list[list[bytes]] = []
+        self.by_fingerprint: dict[str, int] = {}
+        self.by_key_id: dict[str, set[int]] = {}
+        self.unindexed: set[int] = set()
+        for block in dearmor(data):
+            for tag, body in iter_packets(block):
+                if tag == PUBLIC_KEY_PACKET:
+                    self.keys.append([])
+                elif not self.keys:
+                    continue
+                index = len(self.keys) - 1
+                self.keys[index].append(encode_packet(tag, body))
+                if tag in (PUBLIC_KEY_PACKET, PUBLIC_SUBKEY_PACKET):
+                    self.add(index, body)
+
+    @classmethod
+    def from_file(cls, path: str) -> KeyIndex:
+        with open(path, "rb") as keys_file:
+            return cls(keys_file.read())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, index: int, body: bytes):
+        if body[:1] != b"\x04":
+            self.unindexed.add(index)
+            return
+        fingerprint = hashlib.sha1(
+            b"\x99" + len(body).to_bytes(2, "big") + body
+        ).hexdigest().upper()
+        self.by_fingerprint[fingerprint] = index
+        self.by_key_id.setdefault(fingerprint[-16:], set()).add(index)
+
+    def find(self, signature: Signature) -> set[int]:
+        """
+        Keys that may have made the signature, empty when the issuer is not in the KEYS file
+        """
+        if signature.issuer_fingerprint:
+            index = self.by_fingerprint.get(signature.issuer_fingerprint)
+            return {index} if index is not None else set()
+        return self.by_key_id.get(signature.issuer_key_id, set())
+
+    def export(self, indexes: set[int]) -> bytes:
+        """
+        The selected keys and the keys that could not be indexed, as binary OpenPGP packets
+        """
+        return b"".join(
+            packet
+            for index, packets in enumerate(self.keys)
+            if index in indexes or index in self.unindexed
+            for packet in packets
+        )
+
+
+def read_signatures(data: bytes) -> list[Signature]:
+    """
+    The signatures of a detached signature file, armored or binary
+    """
+    signatures = [
+        Signature(body)
+        for block in dearmor(data)
+        for tag, body in iter_packets(block)
+        if tag == SIGNATURE_PACKET
+    ]
+    if not signatures:
+        raise OpenPGPError("No OpenPGP signature found")
+    return signatures
+
+
+def canonical_text(data: bytes) -> bytes:
+    """
+    Data as hashed by the signatures of text documents, canonicalized line by line like gpg does:
+    the trailing <CR> and <LF> of every line are stripped, and NUL bytes too as gpg looks them up
+    with strchr, then the lines that ended with <LF> end with <CR><LF>. The last line without
+    <LF> is stripped the same way.
+    """
+    lines = data.split(b"\n")
+    last_line = lines.pop()
+    return b"".join(line.rstrip(b"\r\x00") + b"\r\n" for line in lines) + last_line.rstrip(
+        b"\r\x00"
+    )
+
+
+def weak_signature(signature_path: str) -> Verification | None:
+    """
+    Error of a signature file with a signature made with a weak hash algorithm, None otherwise.
+    gpg verifies such signatures unless told about the weak algorithm, this rejects them before
+    the file is handed to gpg, the same as the native verification does.
+    """
+    try:
+        with open(signature_path, "rb") as signature_file:
+            signatures = read_signatures(signature_file.read())
+    except (OSError, OpenPGPError):
+        return None
+    for signature in signatures:
+        if signature.hash_algorithm in WEAK_HASH_ALGORITHMS:
+            return Verification(False, SIGNATURE_ERROR, key_id=signature.key_id)
+    return None
+
+
+class Verification:
+    """
+    Outcome of the verification of a signature file, with the attributes of gnupg.Verify used
+    by the checks
+    """
+
+    __slots__ = ("valid", "status", "key_id", "fingerprint", "username", "problems")
+
+    def __init__(
+        self,
+        valid: bool,
+        status: str,
+        key: PublicKey | None = None,
+        key_id: str | None = None,
+    ):
+        self.valid = valid
+        self.status = status
+        self.key_id = key.key_id if key else key_id
+        self.fingerprint = key.fingerprint if key else None
+        self.username = (key.primary or key).username if key else None
+        self.problems: list[dict[str, str | None]] = []
+        if not valid:
+            self.problems.append({"status": status, "keyid": self.key_id})
+
+    def __bool__(self):
+        return self.valid
+
+    def __repr__(self):
+        return f"Verification(valid={self.valid}, status={self.status!r}, key_id={self.key_id!r})"
+
+
+class Keyring:
+    """
+    The signing keys of a KEYS file, indexed by fingerprint and key id
+    """
+
+    __slots__ = ("keys", "keys_by_fingerprint", "keys_by_key_id")
+
+    def __init__(self, keys: list[PublicKey]):
+        self.keys = keys
+        self.keys_by_fingerprint = {key.fingerprint: key for key in keys}
+        self.keys_by_key_id: dict[str, list[PublicKey]] = {}
+        for key in keys:
+            self.keys_by_key_id.setdefault(key.key_id, []).append(key)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Keyring:
+        return cls(read_keys(data))
+
+    @classmethod
+    def from_file(cls, path: str) -> Keyring:
+        with open(path, "rb") as keys_file:
+            return cls.from_bytes(keys_file.read())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, signature: Signature) -> list[PublicKey]:
+        if signature.issuer_fingerprint:
+            key = self.keys_by_fingerprint.get(signature.issuer_fingerprint)
+            return [key] if key else []
+        if signature.issuer_key_id:
+            return self.keys_by_key_id.get(signature.issuer_key_id, [])
+        # Without an issuer subpacket any key may have made the signature
+        return self.keys
+
+    def verify_file(
+        self, signature_path: str, data_path: str, now: float | None = None
+    ) -> Verification:
+        """
+        Verify the detached signature file of data_path
+
+        The data file is read once, whatever the number of signatures in the signature file, and
+        all the signatures must be valid.
+
+        :param signature_path: path of the .asc (or binary .sig) file
+        :param data_path: path of the signed file
+        :param now: time to check the expiration of keys and signatures against, defaults to now
+        :return: Verification of the first invalid signature, or of the last one when all are valid
+        """
+        try:
+            with open(signature_path, "rb") as signature_file:
+                signatures = read_signatures(signature_file.read())
+        except (OSError, OpenPGPError):
+            return Verification(False, SIGNATURE_ERROR)
+
+        contexts = {}
+        for signature in signatures:
+            context = signature.hash_context()
+            if context is not None:
+                contexts[(signature.hash_algorithm, signature.signature_type)] = context
+        with open(data_path, "rb") as data_file:
+            if any(signature_type == TEXT_DOCUMENT for _, signature_type in contexts):
+                data = data_file.read()
+                for (_, signature_type), context in contexts.items():
+                    context.update(canonical_text(data) if signature_type == TEXT_DOCUMENT else data)
+            else:
+                while chunk := data_file.read(READ_SIZE):
+                    for context in contexts.values():
+                        context.update(chunk)
+
+        verification = None
+        for signature in signatures:
+            context = contexts.get((signature.hash_algorithm, signature.signature_type))
+            verification = self.check(signature, context, now)
+            if not verification.valid:
+                break
+        return verification
+
+    def check(self, signature: Signature, context, now: float | None = None) -> Verification:
+        """
+        Check a data signature, context holds the hash of the data and is left untouched, the
+        signatures with the same hash algorithm and signature type share it
+        """
+        if context is None:
+            return Verification(False, SIGNATURE_ERROR, key_id=signature.key_id)
+        return self.check_digest(signature, signature.finish(context.copy()), now)
+
+    def check_digest(
+        self, signature: Signature, digest: bytes, now: float | None = None
+    ) -> Verification:
+        """
+        Check a data signature against the digest of the data followed by the signature trailer
+        """
+        if signature.signature_type not in (BINARY_DOCUMENT, TEXT_DOCUMENT):
+            return Verification(False, SIGNATURE_ERROR, key_id=signature.key_id)
+        if signature.hash_algorithm in WEAK_HASH_ALGORITHMS:
+            return Verification(False, SIGNATURE_ERROR, key_id=signature.key_id)
+        keys = self.lookup(signature)
+        if not keys:
+            return Verification(False, NO_PUBLIC_KEY, key_id=signature.key_id)
+        key = next((key for key in keys if verify_digest(key, signature, digest)), None)
+        if key is None:
+            if any(key.key is None for key in keys):
+                return Verification(False, SIGNATURE_ERROR, keys[0])
+            return Verification(False, SIGNATURE_BAD, keys[0])
+
+        now = time.time() if now is None else now
+        primary = key.primary or key
+        if key.revoked or primary.revoked:
+            return Verification(False, KEY_REVOKED, key)
+        if key.is_expired(now) or primary.is_expired(now):
+            return Verification(False, KEY_EXPIRED, key)
+        if signature.expires_after and now >= signature.created + signature.expires_after:
+            return Verification(False, SIGNATURE_EXPIRED, key)
+        if not key.can_sign:
+            return Verification(False, SIGNATURE_ERROR, key)
+        return Verification(True, "signature valid", key)
+
+
+class SignatureFile:
+    """
+    The signatures of a detached signature file, checked from digests computed by the reader of
+    the data file. The checksum verification feeds the chunks of every artifact to its checksum
+    hashes and to the signature hashes, and the artifact is read once for both.
+    """
+
+    __slots__ = ("path", "signatures", "error")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.signatures: list[Signature] = []
+        self.error: str | None = None
+        try:
+            with open(path, "rb") as signature_file:
+                self.signatures = read_signatures(signature_file.read())
+        except (OSError, OpenPGPError) as e:
+            self.error = str(e)
+
+    @property
+    def fusable(self) -> bool:
+        """
+        The signatures can be checked from the raw data, text documents hash canonical text
+        """
+        return self.error is None and all(
+            signature.signature_type == BINARY_DOCUMENT and signature.hash_name
+            for signature in self.signatures
+        )
+
+    def trailers(self) -> dict[str, tuple[str, bytes]]:
+        """
+        Hash algorithm and trailer of every signature, by a label unique across signature files
+        """
+        return {
+            f"{self.path}#{index}": (signature.hash_name, signature.trailer)
+            for index, signature in enumerate(self.signatures)
+        }
+
+    def verify(
+        self, keyring: Keyring, digests: dict[str, str], now: float | None = None
+    ) -> Verification:
+        """
+        Check all the signatures, digests holds the hex digest of every label of trailers()
+        """
+        if self.error is not None:
+            return Verification(False, SIGNATURE_ERROR)
+        verification = None
+        for index, signature in enumerate(self.signatures):
+            digest = bytes.fromhex(digests[f"{self.path}#{index}"])
+            verification = keyring.check_digest(signature, digest, now)
+            if not verification.valid:
+                break
+        return verification
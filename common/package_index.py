@@ -0,0 +1,207 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Files of a release already published to a package index, from the PEP 691 JSON simple index.
+
+The simple index of every distinct project of the release is queried once, concurrently, through
+a pool of connections. The responses are cached with their ETag and revalidated with a conditional
+request, an unchanged project page is not downloaded again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import requests
+from packaging.utils import canonicalize_name
+
+from common.http import DEFAULT_TIMEOUT, create_session
+from common.package_metadata import MetadataError, is_package, parse_filename
+from common.verification_cache import VerificationCache
+
+DEFAULT_INDEX_URL = "https://pypi.org/simple/"
+
+SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+
+CACHE_FILE_NAME = "index-cache.json"
+
+DEFAULT_WORKERS = 8
+
+
+class PackageIndexError(Exception):
+    pass
+
+
+class PublishedDiff:
+    """
+    Packages of the release already in the index with the same sha256, packages whose file
+    name is in the index with another sha256, the index rejects their upload, and packages whose
+    file name is in the index without a sha256 to compare with
+    """
+
+    __slots__ = ("published", "conflicts", "without_sha256")
+
+    def __init__(
+        self, published: list[str], conflicts: list[str], without_sha256: list[str] | None = None
+    ):
+        self.published = published
+        self.conflicts = conflicts
+        self.without_sha256 = without_sha256 or []
+
+    def __repr__(self):
+        return (
+            f"PublishedDiff(published={self.published}, conflicts={self.conflicts}, "
+            f"without_sha256={self.without_sha256})"
+        )
+
+
+def project_url(index_url: str, project: str) -> str:
+    return f"{index_url.rstrip('/')}/{canonicalize_name(project)}/"
+
+
+def parse_project_files(data: dict[str, Any], url: str) -> dict[str, str | None]:
+    """
+    sha256 of the files of a PEP 691 project page by file name, None when the index has no sha256
+    """
+    files = data.get("files")
+    if not isinstance(files, list):
+        raise PackageIndexError(f"Invalid simple index response from {url}")
+    return {
+        file["filename"]: (file.get("hashes") or {}).get("sha256")
+        for file in files
+        if isinstance(file, dict) and "filename" in file
+    }
+
+
+def fetch_project_files(
+    session: requests.Session,
+    index_url: str,
+    project: str,
+    cache: VerificationCache | None = None,
+) -> dict[str, str | None]:
+    """
+    Files of a project published to the index, revalidated with the ETag of the cached response
+
+    :param session: http session
+    :param index_url: url of the simple index, eg: https://pypi.org/simple/
+    :param project: name of the project
+    :param cache: cache of the responses
+    :return: sha256 of the published files by file name, empty for a project not in the index
+    """
+    url = project_url(index_url, project)
+    cached = cache.get(f"index:{url}") if cache is not None else None
+    headers = {"Accept": SIMPLE_JSON_CONTENT_TYPE}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+
+    try:
+        response = session.get(url, headers=headers, timeout=DEFAULT_TIMEOUT)
+    except requests.RequestException as e:
+        raise PackageIndexError(f"Cannot query {url}: {e}") from e
+    if response.status_code == 304 and cached:
+        return cached["files"]
+    if response.status_code == 404:
+        return {}
+    if response.status_code != 200:
+        raise PackageIndexError(f"Cannot query {url}: HTTP {response.status_code}")
+    if not response.headers.get("Content-Type", "").startswith(SIMPLE_JSON_CONTENT_TYPE):
+        raise PackageIndexError(f"{url} is not a PEP 691 JSON simple index")
+
+    try:
+        files = parse_project_files(response.json(), url)
+    except ValueError as e:
+        raise PackageIndexError(f"Invalid simple index response from {url}: {e}") from e
+    if cache is not None and response.headers.get("ETag"):
+        cache.set(f"index:{url}", {"etag": response.headers["ETag"], "files": files})
+    return files
+
+
+def sha256_digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def published_diff(
+    paths: list[str],
+    index_url: str = DEFAULT_INDEX_URL,
+    workers: int = DEFAULT_WORKERS,
+    cache: VerificationCache | None = None,
+    digests: dict[str, str] | None = None,
+) -> PublishedDiff:
+    """
+    Compare the packages of the release with the files published to the index, by file name and
+    sha256. The files that are not wheels or sdists are never published to the index and skipped.
+
+    :param paths: paths of the files of the release
+    :param index_url: url of the simple index
+    :param workers: number of projects queried and packages hashed concurrently
+    :param cache: cache of the index responses
+    :param digests: sha256 of the packages by path, eg: from the verified manifest, the other
+        packages are hashed only when their file name is published
+    :return: the published packages, the conflicts and the packages published without a sha256,
+        sorted by path
+    """
+    projects: dict[str, list[str]] = {}
+    for path in paths:
+        if not is_package(path):
+            continue
+        try:
+            project = canonicalize_name(parse_filename(path).name)
+        except MetadataError:
+            continue
+        projects.setdefault(project, []).append(path)
+
+    digests = dict(digests or {})
+    with ThreadPoolExecutor(max_workers=workers) as pool, create_session(
+        pool_maxsize=workers
+    ) as session:
+        project_files = dict(
+            zip(
+                projects,
+                pool.map(
+                    lambda project: fetch_project_files(session, index_url, project, cache),
+                    projects,
+                ),
+            )
+        )
+        # sha256 of the index by path, for the packages whose file name is published
+        candidates = {
+            path: project_files[project][os.path.basename(path)]
+            for project, project_paths in projects.items()
+            for path in project_paths
+            if os.path.basename(path) in project_files[project]
+        }
+        to_hash = [
+            path
+            for path, published_sha256 in candidates.items()
+            if path not in digests and published_sha256 is not None
+        ]
+        digests.update(zip(to_hash, pool.map(sha256_digest, to_hash)))
+
+    published, conflicts, without_sha256 = [], [], []
+    for path, published_sha256 in sorted(candidates.items()):
+        if published_sha256 is None:
+            without_sha256.append(path)
+        elif published_sha256 == digests[path]:
+            published.append(path)
+        else:
+            conflicts.append(path)
+    return PublishedDiff(published, conflicts, without_sha256)
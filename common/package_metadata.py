@@ -0,0 +1,266 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Name and version of the wheels and sdists read from their metadata, without extracting them.
+
+The METADATA of a wheel is found in the central directory of the zip and only that member is
+read. The PKG-INFO of an sdist is read from the stream of tar headers, the archive is decompressed
+up to that member only. Only the headers of the metadata are parsed, the description is never read.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import tarfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesHeaderParser
+from typing import IO, Any
+
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+from common.verification_cache import VerificationCache
+
+CACHE_FILE_NAME = "metadata-cache.json"
+
+WHEEL_EXTENSION = ".whl"
+SDIST_EXTENSIONS = (".tar.gz", ".zip")
+
+WHEEL_METADATA = re.compile(r"^[^/]+\.dist-info/METADATA$")
+SDIST_METADATA = re.compile(r"^[^/]+/PKG-INFO$")
+
+# The headers of a metadata file are a few KB, a larger header is not a metadata file
+MAX_HEADER_SIZE = 2**20
+
+
+class MetadataError(Exception):
+    pass
+
+
+class PackageMetadata:
+    """
+    Name and version of a package, from its file name or from its metadata
+    """
+
+    __slots__ = ("name", "version")
+
+    def __init__(self, name: str, version: str):
+        self.name = name
+        self.version = version
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"name": self.name, "version": self.version}
+
+    def matches(self, other: PackageMetadata) -> bool:
+        """
+        Whether both are the same package, with the names and the versions normalized
+        """
+        try:
+            same_version = Version(self.version) == Version(other.version)
+        except InvalidVersion:
+            same_version = self.version == other.version
+        return canonicalize_name(self.name) == canonicalize_name(other.name) and same_version
+
+    def __repr__(self):
+        return f"PackageMetadata({self.name!r}, {self.version!r})"
+
+
+def is_package(path: str) -> bool:
+    return path.endswith((WHEEL_EXTENSION, *SDIST_EXTENSIONS))
+
+
+def parse_filename(path: str) -> PackageMetadata:
+    """
+    Name and version of the package from its file name
+
+    :param path: path of the wheel or sdist
+    :return: the name and the version in the file name
+    """
+    file_name = os.path.basename(path)
+    if file_name.endswith(WHEEL_EXTENSION):
+        # name-version(-build)?-python-abi-platform.whl
+        parts = file_name[: -len(WHEEL_EXTENSION)].split("-")
+        if len(parts) not in (5, 6):
+            raise MetadataError(f"{file_name} is not a valid wheel file name")
+        name, version = parts[0], parts[1]
+    else:
+        extension = next(ext for ext in SDIST_EXTENSIONS if file_name.endswith(ext))
+        name, _, version = file_name[: -len(extension)].rpartition("-")
+
+    try:
+        Version(version)
+    except InvalidVersion:
+        raise MetadataError(f"{file_name} has no valid version in its file name")
+    if not name:
+        raise MetadataError(f"{file_name} has no name in its file name")
+    return PackageMetadata(name, version)
+
+
+def read_headers(stream: IO[bytes], source: str) -> PackageMetadata:
+    """
+    Parse the headers of a metadata file, up to the blank line before the description
+
+    :param stream: the metadata file
+    :param source: path of the metadata in the package, for the errors
+    :return: the name and the version of the metadata
+    """
+    lines = []
+    size = 0
+    for line in stream:
+        if line in (b"\n", b"\r\n"):
+            break
+        size += len(line)
+        if size > MAX_HEADER_SIZE:
+            raise MetadataError(f"{source} headers are larger than {MAX_HEADER_SIZE} bytes")
+        lines.append(line)
+
+    headers = BytesHeaderParser().parsebytes(b"".join(lines))
+    name, version = headers.get("Name"), headers.get("Version")
+    if not name or not version:
+        raise MetadataError(f"{source} has no Name or Version")
+    return PackageMetadata(name.strip(), version.strip())
+
+
+def read_zip_metadata(path: str, pattern: re.Pattern) -> PackageMetadata:
+    with zipfile.ZipFile(path) as archive:
+        member = next((name for name in archive.namelist() if pattern.match(name)), None)
+        if member is None:
+            raise MetadataError(f"{os.path.basename(path)} has no metadata file")
+        with archive.open(member) as stream:
+            return read_headers(stream, member)
+
+
+def read_tar_metadata(path: str) -> PackageMetadata:
+    # Streaming mode, the members after PKG-INFO are never decompressed
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if member.isfile() and SDIST_METADATA.match(member.name):
+                return read_headers(archive.extractfile(member), member.name)
+    raise MetadataError(f"{os.path.basename(path)} has no PKG-INFO file")
+
+
+def read_package_metadata(path: str) -> PackageMetadata:
+    """
+    Name and version of the package from its metadata, without extracting the package
+
+    :param path: path of the wheel or sdist
+    :return: the name and the version of the metadata
+    """
+    try:
+        if path.endswith(WHEEL_EXTENSION):
+            return read_zip_metadata(path, WHEEL_METADATA)
+        if path.endswith(".zip"):
+            return read_zip_metadata(path, SDIST_METADATA)
+        return read_tar_metadata(path)
+    except (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError) as e:
+        raise MetadataError(f"{os.path.basename(path)} cannot be read: {e}")
+
+
+def metadata_cache_key(path: str, digest: str | None) -> str:
+    """
+    Key of the metadata in the cache, the digest of the package when it is known,
+    otherwise the identity of the file on disk
+    """
+    if digest:
+        return f"metadata:sha512:{digest}"
+    stat = os.stat(path)
+    return f"metadata:{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
+
+
+def index_package_metadata(
+    paths: list[str],
+    workers: int | None = None,
+    cache: VerificationCache | None = None,
+    digests: dict[str, str] | None = None,
+) -> tuple[dict[str, PackageMetadata], dict[str, str]]:
+    """
+    Read the metadata of the packages in a pool of threads, the packages in the cache are not read
+
+    :param paths: paths of the wheels and sdists
+    :param workers: number of packages read concurrently, the default of ThreadPoolExecutor
+    :param cache: cache of the metadata, updated with the packages read
+    :param digests: sha512 of the packages by path, eg: from the verified manifest
+    :return: the metadata and the errors of the packages, by path
+    """
+    digests = digests or {}
+    metadata: dict[str, PackageMetadata] = {}
+    errors: dict[str, str] = {}
+    keys = {path: metadata_cache_key(path, digests.get(path)) for path in paths}
+
+    to_read = []
+    for path in paths:
+        cached = cache.get(keys[path]) if cache is not None else None
+        if cached and isinstance(cached.get("name"), str) and isinstance(cached.get("version"), str):
+            metadata[path] = PackageMetadata(cached["name"], cached["version"])
+        else:
+            to_read.append(path)
+
+    def read(path: str) -> PackageMetadata | MetadataError:
+        try:
+            return read_package_metadata(path)
+        except MetadataError as e:
+            return e
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, result in zip(to_read, pool.map(read, to_read)):
+            if isinstance(result, MetadataError):
+                errors[path] = str(result)
+                continue
+            metadata[path] = result
+            if cache is not None:
+                cache.set(keys[path], result.to_dict())
+    return metadata, errors
+
+
+def metadata_mismatches(
+    paths: list[str],
+    workers: int | None = None,
+    cache: VerificationCache | None = None,
+    digests: dict[str, str] | None = None,
+) -> list[str]:
+    """
+    Check that the wheels and sdists contain the name and the version of their file names,
+    the other files are skipped, as the archives not named as a wheel or an sdist, eg: the
+    apache-airflow-2.10.4-source.tar.gz of a release
+
+    :param paths: paths of the files
+    :param workers: number of packages read concurrently
+    :param cache: cache of the metadata
+    :param digests: sha512 of the packages by path
+    :return: the mismatches and the packages that cannot be read, sorted by path
+    """
+    packages = sorted(path for path in paths if is_package(path))
+    failures = {}
+    expected = {}
+    for path in packages:
+        try:
+            expected[path] = parse_filename(path)
+        except MetadataError:
+            continue
+
+    metadata, errors = index_package_metadata(list(expected), workers, cache, digests)
+    failures.update(errors)
+    for path, package_metadata in metadata.items():
+        if not package_metadata.matches(expected[path]):
+            failures[path] = (
+                f"{os.path.basename(path)} contains {package_metadata.name} {package_metadata.version}, "
+                f"its file name claims {expected[path].name} {expected[path].version}"
+            )
+    return [failures[path] for path in sorted(failures)]
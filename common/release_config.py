@@ -0,0 +1,63 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Reading and validation of the release config, shared by the read-config action and the gh-pub runner.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import yaml
+from jsonschema.validators import validator_for
+
+
+def read_file(path: str) -> dict[str, Any] | None:
+    """
+    Read the release config file, yaml or json
+
+    :param path: path of the release config file
+    :return: the release config, None when the file is neither yaml nor json
+    """
+    if path.endswith(".yml") or path.endswith(".yaml"):
+        with open(path) as file:
+            return yaml.safe_load(file)
+
+    if path.endswith(".json"):
+        with open(path) as file:
+            return json.load(file)
+
+    return None
+
+
+def config_errors(config: dict[str, Any], schema_path: str) -> list[str]:
+    """
+    Validate the release config against the schema
+
+    :param config: the release config
+    :param schema_path: path of the json schema of the release config
+    :return: the validation errors, empty when the config is valid
+    """
+    with open(schema_path) as schema_file:
+        schema = json.loads(schema_file.read())
+
+    validator = validator_for(schema)
+    validator.check_schema(schema)
+
+    return [str(error) for error in validator(schema).iter_errors(config)]
@@ -0,0 +1,207 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import annotations
+
+import posixpath
+import shutil
+import subprocess
+import xml.etree.ElementTree as ElementTree
+from html.parser import HTMLParser
+from urllib.parse import unquote, urljoin, urlsplit
+
+import requests
+
+from common.http import DEFAULT_TIMEOUT, create_session
+
+DAV_NAMESPACE = "{DAV:}"
+
+# Only the properties of the listing, the default PROPFIND returns every property of every file
+PROPFIND_BODY = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<propfind xmlns="DAV:"><prop><resourcetype/><getcontentlength/></prop></propfind>'
+)
+
+# Status codes of a server that does not support PROPFIND on the url
+PROPFIND_NOT_SUPPORTED = (400, 403, 405, 501)
+
+
+class RemoteListingError(Exception):
+    pass
+
+
+class RemoteFile:
+    """
+    A file of a remote directory, size is None when the listing does not have the sizes
+    """
+
+    __slots__ = ("name", "size")
+
+    def __init__(self, name: str, size: int | None = None):
+        self.name = name
+        self.size = size
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, RemoteFile)
+            and self.name == other.name
+            and self.size == other.size
+        )
+
+    def __repr__(self):
+        return f"RemoteFile({self.name!r}, size={self.size})"
+
+
+def join_url(repo_url: str, repo_path: str) -> str:
+    """
+    Url of the release directory, eg: https://dist.apache.org/repos/dist/dev/airflow/providers/
+    """
+    repo_path = repo_path.strip("/")
+    if not repo_path:
+        return repo_url.rstrip("/") + "/"
+    return f"{repo_url.rstrip('/')}/{repo_path}/"
+
+
+def list_remote_files(
+    url: str, session: requests.Session | None = None
+) -> list[RemoteFile]:
+    """
+    List the files of a remote directory with their sizes, without downloading or checking them out
+
+    An http(s) url is listed with a WebDAV PROPFIND, served by the svn repositories of dist.apache.org,
+    and with its html directory listing when the server does not support it. Other urls, eg: file://
+    or svn://, are listed with svn ls.
+
+    :param url: url of the directory
+    :param session: http session, a new session is created when not provided
+    :return: the files of the directory, sub directories are not listed
+    """
+    if urlsplit(url).scheme in ("http", "https"):
+        return list_with_http(url, session or create_session())
+    return list_with_svn(url)
+
+
+def list_with_svn(url: str) -> list[RemoteFile]:
+    if shutil.which("svn") is None:
+        raise RemoteListingError(f"svn is required to list {url}")
+    result = subprocess.run(
+        ["svn", "ls", "--xml", "--non-interactive", url],
+        capture_output=True,
+    )
+    if result.returncode != 0:
+        raise RemoteListingError(
+            f"svn ls {url} failed: {result.stderr.decode(errors='replace').strip()}"
+        )
+    return parse_svn_listing(result.stdout)
+
+
+def parse_svn_listing(listing: bytes) -> list[RemoteFile]:
+    """
+    Files of the output of svn ls --xml
+    """
+    try:
+        root = ElementTree.fromstring(listing)
+    except ElementTree.ParseError as e:
+        raise RemoteListingError(f"Invalid svn listing: {e}") from e
+
+    files = []
+    for entry in root.iter("entry"):
+        if entry.get("kind") != "file":
+            continue
+        size = entry.findtext("size")
+        files.append(RemoteFile(entry.findtext("name"), int(size) if size else None))
+    return files
+
+
+def list_with_http(url: str, session: requests.Session) -> list[RemoteFile]:
+    url = url.rstrip("/") + "/"
+    response = session.request(
+        "PROPFIND",
+        url,
+        data=PROPFIND_BODY,
+        headers={"Depth": "1", "Content-Type": "application/xml"},
+        timeout=DEFAULT_TIMEOUT,
+    )
+    if response.status_code == 207:
+        return parse_propfind(response.content, url)
+    if response.status_code not in PROPFIND_NOT_SUPPORTED:
+        raise RemoteListingError(f"PROPFIND {url} failed with status {response.status_code}")
+
+    response = session.get(url, timeout=DEFAULT_TIMEOUT)
+    if response.status_code != 200:
+        raise RemoteListingError(f"GET {url} failed with status {response.status_code}")
+    return parse_html_listing(response.text, url)
+
+
+def parse_propfind(multistatus: bytes, url: str) -> list[RemoteFile]:
+    """
+    Files of the multistatus response of a PROPFIND with depth 1 of the directory
+    """
+    try:
+        root = ElementTree.fromstring(multistatus)
+    except ElementTree.ParseError as e:
+        raise RemoteListingError(f"Invalid PROPFIND response of {url}: {e}") from e
+
+    directory = urlsplit(url).path.rstrip("/")
+    files = []
+    for response in root.iter(f"{DAV_NAMESPACE}response"):
+        path = urlsplit(urljoin(url, response.findtext(f"{DAV_NAMESPACE}href", ""))).path
+        if path.rstrip("/") == directory:
+            continue
+        if response.find(f".//{DAV_NAMESPACE}resourcetype/{DAV_NAMESPACE}collection") is not None:
+            continue
+        size = response.findtext(f".//{DAV_NAMESPACE}getcontentlength")
+        files.append(
+            RemoteFile(unquote(posixpath.basename(path)), int(size) if size else None)
+        )
+    return files
+
+
+class LinkParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.links: list[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self.links.append(href)
+
+
+def parse_html_listing(html: str, url: str) -> list[RemoteFile]:
+    """
+    Files linked by an html directory listing, the listing has no sizes
+    """
+    parser = LinkParser()
+    parser.feed(html)
+
+    directory = urlsplit(url).path.rstrip("/") + "/"
+    files = []
+    names = set()
+    for link in parser.links:
+        target = urlsplit(urljoin(url, link))
+        if target.query or target.path.endswith("/"):
+            # Sort links and sub directories
+            continue
+        if posixpath.dirname(target.path) + "/" != directory:
+            continue
+        name = unquote(posixpath.basename(target.path))
+        if name not in names:
+            names.add(name)
+            files.append(RemoteFile(name))
+    return files
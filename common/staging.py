@@ -0,0 +1,166 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Staging of the packages to the dist folder, in-process and without copying when possible.
+
+Packages are moved with a rename, or, when the working copy must be left untouched, linked with
+a hardlink, when the dist folder is on the same device. Otherwise they are copied in the kernel
+with copy_file_range, a reflink on copy-on-write file systems, falling back to a buffered copy.
+The copies run in a bounded pool of threads.
+"""
+
+from __future__ import annotations
+
+import errno
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+RENAME = "rename"
+HARDLINK = "hardlink"
+COPY_FILE_RANGE = "copy_file_range"
+COPY = "copy"
+
+DEFAULT_WORKERS = 4
+
+# Bytes copied by a copy_file_range call, the call copies less at the end of the file
+COPY_CHUNK_SIZE = 2**30
+
+# copy_file_range is not supported between these files, eg: across file systems on older kernels
+COPY_FILE_RANGE_ERRORS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP)
+
+HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+
+
+class StagedFile:
+    """
+    A file staged to the dist folder, with the number of bytes and the strategy it was staged with
+    """
+
+    __slots__ = ("name", "size", "strategy")
+
+    def __init__(self, name: str, size: int, strategy: str):
+        self.name = name
+        self.size = size
+        self.strategy = strategy
+
+    def __repr__(self):
+        return f"StagedFile({self.name!r}, size={self.size}, strategy={self.strategy!r})"
+
+
+def copy_with_copy_file_range(source: str, target: str, size: int):
+    with open(source, "rb") as source_file, open(target, "wb") as target_file:
+        copied = 0
+        while copied < size:
+            count = os.copy_file_range(
+                source_file.fileno(), target_file.fileno(), min(COPY_CHUNK_SIZE, size - copied)
+            )
+            if count == 0:
+                break
+            copied += count
+
+
+def copy_file(source: str, target: str, move: bool) -> str:
+    """
+    Copy the file to the target with copy_file_range, or with a buffered copy when it is not
+    supported, then remove the source when the file is moved
+
+    :param source: path of the file
+    :param target: path of the copy
+    :param move: remove the source once it is copied
+    :return: the strategy the file was copied with
+    """
+    size = os.stat(source).st_size
+    strategy = COPY
+    if HAS_COPY_FILE_RANGE:
+        try:
+            copy_with_copy_file_range(source, target, size)
+            strategy = COPY_FILE_RANGE
+        except OSError as e:
+            if e.errno not in COPY_FILE_RANGE_ERRORS:
+                raise
+    if strategy == COPY:
+        shutil.copyfile(source, target)
+    shutil.copystat(source, target)
+
+    if move:
+        os.unlink(source)
+    return strategy
+
+
+def link_or_rename(source: str, target: str, move: bool) -> str | None:
+    """
+    Rename the file to the target to move it, or hardlink it to leave the source in place
+
+    :return: the strategy the file was staged with, None when it has to be copied
+    """
+    try:
+        if move:
+            os.rename(source, target)
+            return RENAME
+        if os.path.lexists(target):
+            os.unlink(target)
+        os.link(source, target)
+        return HARDLINK
+    except OSError as e:
+        # eg: a file system without hardlinks, the file is copied instead
+        if e.errno in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.EOPNOTSUPP):
+            return None
+        raise
+
+
+def stage_files(
+    paths: list[str], target_dir: str, move: bool, workers: int = DEFAULT_WORKERS
+) -> list[StagedFile]:
+    """
+    Stage the files to the target directory
+
+    :param paths: paths of the files
+    :param target_dir: directory the files are staged to, created when missing
+    :param move: move the files, else the sources are left untouched
+    :param workers: number of files copied concurrently, when they can not be renamed or linked
+    :return: the staged files, in the order of the paths
+    """
+    os.makedirs(target_dir, exist_ok=True)
+    target_device = os.stat(target_dir).st_dev
+
+    staged: dict[str, StagedFile] = {}
+    copies: list[tuple[str, str, int]] = []
+    for path in paths:
+        name = os.path.basename(path)
+        target = os.path.join(target_dir, name)
+        stat = os.stat(path)
+        strategy = None
+        if stat.st_dev == target_device:
+            strategy = link_or_rename(path, target, move)
+        if strategy is None:
+            copies.append((path, target, stat.st_size))
+        else:
+            staged[path] = StagedFile(name, stat.st_size, strategy)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        strategies = pool.map(
+            partial(copy_file, move=move),
+            [path for path, _, _ in copies],
+            [target for _, target, _ in copies],
+        )
+        for (path, _, size), strategy in zip(copies, strategies):
+            staged[path] = StagedFile(os.path.basename(path), size, strategy)
+
+    return [staged[path] for path in paths]
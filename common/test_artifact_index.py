@@ -0,0 +1,157 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import os
+
+import pytest
+
+from common.artifact_index import ArtifactIndex, ArtifactRecord, load_changed_files
+
+FILES = [
+    "apache_airflow-2.10.4.tar.gz",
+    "apache_airflow-2.10.4.tar.gz.asc",
+    "apache_airflow-2.10.4.tar.gz.sha512",
+    "apache_airflow-2.10.4-py3-none-any.whl",
+    "apache_airflow-2.10.4-py3-none-any.whl.sha512",
+    "apache_airflow-2.10.4-py3-none-any.whl.sha256",
+    "apache-airflow-2.10.4-source.tar.gz.asc",
+]
+
+
+def test_records_group_companions():
+    index = ArtifactIndex(FILES)
+    record = index.get("apache_airflow-2.10.4.tar.gz")
+    assert record.exists
+    assert record.companions == {
+        "asc": "apache_airflow-2.10.4.tar.gz.asc",
+        "sha512": "apache_airflow-2.10.4.tar.gz.sha512",
+    }
+    assert index.companion("apache_airflow-2.10.4-py3-none-any.whl", "sha256") == (
+        "apache_airflow-2.10.4-py3-none-any.whl.sha256"
+    )
+    assert index.companion("apache_airflow-2.10.4-py3-none-any.whl", "asc") is None
+    assert index.companion("unknown.tar.gz", "asc") is None
+
+
+def test_records_use_slots():
+    record = ArtifactRecord("apache_airflow-2.10.4.tar.gz")
+    with pytest.raises(AttributeError):
+        record.size = 10
+
+
+def test_with_companion():
+    index = ArtifactIndex(FILES)
+    assert index.with_companion("sha512") == [
+        ("apache_airflow-2.10.4.tar.gz.sha512", "apache_airflow-2.10.4.tar.gz"),
+        (
+            "apache_airflow-2.10.4-py3-none-any.whl.sha512",
+            "apache_airflow-2.10.4-py3-none-any.whl",
+        ),
+    ]
+    assert index.with_companion("md5") == []
+
+
+def test_data_files():
+    index = ArtifactIndex(FILES)
+    assert index.data_files() == [
+        "apache_airflow-2.10.4.tar.gz",
+        "apache_airflow-2.10.4-py3-none-any.whl",
+    ]
+    assert "apache_airflow-2.10.4.tar.gz" in index
+    assert "apache-airflow-2.10.4-source.tar.gz" not in index
+    assert index.is_companion("apache_airflow-2.10.4.tar.gz.asc")
+    assert not index.is_companion("apache_airflow-2.10.4.tar.gz")
+
+
+def test_orphaned_companions_and_missing_data_files():
+    index = ArtifactIndex(FILES)
+    assert index.orphaned_companions() == ["apache-airflow-2.10.4-source.tar.gz.asc"]
+    assert index.orphaned_companions("sha512") == []
+    assert index.missing_data_files() == ["apache-airflow-2.10.4-source.tar.gz"]
+
+
+def test_missing_companions():
+    index = ArtifactIndex(FILES)
+    assert index.missing_companions("asc") == ["apache_airflow-2.10.4-py3-none-any.whl"]
+    assert index.missing_companions("sha512") == []
+
+
+def test_companion_listed_before_data_file():
+    index = ArtifactIndex(["file.tar.gz.asc", "file.tar.gz"])
+    assert index.get("file.tar.gz").exists
+    assert index.orphaned_companions() == []
+
+
+def test_custom_companion_kinds():
+    index = ArtifactIndex(["file.tar.gz", "file.tar.gz.sig"], companion_kinds={"sig"})
+    assert index.with_companion("sig") == [("file.tar.gz.sig", "file.tar.gz")]
+
+
+def test_from_directory_only_indexes_files(tmp_path):
+    for file in FILES:
+        (tmp_path / file).write_text("test")
+    os.mkdir(tmp_path / "nested.tar.gz")
+
+    index = ArtifactIndex.from_directory(str(tmp_path))
+    assert sorted(index.files) == sorted(FILES)
+    assert len(index) == len(FILES)
+    assert index.path(FILES[0]) == os.path.join(str(tmp_path), FILES[0])
+    assert index.subset({FILES[0]}).directory == str(tmp_path)
+
+
+def test_path_of_the_current_directory():
+    assert ArtifactIndex(FILES).path(FILES[0]) == FILES[0]
+
+
+def test_large_directory():
+    files = []
+    for number in range(20_000):
+        data_file = f"apache_airflow_providers_{number}-1.0.0.tar.gz"
+        files.extend([data_file, data_file + ".asc", data_file + ".sha512"])
+
+    index = ArtifactIndex(files)
+    assert len(index.with_companion("asc")) == 20_000
+    assert index.companion("apache_airflow_providers_19999-1.0.0.tar.gz", "sha512")
+    assert index.orphaned_companions() == []
+
+
+def test_subset_includes_data_files_and_companions():
+    index = ArtifactIndex(FILES)
+    subset = index.subset(
+        [
+            "apache_airflow-2.10.4-py3-none-any.whl.sha256",
+            "apache-airflow-2.10.4-source.tar.gz.asc",
+            "removed.tar.gz",
+        ]
+    )
+    assert subset.files == [
+        "apache_airflow-2.10.4-py3-none-any.whl",
+        "apache_airflow-2.10.4-py3-none-any.whl.sha512",
+        "apache_airflow-2.10.4-py3-none-any.whl.sha256",
+        "apache-airflow-2.10.4-source.tar.gz.asc",
+    ]
+    assert subset.orphaned_companions() == ["apache-airflow-2.10.4-source.tar.gz.asc"]
+
+
+def test_load_changed_files(tmp_path):
+    assert load_changed_files("") is None
+    changed_files = tmp_path / "changed-files.txt"
+    changed_files.write_text("apache_airflow-2.10.4.tar.gz\napache_airflow-2.10.4.tar.gz.asc\n")
+    assert load_changed_files(str(changed_files)) == {
+        "apache_airflow-2.10.4.tar.gz",
+        "apache_airflow-2.10.4.tar.gz.asc",
+    }
@@ -0,0 +1,138 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import hashlib
+import json
+import os
+import tarfile
+
+import pytest
+
+from common.bundle import (
+    BUNDLE_VERSION,
+    GZIP,
+    NONE,
+    BundleError,
+    extract_member,
+    index_path,
+    read_index,
+    write_bundle,
+)
+
+
+@pytest.fixture
+def packages(tmp_path):
+    dist = tmp_path / "dist"
+    dist.mkdir()
+    files = {
+        "apache_airflow_providers_amazon-9.0.0-py3-none-any.whl": b"PK\x03\x04" + os.urandom(4096),
+        "apache_airflow_providers_amazon-9.0.0.tar.gz": b"\x1f\x8b" + os.urandom(4096),
+        "apache_airflow_providers_amazon-9.0.0.tar.gz.sha512": b"0123456789abcdef" * 512,
+        "random.bin": os.urandom(4096),
+        "a" * 120 + ".txt": b"long name " * 1000,
+    }
+    for name, content in files.items():
+        (dist / name).write_bytes(content)
+    return {str(dist / name): content for name, content in files.items()}
+
+
+def test_bundle_round_trip(packages, tmp_path):
+    bundle_path = str(tmp_path / "bundle" / "dist-bundle.tar")
+    members = write_bundle(sorted(packages), bundle_path, workers=2)
+
+    assert [member.name for member in members] == sorted(os.path.basename(path) for path in packages)
+    index = read_index(bundle_path)
+    assert list(index) == [member.name for member in members]
+    for path, content in packages.items():
+        extracted = extract_member(bundle_path, index[os.path.basename(path)], str(tmp_path / "out"))
+        with open(extracted, "rb") as f:
+            assert f.read() == content
+        assert index[os.path.basename(path)].sha512 == hashlib.sha512(content).hexdigest()
+
+
+def test_bundle_stores_compressed_and_incompressible_files(packages, tmp_path):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    members = {member.name: member for member in write_bundle(sorted(packages), bundle_path)}
+
+    assert members["apache_airflow_providers_amazon-9.0.0-py3-none-any.whl"].compression == NONE
+    assert members["apache_airflow_providers_amazon-9.0.0.tar.gz"].compression == NONE
+    assert members["random.bin"].compression == NONE
+    checksum = members["apache_airflow_providers_amazon-9.0.0.tar.gz.sha512"]
+    assert checksum.compression == GZIP
+    assert checksum.member == checksum.name + ".gz"
+    assert checksum.size < checksum.original_size
+
+
+def test_bundle_offsets_match_tar_members(packages, tmp_path):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    members = write_bundle(sorted(packages), bundle_path)
+
+    with tarfile.open(bundle_path) as tar:
+        infos = {info.name: info for info in tar.getmembers()}
+    for member in members:
+        assert infos[member.member].offset_data == member.offset
+        assert infos[member.member].size == member.size
+
+
+def test_read_index_rejects_unknown_version(packages, tmp_path):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    write_bundle(sorted(packages), bundle_path)
+    with open(index_path(bundle_path)) as f:
+        index = json.load(f)
+    index["version"] = BUNDLE_VERSION + 1
+    with open(index_path(bundle_path), "w") as f:
+        json.dump(index, f)
+
+    with pytest.raises(BundleError, match="Unsupported bundle index version"):
+        read_index(bundle_path)
+
+
+def test_extract_member_detects_truncated_bundle(packages, tmp_path):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    members = write_bundle(sorted(packages), bundle_path)
+    os.truncate(bundle_path, members[-1].offset + 10)
+
+    with pytest.raises(BundleError, match="truncated"):
+        extract_member(bundle_path, members[-1], str(tmp_path / "out"))
+
+
+@pytest.mark.parametrize(
+    "name",
+    ["apache_airflow_providers_amazon-9.0.0.tar.gz", "apache_airflow_providers_amazon-9.0.0.tar.gz.sha512"],
+)
+def test_extract_member_detects_corrupted_data(packages, tmp_path, name):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    member = {member.name: member for member in write_bundle(sorted(packages), bundle_path)}[name]
+    with open(bundle_path, "r+b") as bundle:
+        bundle.seek(member.offset + member.size // 2)
+        byte = bundle.read(1)
+        bundle.seek(-1, os.SEEK_CUR)
+        bundle.write(bytes([byte[0] ^ 0xFF]))
+
+    with pytest.raises(BundleError, match=name):
+        extract_member(bundle_path, member, str(tmp_path / "out"))
+    assert not (tmp_path / "out" / name).exists()
+
+
+def test_extract_member_detects_wrong_offset(packages, tmp_path):
+    bundle_path = str(tmp_path / "dist-bundle.tar")
+    members = write_bundle(sorted(packages), bundle_path)
+    member = members[1]
+    member.offset += 512
+
+    with pytest.raises(BundleError):
+        extract_member(bundle_path, member, str(tmp_path / "out"))
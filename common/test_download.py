@@ -0,0 +1,159 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from common.download import PARTIAL_SUFFIX, DownloadError, download_file, download_files
+from common.http import create_session
+
+CONTENT = os.urandom(256 * 1024)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """
+    Serves CONTENT at every path, honours Range requests unless ranges is False, and drops the
+    connection half way through the first drops responses
+    """
+
+    ranges = True
+    drops = 0
+    requests_received: list[str | None] = []
+
+    def do_GET(self):
+        RangeHandler.requests_received.append(self.headers.get("Range"))
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and RangeHandler.ranges:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            if start >= len(CONTENT):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(CONTENT)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(CONTENT) - 1}/{len(CONTENT)}")
+        else:
+            self.send_response(200)
+        body = CONTENT[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if RangeHandler.drops:
+            RangeHandler.drops -= 1
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def range_server():
+    RangeHandler.ranges = True
+    RangeHandler.drops = 0
+    RangeHandler.requests_received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_file_resumes_dropped_connection(range_server, tmp_path):
+    RangeHandler.drops = 1
+    path = str(tmp_path / "package.tar.gz")
+
+    result = download_file(
+        create_session(retries=0), f"{range_server}/package.tar.gz", path, len(CONTENT)
+    )
+
+    assert open(path, "rb").read() == CONTENT
+    assert not os.path.exists(path + PARTIAL_SUFFIX)
+    # The download continues from the bytes received before the connection dropped
+    first, resumed = RangeHandler.requests_received
+    assert first is None
+    assert 0 < int(resumed.removeprefix("bytes=").rstrip("-")) <= len(CONTENT) // 2
+    assert result.size == len(CONTENT)
+
+
+def test_download_file_resumes_partial_file(range_server, tmp_path):
+    path = str(tmp_path / "package.tar.gz")
+    with open(path + PARTIAL_SUFFIX, "wb") as partial_file:
+        partial_file.write(CONTENT[:1000])
+
+    result = download_file(create_session(), f"{range_server}/package.tar.gz", path)
+
+    assert open(path, "rb").read() == CONTENT
+    assert result.resumed == 1000
+    assert RangeHandler.requests_received == ["bytes=1000-"]
+
+
+def test_download_file_without_range_support(range_server, tmp_path):
+    RangeHandler.ranges = False
+    path = str(tmp_path / "package.tar.gz")
+    with open(path + PARTIAL_SUFFIX, "wb") as partial_file:
+        partial_file.write(b"stale content")
+
+    result = download_file(
+        create_session(), f"{range_server}/package.tar.gz", path, len(CONTENT)
+    )
+
+    assert open(path, "rb").read() == CONTENT
+    assert result.resumed == 0
+
+
+def test_download_file_completes_finished_partial_file(range_server, tmp_path):
+    path = str(tmp_path / "package.tar.gz")
+    with open(path + PARTIAL_SUFFIX, "wb") as partial_file:
+        partial_file.write(CONTENT)
+
+    download_file(create_session(), f"{range_server}/package.tar.gz", path)
+
+    assert open(path, "rb").read() == CONTENT
+    assert RangeHandler.requests_received == [f"bytes={len(CONTENT)}-"]
+
+
+def test_download_file_fails_on_size_mismatch(range_server, tmp_path):
+    path = str(tmp_path / "package.tar.gz")
+    with pytest.raises(DownloadError, match="larger than the listed size"):
+        download_file(create_session(), f"{range_server}/package.tar.gz", path, 10)
+
+
+def test_download_files_skips_complete_files(range_server, tmp_path):
+    files = [
+        (
+            f"{range_server}/package_{index}.tar.gz",
+            str(tmp_path / "providers" / f"package_{index}.tar.gz"),
+            len(CONTENT),
+        )
+        for index in range(6)
+    ]
+    results = download_files(files, workers=3)
+    assert [result.path for result in results] == [path for _, path, _ in files]
+    assert not any(result.skipped for result in results)
+
+    results = download_files(files, workers=3)
+    assert all(result.skipped for result in results)
+    assert len(RangeHandler.requests_received) == 6
@@ -0,0 +1,88 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import json
+
+import pytest
+
+from common.github_output import write_github_output
+from common.manifest import (
+    MANIFEST_FILE_NAME,
+    ManifestWriter,
+    iter_manifest,
+    load_manifest,
+)
+
+
+def test_manifest_is_valid_json_and_streamable(tmp_path):
+    with ManifestWriter(str(tmp_path)) as manifest:
+        manifest.add("file1.tar.gz", 10, {"sha512": "a" * 128, "sha256": "b" * 64})
+        manifest.add("file2.whl", 20, {"sha512": "c" * 128})
+
+    with open(tmp_path / MANIFEST_FILE_NAME) as manifest_file:
+        data = json.load(manifest_file)
+    assert data == {
+        "version": 1,
+        "artifacts": [
+            {"name": "file1.tar.gz", "size": 10, "digests": {"sha512": "a" * 128, "sha256": "b" * 64}},
+            {"name": "file2.whl", "size": 20, "digests": {"sha512": "c" * 128}},
+        ],
+    }
+    assert list(iter_manifest(manifest.path)) == data["artifacts"]
+    assert load_manifest(manifest.path)["file2.whl"]["size"] == 20
+
+
+def test_manifest_writes_sums_files(tmp_path):
+    with ManifestWriter(str(tmp_path)) as manifest:
+        manifest.add("file1.tar.gz", 10, {"sha512": "a" * 128, "sha256": "b" * 64})
+        manifest.add("file2.whl", 20, {"sha512": "c" * 128})
+
+    assert (tmp_path / "SHA512SUMS").read_text() == (
+        f"{'a' * 128}  file1.tar.gz\n{'c' * 128}  file2.whl\n"
+    )
+    assert (tmp_path / "SHA256SUMS").read_text() == f"{'b' * 64}  file1.tar.gz\n"
+    assert sorted(manifest.sums_paths) == sorted(
+        [str(tmp_path / "SHA512SUMS"), str(tmp_path / "SHA256SUMS")]
+    )
+
+
+def test_empty_manifest(tmp_path):
+    with ManifestWriter(str(tmp_path)) as manifest:
+        pass
+
+    with open(manifest.path) as manifest_file:
+        assert json.load(manifest_file) == {"version": 1, "artifacts": []}
+    assert load_manifest(manifest.path) == {}
+
+
+def test_unsupported_manifest_version(tmp_path):
+    path = tmp_path / MANIFEST_FILE_NAME
+    path.write_text('{"version": 99, "artifacts": [\n]}\n')
+    with pytest.raises(ValueError, match="Unsupported manifest version"):
+        load_manifest(str(path))
+
+
+def test_write_github_output(monkeypatch, tmp_path):
+    output_file = tmp_path / "output"
+    monkeypatch.setenv("GITHUB_OUTPUT", str(output_file))
+    write_github_output(manifest_path="/tmp/manifest.json", manifest_dir="/tmp")
+    assert output_file.read_text() == "manifest-path=/tmp/manifest.json\nmanifest-dir=/tmp\n"
+
+
+def test_write_github_output_outside_actions(monkeypatch):
+    monkeypatch.delenv("GITHUB_OUTPUT", raising=False)
+    write_github_output(manifest_path="/tmp/manifest.json")
@@ -0,0 +1,243 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import base64
+import hashlib
+
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+
+from common.openpgp import (
+    NO_PUBLIC_KEY,
+    SIGNATURE_ERROR,
+    Keyring,
+    OpenPGPError,
+    canonical_text,
+    encode_packet,
+    dearmor,
+    iter_packets,
+    read_signatures,
+)
+
+CREATED = 1700000000
+
+
+def armor(data: bytes, kind: str = "PUBLIC KEY BLOCK") -> str:
+    return (
+        f"-----BEGIN PGP {kind}-----\n"
+        "Comment: test\n"
+        "\n"
+        f"{base64.b64encode(data).decode()}\n"
+        "=abcd\n"
+        f"-----END PGP {kind}-----\n"
+    )
+
+
+def test_dearmor_skips_text_around_the_blocks():
+    keys = (
+        "pub   rsa4096 2020-01-01 [SC]\n"
+        + armor(b"\x99first")
+        + "uid   Second <second@apache.org>\n"
+        + armor(b"\x99second")
+    )
+    assert dearmor(keys.encode()) == [b"\x99first", b"\x99second"]
+
+
+def test_dearmor_returns_binary_data_as_is():
+    assert dearmor(b"\x89\x00\x01x") == [b"\x89\x00\x01x"]
+
+
+def test_dearmor_rejects_invalid_base64():
+    with pytest.raises(OpenPGPError):
+        dearmor(b"-----BEGIN PGP SIGNATURE-----\n\nnot base64!\n-----END PGP SIGNATURE-----\n")
+
+
+@pytest.mark.parametrize(
+    "data, packets",
+    [
+        # Old format, one, two and four byte lengths
+        (b"\x88\x02ab", [(2, b"ab")]),
+        (b"\x99\x00\x02ab", [(6, b"ab")]),
+        (b"\xb6\x00\x00\x00\x02ab" + b"\x88\x01c", [(13, b"ab"), (2, b"c")]),
+        # New format, one and two byte lengths
+        (b"\xc2\x02ab", [(2, b"ab")]),
+        (b"\xcd\xc0\x00" + b"x" * 192, [(13, b"x" * 192)]),
+        # New format with a partial body length: a chunk of 2 bytes, then the last 1 byte
+        (b"\xc2\xe1ab\x01c", [(2, b"abc")]),
+    ],
+)
+def test_iter_packets(data, packets):
+    assert list(iter_packets(data)) == packets
+
+
+@pytest.mark.parametrize("data", [b"\x02ab", b"\xc2\x05ab", b"\x99\x00"])
+def test_iter_packets_rejects_malformed_packets(data):
+    with pytest.raises(OpenPGPError):
+        list(iter_packets(data))
+
+
+def test_read_signatures_requires_a_signature():
+    with pytest.raises(OpenPGPError, match="No OpenPGP signature"):
+        read_signatures(armor(b"\xcd\x02ab", "SIGNATURE").encode())
+
+
+@pytest.mark.parametrize(
+    "data, expected",
+    [
+        (b"a\nb\r\nc", b"a\r\nb\r\nc"),
+        (b"hello\r\r\nworld\n", b"hello\r\nworld\r\n"),
+        (b"a\x00\nb\x00\r\x00\n", b"a\r\nb\r\n"),
+        (b"a\x00b\n", b"a\x00b\r\n"),
+        (b"line\r", b"line"),
+        (b"line\n\r", b"line\r\n"),
+        (b"", b""),
+    ],
+)
+def test_canonical_text(data, expected):
+    assert canonical_text(data) == expected
+
+
+def test_keyring_skips_unsupported_keys():
+    # A v6 public key, followed by its user id
+    keyring = Keyring.from_bytes(armor(b"\xc6\x02\x06\x00" + b"\xcd\x02ab").encode())
+    assert len(keyring) == 0
+
+
+def test_verify_file_reports_malformed_signature_and_unknown_key(tmp_path):
+    data_file = tmp_path / "file.tar.gz"
+    data_file.write_bytes(b"content")
+    malformed = tmp_path / "malformed.asc"
+    malformed.write_text("not a signature")
+    # v4 binary signature with RSA/SHA512, an issuer key id subpacket and an empty MPI
+    signature = (
+        b"\x04\x00\x01\x0a\x00\x00"
+        + b"\x00\x0a\x09\x10" + bytes.fromhex("0123456789ABCDEF")
+        + b"\x00\x00\x00\x00"
+    )
+    unknown = tmp_path / "unknown.asc"
+    unknown.write_text(armor(b"\xc2" + bytes([len(signature)]) + signature, "SIGNATURE"))
+
+    keyring = Keyring([])
+    status = keyring.verify_file(str(malformed), str(data_file))
+    assert not status
+    assert status.problems == [{"status": SIGNATURE_ERROR, "keyid": None}]
+    status = keyring.verify_file(str(unknown), str(data_file))
+    assert not status
+    assert status.problems == [{"status": NO_PUBLIC_KEY, "keyid": "0123456789ABCDEF"}]
+
+
+@pytest.mark.parametrize("length", [0, 191, 192, 8383, 8384, 70000])
+def test_encode_packet_round_trip(length):
+    body = bytes(range(256)) * (length // 256) + bytes(length % 256)
+    assert list(iter_packets(encode_packet(13, body))) == [(13, body)]
+
+
+def public_key_packet(private_key) -> bytes:
+    # v4 Ed25519 key
+    point = private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+    return b"\x04" + CREATED.to_bytes(4, "big") + b"\x1b" + point
+
+
+def key_material(packet: bytes) -> bytes:
+    return b"\x99" + len(packet).to_bytes(2, "big") + packet
+
+
+def subpacket(subpacket_type: int, body: bytes) -> bytes:
+    return bytes([len(body) + 1, subpacket_type]) + body
+
+
+def make_signature(
+    private_key, signature_type: int, signed: bytes, hash_algorithm: int = 10, *subpackets: bytes
+) -> bytes:
+    """
+    v4 Ed25519 signature body of the signed bytes, issued by private_key
+    """
+    fingerprint = hashlib.sha1(key_material(public_key_packet(private_key))).digest()
+    hashed = subpacket(2, CREATED.to_bytes(4, "big")) + subpacket(33, b"\x04" + fingerprint)
+    hashed += b"".join(subpackets)
+    hashed_data = bytes([4, signature_type, 27, hash_algorithm]) + len(hashed).to_bytes(2, "big") + hashed
+    trailer = hashed_data + b"\x04\xff" + len(hashed_data).to_bytes(4, "big")
+    name = {2: "sha1", 10: "sha512"}[hash_algorithm]
+    digest = hashlib.new(name, signed + trailer).digest()
+    return hashed_data + b"\x00\x00" + digest[:2] + private_key.sign(digest)
+
+
+def keys_with_signing_subkey(primary, subkey, back_signed: bool) -> bytes:
+    primary_packet, subkey_packet = public_key_packet(primary), public_key_packet(subkey)
+    user_id = b"Signing Subkey <subkey@apache.org>"
+    certification = make_signature(
+        primary,
+        0x13,
+        key_material(primary_packet) + b"\xb4" + len(user_id).to_bytes(4, "big") + user_id,
+    )
+    bound = key_material(primary_packet) + key_material(subkey_packet)
+    binding_subpackets = [subpacket(27, b"\x02")]
+    if back_signed:
+        binding_subpackets.append(subpacket(32, make_signature(subkey, 0x19, bound)))
+    binding = make_signature(primary, 0x18, bound, 10, *binding_subpackets)
+    return (
+        encode_packet(6, primary_packet)
+        + encode_packet(13, user_id)
+        + encode_packet(2, certification)
+        + encode_packet(14, subkey_packet)
+        + encode_packet(2, binding)
+    )
+
+
+@pytest.mark.parametrize(
+    "back_signed, hash_algorithm, expected",
+    [
+        (True, 10, (True, "signature valid")),
+        # gpg requires the subkey to sign the primary key back
+        (False, 10, (False, SIGNATURE_ERROR)),
+        # SHA-1 data signatures are rejected
+        (True, 2, (False, SIGNATURE_ERROR)),
+    ],
+)
+def test_verify_file_with_signing_subkey(tmp_path, back_signed, hash_algorithm, expected):
+    primary, subkey = Ed25519PrivateKey.generate(), Ed25519PrivateKey.generate()
+    keyring = Keyring.from_bytes(keys_with_signing_subkey(primary, subkey, back_signed))
+    data_file = tmp_path / "apache_airflow-2.10.4.tar.gz"
+    data_file.write_bytes(b"content")
+    signature_file = tmp_path / "apache_airflow-2.10.4.tar.gz.sig"
+    signature_file.write_bytes(
+        encode_packet(2, make_signature(subkey, 0x00, b"content", hash_algorithm))
+    )
+
+    status = keyring.verify_file(str(signature_file), str(data_file))
+
+    assert (status.valid, status.status) == expected
+    assert [key.cross_certified for key in keyring.keys if key.primary] == [back_signed]
+
+
+def test_verify_file_with_two_signatures(tmp_path):
+    # Release managers may both sign the artifact, the signatures share one hash of the data
+    keys = [(Ed25519PrivateKey.generate(), Ed25519PrivateKey.generate()) for _ in range(2)]
+    keyring = Keyring.from_bytes(
+        b"".join(keys_with_signing_subkey(primary, subkey, True) for primary, subkey in keys)
+    )
+    data_file = tmp_path / "apache_airflow-2.10.4.tar.gz"
+    data_file.write_bytes(b"content")
+    signature_file = tmp_path / "apache_airflow-2.10.4.tar.gz.sig"
+    signature_file.write_bytes(
+        b"".join(encode_packet(2, make_signature(subkey, 0x00, b"content")) for _, subkey in keys)
+    )
+
+    status = keyring.verify_file(str(signature_file), str(data_file))
+
+    assert (status.valid, status.status) == (True, "signature valid")
@@ -0,0 +1,204 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from common.http import create_session
+from common.package_index import (
+    SIMPLE_JSON_CONTENT_TYPE,
+    PackageIndexError,
+    fetch_project_files,
+    published_diff,
+    sha256_digest,
+)
+from common.verification_cache import VerificationCache
+
+WHEEL = b"wheel content"
+SDIST = b"sdist content"
+
+
+class SimpleIndexHandler(BaseHTTPRequestHandler):
+    """
+    PEP 691 JSON simple index of the projects, with an ETag per project page
+    """
+
+    # Content of the files by project, None for a file published without a sha256
+    projects: dict[str, dict[str, bytes | None]] = {}
+    requests_received: list[tuple[str, str | None]] = []
+
+    def do_GET(self):
+        SimpleIndexHandler.requests_received.append((self.path, self.headers.get("If-None-Match")))
+        project = self.path.strip("/").split("/")[-1]
+        if project not in SimpleIndexHandler.projects:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = json.dumps(
+            {
+                "meta": {"api-version": "1.0"},
+                "name": project,
+                "files": [
+                    {
+                        "filename": filename,
+                        "url": f"https://files.example.org/{filename}",
+                        "hashes": {"sha256": hashlib.sha256(content).hexdigest()}
+                        if content is not None
+                        else {},
+                    }
+                    for filename, content in SimpleIndexHandler.projects[project].items()
+                ],
+            }
+        ).encode()
+        etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", SIMPLE_JSON_CONTENT_TYPE)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def index_url():
+    SimpleIndexHandler.projects = {
+        "apache-airflow-providers-amazon": {
+            "apache_airflow_providers_amazon-9.1.0-py3-none-any.whl": WHEEL,
+            "apache_airflow_providers_amazon-9.1.0.tar.gz": b"another sdist",
+        },
+    }
+    SimpleIndexHandler.requests_received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SimpleIndexHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/simple/"
+    server.shutdown()
+
+
+def write_release(directory):
+    files = {
+        "apache_airflow_providers_amazon-9.1.0-py3-none-any.whl": WHEEL,
+        "apache_airflow_providers_amazon-9.1.0.tar.gz": SDIST,
+        "apache_airflow_providers_amazon-9.1.0.tar.gz.asc": b"signature",
+        "apache_airflow_providers_google-10.0.0-py3-none-any.whl": WHEEL,
+    }
+    for name, content in files.items():
+        with open(os.path.join(directory, name), "wb") as f:
+            f.write(content)
+    return sorted(os.path.join(directory, name) for name in files)
+
+
+def test_published_diff(index_url, tmp_path):
+    paths = write_release(tmp_path)
+
+    diff = published_diff(paths, index_url=index_url, workers=4)
+
+    assert diff.published == [str(tmp_path / "apache_airflow_providers_amazon-9.1.0-py3-none-any.whl")]
+    assert diff.conflicts == [str(tmp_path / "apache_airflow_providers_amazon-9.1.0.tar.gz")]
+    # One query per project, the signature is not a package
+    assert sorted(path for path, _ in SimpleIndexHandler.requests_received) == [
+        "/simple/apache-airflow-providers-amazon/",
+        "/simple/apache-airflow-providers-google/",
+    ]
+
+
+def test_published_diff_uses_digests(index_url, tmp_path):
+    paths = write_release(tmp_path)
+    sdist = str(tmp_path / "apache_airflow_providers_amazon-9.1.0.tar.gz")
+
+    diff = published_diff(
+        paths,
+        index_url=index_url,
+        digests={sdist: hashlib.sha256(b"another sdist").hexdigest()},
+    )
+
+    assert sdist in diff.published
+    assert diff.conflicts == []
+
+
+def test_published_diff_without_sha256(index_url, tmp_path):
+    SimpleIndexHandler.projects["apache-airflow-providers-amazon"][
+        "apache_airflow_providers_amazon-9.1.0.tar.gz"
+    ] = None
+    paths = write_release(tmp_path)
+
+    with patch("common.package_index.sha256_digest", wraps=sha256_digest) as mock_sha256_digest:
+        diff = published_diff(paths, index_url=index_url)
+
+    assert diff.without_sha256 == [str(tmp_path / "apache_airflow_providers_amazon-9.1.0.tar.gz")]
+    assert diff.conflicts == []
+    # Only the wheel is compared with the index
+    assert [call.args[0] for call in mock_sha256_digest.call_args_list] == [
+        str(tmp_path / "apache_airflow_providers_amazon-9.1.0-py3-none-any.whl")
+    ]
+
+
+def test_fetch_project_files_revalidates_cached_response(index_url, tmp_path):
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    session = create_session()
+
+    files = fetch_project_files(session, index_url, "Apache_Airflow.Providers-Amazon", cache)
+    cached_files = fetch_project_files(session, index_url, "apache-airflow-providers-amazon", cache)
+
+    assert cached_files == files
+    assert files["apache_airflow_providers_amazon-9.1.0-py3-none-any.whl"] == hashlib.sha256(WHEEL).hexdigest()
+    etags = [etag for _, etag in SimpleIndexHandler.requests_received]
+    assert etags[0] is None and etags[1] is not None
+
+
+def test_fetch_project_files_unknown_project(index_url):
+    assert fetch_project_files(create_session(), index_url, "unknown") == {}
+
+
+def test_fetch_project_files_rejects_html_index(tmp_path):
+    class HtmlHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = b"<html></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HtmlHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with pytest.raises(PackageIndexError, match="not a PEP 691"):
+            fetch_project_files(
+                create_session(), f"http://127.0.0.1:{server.server_address[1]}/simple/", "package"
+            )
+    finally:
+        server.shutdown()
@@ -0,0 +1,163 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import io
+import os
+import tarfile
+import zipfile
+from unittest.mock import patch
+
+import pytest
+
+from common.package_metadata import (
+    MetadataError,
+    PackageMetadata,
+    index_package_metadata,
+    metadata_mismatches,
+    parse_filename,
+    read_package_metadata,
+)
+from common.verification_cache import VerificationCache
+
+
+def metadata_file(name, version):
+    return (
+        f"Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n"
+        f"Summary: Provider package\n\n# {name}\n\nName: not-a-header\n"
+    ).encode()
+
+
+def write_wheel(directory, file_name, name, version):
+    path = os.path.join(directory, file_name)
+    dist_info = f"{name.replace('-', '_')}-{version}.dist-info"
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("airflow/providers/amazon/__init__.py", "")
+        archive.writestr(f"{dist_info}/METADATA", metadata_file(name, version))
+        archive.writestr(f"{dist_info}/RECORD", "")
+    return path
+
+
+def add_tar_member(archive, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    archive.addfile(info, io.BytesIO(data))
+
+
+def write_sdist(directory, file_name, name, version, pkg_info_first=False):
+    path = os.path.join(directory, file_name)
+    root = f"{name.replace('-', '_')}-{version}"
+    with tarfile.open(path, "w:gz") as archive:
+        if pkg_info_first:
+            add_tar_member(archive, f"{root}/PKG-INFO", metadata_file(name, version))
+        add_tar_member(archive, f"{root}/pyproject.toml", b"[project]\n")
+        add_tar_member(archive, f"{root}/src/PKG-INFO", metadata_file("other", "0.1"))
+        if not pkg_info_first:
+            add_tar_member(archive, f"{root}/PKG-INFO", metadata_file(name, version))
+    return path
+
+
+@pytest.mark.parametrize(
+    "file_name, expected",
+    [
+        ("apache_airflow_providers_amazon-9.1.0rc1-py3-none-any.whl", ("apache_airflow_providers_amazon", "9.1.0rc1")),
+        ("apache_airflow-2.10.4-1-py3-none-any.whl", ("apache_airflow", "2.10.4")),
+        ("apache_airflow_providers_amazon-9.1.0rc1.tar.gz", ("apache_airflow_providers_amazon", "9.1.0rc1")),
+        ("apache-airflow-2.10.4.zip", ("apache-airflow", "2.10.4")),
+    ],
+)
+def test_parse_filename(file_name, expected):
+    metadata = parse_filename(file_name)
+    assert (metadata.name, metadata.version) == expected
+
+
+@pytest.mark.parametrize(
+    "file_name",
+    ["apache-airflow-2.10.4-source.tar.gz", "apache_airflow-py3-none-any.whl", "-1.0.0.tar.gz"],
+)
+def test_parse_filename_rejects_invalid_names(file_name):
+    with pytest.raises(MetadataError):
+        parse_filename(file_name)
+
+
+def test_package_metadata_matches_normalized_names_and_versions():
+    assert PackageMetadata("apache-airflow-providers-amazon", "9.1.0rc1").matches(
+        PackageMetadata("apache_airflow_providers_amazon", "9.1.0.rc1")
+    )
+    assert not PackageMetadata("apache-airflow", "9.1.0").matches(
+        PackageMetadata("apache-airflow", "9.1.0rc1")
+    )
+
+
+def test_read_package_metadata(tmp_path):
+    wheel = write_wheel(tmp_path, "apache_airflow_providers_amazon-9.1.0-py3-none-any.whl", "apache-airflow-providers-amazon", "9.1.0")
+    sdist = write_sdist(tmp_path, "apache_airflow_providers_amazon-9.1.0.tar.gz", "apache-airflow-providers-amazon", "9.1.0")
+
+    for path in (wheel, sdist):
+        metadata = read_package_metadata(path)
+        assert (metadata.name, metadata.version) == ("apache-airflow-providers-amazon", "9.1.0")
+
+
+def test_read_package_metadata_stops_at_pkg_info(tmp_path):
+    sdist = write_sdist(tmp_path, "package-1.0.0.tar.gz", "package", "1.0.0", pkg_info_first=True)
+    # The members after PKG-INFO are never read
+    with open(sdist, "r+b") as f:
+        f.truncate(os.path.getsize(sdist) - 40)
+
+    assert read_package_metadata(sdist).version == "1.0.0"
+
+
+def test_read_package_metadata_errors(tmp_path):
+    path = tmp_path / "package-1.0.0-py3-none-any.whl"
+    path.write_bytes(b"not a zip")
+    with pytest.raises(MetadataError, match="cannot be read"):
+        read_package_metadata(str(path))
+
+    with zipfile.ZipFile(tmp_path / "empty-1.0.0-py3-none-any.whl", "w") as archive:
+        archive.writestr("empty/__init__.py", "")
+    with pytest.raises(MetadataError, match="no metadata file"):
+        read_package_metadata(str(tmp_path / "empty-1.0.0-py3-none-any.whl"))
+
+
+def test_metadata_mismatches(tmp_path):
+    paths = [
+        write_wheel(tmp_path, "package-1.0.0-py3-none-any.whl", "package", "1.0.0"),
+        write_sdist(tmp_path, "package-1.0.0.tar.gz", "package", "1.0.1"),
+        write_wheel(tmp_path, "renamed-1.0.0-py3-none-any.whl", "package", "1.0.0"),
+    ]
+    (tmp_path / "package-1.0.0.tar.gz.asc").write_text("signature")
+    paths.append(str(tmp_path / "package-1.0.0.tar.gz.asc"))
+    # A release tarball that is not an sdist
+    paths.append(write_sdist(tmp_path, "package-1.0.0-source.tar.gz", "package", "1.0.0"))
+
+    assert metadata_mismatches(paths, workers=2) == [
+        "package-1.0.0.tar.gz contains package 1.0.1, its file name claims package 1.0.0",
+        "renamed-1.0.0-py3-none-any.whl contains package 1.0.0, its file name claims renamed 1.0.0",
+    ]
+
+
+def test_index_package_metadata_uses_cache_by_digest(tmp_path):
+    wheel = write_wheel(tmp_path, "package-1.0.0-py3-none-any.whl", "package", "1.0.0")
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+
+    metadata, errors = index_package_metadata([wheel], cache=cache, digests={wheel: "a" * 128})
+    assert metadata[wheel].version == "1.0.0" and errors == {}
+    assert cache.get(f"metadata:sha512:{'a' * 128}") == {"name": "package", "version": "1.0.0"}
+
+    with patch("common.package_metadata.read_package_metadata") as read:
+        metadata, errors = index_package_metadata([wheel], cache=cache, digests={wheel: "a" * 128})
+    read.assert_not_called()
+    assert metadata[wheel].name == "package"
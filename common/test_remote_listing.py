@@ -0,0 +1,188 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import shutil
+import subprocess
+import threading
+from functools import partial
+from http.server import BaseHTTPRequestHandler, SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote
+
+import pytest
+
+from common.remote_listing import (
+    RemoteFile,
+    RemoteListingError,
+    join_url,
+    list_remote_files,
+    parse_svn_listing,
+)
+
+DEV_PROVIDERS_URL = "https://dist.apache.org/repos/dist/dev/airflow/providers/"
+
+FILES = {
+    "apache_airflow-2.10.4.tar.gz": b"package",
+    "apache_airflow-2.10.4.tar.gz.asc": b"signature",
+    "apache airflow-2.10.4.tar.gz.sha512": b"",
+}
+
+
+class DavHandler(BaseHTTPRequestHandler):
+    """
+    Directory /dist/providers/ listed with a PROPFIND, like mod_dav_svn
+    """
+
+    status = 207
+
+    def do_PROPFIND(self):
+        if self.headers.get("Depth") != "1":
+            self.send_error(400)
+            return
+        if DavHandler.status != 207:
+            self.send_error(DavHandler.status)
+            return
+        responses = [
+            "<D:response><D:href>/dist/providers/</D:href><D:propstat><D:prop>"
+            "<D:resourcetype><D:collection/></D:resourcetype></D:prop></D:propstat></D:response>",
+            "<D:response><D:href>/dist/providers/old/</D:href><D:propstat><D:prop>"
+            "<D:resourcetype><D:collection/></D:resourcetype></D:prop></D:propstat></D:response>",
+        ] + [
+            f"<D:response><D:href>/dist/providers/{quote(name)}</D:href><D:propstat><D:prop>"
+            f"<D:resourcetype/><D:getcontentlength>{len(content)}</D:getcontentlength>"
+            "</D:prop></D:propstat></D:response>"
+            for name, content in FILES.items()
+        ]
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">'
+            + "".join(responses)
+            + "</D:multistatus>"
+        ).encode()
+        self.send_response(207)
+        self.send_header("Content-Type", "text/xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietDirectoryHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def dav_server():
+    DavHandler.status = 207
+    server, url = serve(DavHandler)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def directory_server(tmp_path):
+    providers = tmp_path / "dist" / "providers"
+    (providers / "old").mkdir(parents=True)
+    for name, content in FILES.items():
+        (providers / name).write_bytes(content)
+    server, url = serve(partial(QuietDirectoryHandler, directory=str(tmp_path)))
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize(
+    "repo_url, repo_path, expected",
+    [
+        ("https://dist.apache.org/repos/dist/dev/airflow", "providers/", DEV_PROVIDERS_URL),
+        ("https://dist.apache.org/repos/dist/dev/airflow/", "/providers", DEV_PROVIDERS_URL),
+        ("file:///tmp/repo/airflow", "", "file:///tmp/repo/airflow/"),
+    ],
+)
+def test_join_url(repo_url, repo_path, expected):
+    assert join_url(repo_url, repo_path) == expected
+
+
+def test_list_remote_files_with_propfind(dav_server):
+    assert list_remote_files(f"{dav_server}/dist/providers") == [
+        RemoteFile(name, len(content)) for name, content in FILES.items()
+    ]
+
+
+def test_list_remote_files_falls_back_to_html_listing(directory_server):
+    # The directory listing of http.server does not support PROPFIND and has no sizes
+    assert sorted(
+        list_remote_files(f"{directory_server}/dist/providers/"), key=lambda file: file.name
+    ) == sorted((RemoteFile(name) for name in FILES), key=lambda file: file.name)
+
+
+def test_list_remote_files_fails_on_error(dav_server):
+    DavHandler.status = 404
+    with pytest.raises(RemoteListingError, match="status 404"):
+        list_remote_files(f"{dav_server}/dist/providers/")
+
+
+def test_parse_svn_listing():
+    listing = b"""<?xml version="1.0" encoding="UTF-8"?>
+<lists>
+<list path="file:///tmp/repo/providers">
+<entry kind="dir"><name>old</name><commit revision="2"></commit></entry>
+<entry kind="file"><name>apache_airflow-2.10.4.tar.gz</name><size>7</size><commit revision="3"></commit></entry>
+<entry kind="file"><name>apache_airflow-2.10.4.tar.gz.asc</name><size>0</size><commit revision="3"></commit></entry>
+</list>
+</lists>
+"""
+    assert parse_svn_listing(listing) == [
+        RemoteFile("apache_airflow-2.10.4.tar.gz", 7),
+        RemoteFile("apache_airflow-2.10.4.tar.gz.asc", 0),
+    ]
+    with pytest.raises(RemoteListingError):
+        parse_svn_listing(b"<lists>")
+
+
+@pytest.mark.skipif(
+    shutil.which("svn") is None or shutil.which("svnadmin") is None, reason="svn is not installed"
+)
+def test_list_remote_files_with_svn(tmp_path):
+    repository = tmp_path / "repository"
+    subprocess.run(["svnadmin", "create", str(repository)], check=True)
+    source = tmp_path / "source"
+    (source / "providers" / "old").mkdir(parents=True)
+    for name, content in FILES.items():
+        (source / "providers" / name).write_bytes(content)
+    url = f"file://{repository}"
+    subprocess.run(
+        ["svn", "import", "--non-interactive", "-m", "release", str(source), url],
+        check=True,
+        capture_output=True,
+    )
+
+    assert list_remote_files(join_url(url, "providers")) == sorted(
+        (RemoteFile(name, len(content)) for name, content in FILES.items()),
+        key=lambda file: file.name,
+    )
+    with pytest.raises(RemoteListingError, match="svn ls"):
+        list_remote_files(join_url(url, "missing"))
@@ -0,0 +1,122 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import errno
+import os
+from unittest.mock import patch
+
+import pytest
+
+from common.staging import (
+    COPY,
+    COPY_FILE_RANGE,
+    HARDLINK,
+    RENAME,
+    StagedFile,
+    stage_files,
+)
+
+
+def write_packages(directory, count):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for number in range(count):
+        path = os.path.join(directory, f"package{number}-1.0.0.tar.gz")
+        with open(path, "wb") as f:
+            f.write(os.urandom(1024 * (number + 1)))
+        paths.append(path)
+    return paths
+
+
+def contents(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize(
+    "move, strategy",
+    [pytest.param(True, RENAME, id="move"), pytest.param(False, HARDLINK, id="link")],
+)
+def test_stage_files_on_the_same_device(tmp_path, move, strategy):
+    paths = write_packages(str(tmp_path / "svn"), 3)
+    expected = [contents(path) for path in paths]
+
+    staged_files = stage_files(paths, str(tmp_path / "dist"), move=move)
+
+    assert [(staged.name, staged.size, staged.strategy) for staged in staged_files] == [
+        (os.path.basename(path), 1024 * (number + 1), strategy)
+        for number, path in enumerate(paths)
+    ]
+    assert [contents(tmp_path / "dist" / staged.name) for staged in staged_files] == expected
+    assert [os.path.exists(path) for path in paths] == [not move] * 3
+
+
+def test_stage_files_links_over_a_previous_staging(tmp_path):
+    paths = write_packages(str(tmp_path / "svn"), 1)
+    (tmp_path / "dist").mkdir()
+    (tmp_path / "dist" / os.path.basename(paths[0])).write_bytes(b"stale")
+
+    stage_files(paths, str(tmp_path / "dist"), move=False)
+
+    assert contents(tmp_path / "dist" / os.path.basename(paths[0])) == contents(paths[0])
+
+
+@pytest.mark.parametrize("move", [True, False])
+def test_stage_files_copies_across_devices(tmp_path, move):
+    paths = write_packages(str(tmp_path / "svn"), 4)
+    expected = [contents(path) for path in paths]
+    dist_device = os.stat(tmp_path).st_dev + 1
+
+    real_stat = os.stat
+
+    def stat_on_another_device(path, *args, **kwargs):
+        result = real_stat(path, *args, **kwargs)
+        if os.fspath(path) == str(tmp_path / "dist"):
+            return os.stat_result((*result[:2], dist_device, *result[3:]))
+        return result
+
+    with patch("common.staging.os.stat", side_effect=stat_on_another_device):
+        staged_files = stage_files(paths, str(tmp_path / "dist"), move=move, workers=2)
+
+    assert {staged.strategy for staged in staged_files} <= {COPY_FILE_RANGE, COPY}
+    assert [contents(tmp_path / "dist" / staged.name) for staged in staged_files] == expected
+    assert [os.path.exists(path) for path in paths] == [not move] * 4
+
+
+def test_copy_falls_back_to_a_buffered_copy(tmp_path):
+    paths = write_packages(str(tmp_path / "svn"), 2)
+
+    with patch("common.staging.link_or_rename", return_value=None), patch(
+        "common.staging.os.copy_file_range", side_effect=OSError(errno.EXDEV, "cross device")
+    ):
+        staged_files = stage_files(paths, str(tmp_path / "dist"), move=False)
+
+    assert [staged.strategy for staged in staged_files] == [COPY, COPY]
+    assert [contents(tmp_path / "dist" / staged.name) for staged in staged_files] == [
+        contents(path) for path in paths
+    ]
+
+
+def test_hardlinks_not_supported_are_copied(tmp_path):
+    paths = write_packages(str(tmp_path / "svn"), 1)
+
+    with patch("common.staging.os.link", side_effect=OSError(errno.EPERM, "not permitted")):
+        staged_files = stage_files(paths, str(tmp_path / "dist"), move=False)
+
+    assert staged_files[0].strategy in (COPY_FILE_RANGE, COPY)
+    assert isinstance(staged_files[0], StagedFile)
+    assert contents(tmp_path / "dist" / staged_files[0].name) == contents(paths[0])
@@ -0,0 +1,122 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import json
+import os
+
+import pytest
+
+from common.verification_cache import (
+    CACHE_VERSION,
+    VerificationCache,
+    cache_dir,
+    cache_disabled,
+)
+
+
+def test_cache_round_trip(tmp_path):
+    cache = VerificationCache(str(tmp_path / "cache.json"))
+    cache.set("key", {"digest": "abc"})
+    cache.save()
+
+    assert VerificationCache(str(tmp_path / "cache.json")).get("key") == {"digest": "abc"}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = VerificationCache(str(tmp_path / "cache.json"), max_entries=2)
+    cache.set("first", {"digest": "1"})
+    cache.set("second", {"digest": "2"})
+    cache.get("first")
+    cache.set("third", {"digest": "3"})
+    cache.save()
+
+    reloaded = VerificationCache(str(tmp_path / "cache.json"), max_entries=2)
+    assert sorted(reloaded.entries) == ["first", "third"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        pytest.param("{not json", id="invalid_json"),
+        pytest.param("[]", id="not_a_dict"),
+        pytest.param(json.dumps({"version": -1, "entries": {}}), id="unknown_version"),
+        pytest.param(json.dumps({"version": CACHE_VERSION, "entries": []}), id="bad_entries"),
+    ],
+)
+def test_corrupt_cache_is_ignored(tmp_path, content):
+    path = tmp_path / "cache.json"
+    path.write_text(content)
+
+    cache = VerificationCache(str(path))
+    assert cache.entries == {}
+    cache.set("key", {"digest": "abc"})
+    cache.save()
+    assert VerificationCache(str(path)).get("key") == {"digest": "abc"}
+
+
+def test_corrupt_entries_are_dropped(tmp_path):
+    path = tmp_path / "cache.json"
+    path.write_text(
+        json.dumps(
+            {
+                "version": CACHE_VERSION,
+                "entries": {
+                    "good": {"value": {"digest": "abc"}, "used": 1},
+                    "no_value": {"used": 2},
+                    "bad_used": {"value": {"digest": "abc"}, "used": "yesterday"},
+                    "not_a_dict": "abc",
+                },
+            }
+        )
+    )
+    assert list(VerificationCache(str(path)).entries) == ["good"]
+
+
+def test_save_leaves_no_temp_files(tmp_path):
+    cache = VerificationCache(str(tmp_path / "nested" / "cache.json"))
+    cache.set("key", {"digest": "abc"})
+    cache.save()
+    assert os.listdir(tmp_path / "nested") == ["cache.json"]
+
+
+@pytest.mark.parametrize(
+    "argv, env, mode, expected",
+    [
+        pytest.param([], None, None, False, id="enabled_by_default"),
+        pytest.param(["checksum_check.py", "--no-cache"], None, None, True, id="cli_flag"),
+        pytest.param([], "true", None, True, id="env_true"),
+        pytest.param([], "false", None, False, id="env_false"),
+        pytest.param([], "false", "VERIFY", False, id="verify_mode"),
+        pytest.param([], "false", "RELEASE", True, id="release_mode"),
+    ],
+)
+def test_cache_disabled(monkeypatch, argv, env, mode, expected):
+    monkeypatch.delenv("GH_PUB_NO_CACHE", raising=False)
+    monkeypatch.delenv("MODE", raising=False)
+    if env is not None:
+        monkeypatch.setenv("GH_PUB_NO_CACHE", env)
+    if mode is not None:
+        monkeypatch.setenv("MODE", mode)
+    assert cache_disabled(argv) == expected
+
+
+def test_cache_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("GH_PUB_CACHE_DIR", str(tmp_path))
+    assert cache_dir() == str(tmp_path)
+    monkeypatch.setenv("GH_PUB_CACHE_DIR", "")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    assert cache_dir() == os.path.join(str(tmp_path), "gh-pub")
@@ -0,0 +1,131 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from typing import Any
+
+from rich.console import Console
+
+console = Console(width=400, color_system="standard")
+
+CACHE_VERSION = 1
+DEFAULT_MAX_ENTRIES = 100_000
+
+
+def cache_dir() -> str:
+    """
+    Directory of the persistent caches, GH_PUB_CACHE_DIR or ~/.cache/gh-pub by default.
+    Restore this directory with actions/cache to reuse the caches across workflow runs.
+    """
+    return os.environ.get("GH_PUB_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "gh-pub"
+    )
+
+
+def cache_disabled(argv: list[str] | None = None) -> bool:
+    """
+    Whether the caches are disabled with --no-cache or GH_PUB_NO_CACHE=true. They are always
+    disabled with MODE=RELEASE, the artifacts that are published are verified again.
+    """
+    if "--no-cache" in (argv or []):
+        return True
+    if os.environ.get("MODE", "VERIFY") == "RELEASE":
+        return True
+    return os.environ.get("GH_PUB_NO_CACHE", "false").lower() in ("true", "1", "yes")
+
+
+class VerificationCache:
+    """
+    Persistent key value store of verification results, backed by a json file.
+
+    The number of entries is bounded, when the cache is full the least recently used entries
+    are evicted on save. A corrupt cache file or entry is never trusted, it is dropped and the
+    result is computed again.
+    """
+
+    def __init__(self, path: str, max_entries: int | None = None):
+        self.path = path
+        self.max_entries = max_entries or int(
+            os.environ.get("GH_PUB_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)
+        )
+        self.entries: dict[str, dict[str, Any]] = self._load()
+        self._clock = max((entry["used"] for entry in self.entries.values()), default=0)
+
+    def _load(self) -> dict[str, dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as cache_file:
+                data = json.load(cache_file)
+        except (OSError, ValueError) as e:
+            console.print(f"[yellow]Ignoring corrupt cache {self.path}: {e}[/]")
+            return {}
+
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            console.print(f"[yellow]Ignoring cache {self.path} with unknown format[/]")
+            return {}
+
+        entries = data.get("entries")
+        if not isinstance(entries, dict):
+            return {}
+        return {
+            key: entry
+            for key, entry in entries.items()
+            if isinstance(entry, dict)
+            and isinstance(entry.get("value"), dict)
+            and isinstance(entry.get("used"), int)
+        }
+
+    def get(self, key: str) -> dict[str, Any] | None:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self._clock += 1
+        entry["used"] = self._clock
+        return entry["value"]
+
+    def set(self, key: str, value: dict[str, Any]):
+        self._clock += 1
+        self.entries[key] = {"value": value, "used": self._clock}
+
+    def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    def evict(self):
+        if len(self.entries) <= self.max_entries:
+            return
+        keep = sorted(self.entries, key=lambda key: self.entries[key]["used"])[
+            -self.max_entries :
+        ]
+        self.entries = {key: self.entries[key] for key in keep}
+
+    def save(self):
+        """
+        Write the cache atomically, a run killed half way never leaves a truncated cache behind
+        """
+        self.evict()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=directory, prefix=".cache-", delete=False
+        ) as temp_file:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, temp_file)
+        os.replace(temp_file.name, self.path)
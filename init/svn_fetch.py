@@ -0,0 +1,403 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "rich",
+#     "requests",
+# ]
+# ///
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Any
+from urllib.parse import quote
+
+from rich.console import Console
+
+from common.download import DownloadError, download_files
+from common.github_output import write_github_output
+from common.remote_listing import RemoteListingError, join_url, list_remote_files
+
+console = Console(width=400, color_system="standard")
+
+FETCH_METHODS = ("checkout", "export", "http")
+
+# Files kept in the .svn directory of the working copy, so they are cached and restored with it
+# and never listed with the artifacts
+STATE_FILE_NAME = "gh-pub-fetch.json"
+CHANGED_FILES_NAME = "gh-pub-changed-files.txt"
+
+
+class FetchError(Exception):
+    pass
+
+
+def run_svn(*args: str) -> bytes:
+    if shutil.which("svn") is None:
+        raise FetchError("svn is required to fetch the release with the checkout and export methods")
+    result = subprocess.run(["svn", *args, "--non-interactive"], capture_output=True)
+    if result.returncode != 0:
+        raise FetchError(
+            f"svn {' '.join(args)} failed: {result.stderr.decode(errors='replace').strip()}"
+        )
+    return result.stdout
+
+
+def svn_xml(*args: str) -> ElementTree.Element:
+    try:
+        return ElementTree.fromstring(run_svn(*args, "--xml"))
+    except ElementTree.ParseError as e:
+        raise FetchError(f"Invalid output of svn {' '.join(args)}: {e}") from e
+
+
+def checkout(repo_url: str, repo_path: str, temp_dir: str, revision: str = "HEAD"):
+    """
+    Sparse checkout of the release directory only, the parent directories are checked out empty
+
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :param temp_dir: checkout directory of the repo
+    :param revision: revision to check out
+    :return: None
+    """
+    run_svn("checkout", "--depth", "empty", "-r", revision, repo_url, temp_dir)
+    update(repo_path, temp_dir, revision)
+
+
+def update(repo_path: str, temp_dir: str, revision: str = "HEAD"):
+    repo_path = repo_path.strip("/")
+    if repo_path:
+        run_svn(
+            "update",
+            "--parents",
+            "--set-depth",
+            "files",
+            "-r",
+            revision,
+            os.path.join(temp_dir, repo_path),
+        )
+    else:
+        run_svn("update", "--set-depth", "files", "-r", revision, temp_dir)
+
+
+def state_path(temp_dir: str, name: str = STATE_FILE_NAME) -> str:
+    return os.path.join(temp_dir, ".svn", name)
+
+
+def read_state(temp_dir: str) -> dict[str, Any]:
+    """
+    State of the working copy recorded by the previous fetch, empty when missing or corrupt
+    """
+    try:
+        with open(state_path(temp_dir)) as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def write_state(temp_dir: str, state: dict[str, Any]):
+    with open(state_path(temp_dir), "w") as state_file:
+        json.dump(state, state_file)
+
+
+def working_copy_damage(
+    repo_url: str, repo_path: str, temp_dir: str, state: dict[str, Any]
+) -> str | None:
+    """
+    Reason a restored working copy can not be updated, None when it can
+
+    The working copy must be a checkout of repo_url, svn cleanup must succeed, svn status must
+    not report any change and every file must still have the size recorded by the previous fetch.
+    """
+    if state.get("url") != repo_url:
+        return f"it was not fetched from {repo_url}"
+    try:
+        info = svn_xml("info", temp_dir)
+        url = info.findtext("entry/url")
+        if url is None or url.rstrip("/") != repo_url.rstrip("/"):
+            return f"it is a checkout of {url}"
+        run_svn("cleanup", temp_dir)
+        status = svn_xml("status", os.path.join(temp_dir, repo_path.strip("/")))
+    except FetchError as e:
+        return str(e)
+
+    for entry in status.iter("entry"):
+        item = entry.find("wc-status").get("item")
+        if item not in ("normal", "external"):
+            return f"{entry.get('path')} is {item}"
+
+    directory = os.path.join(temp_dir, repo_path.strip("/"))
+    for name, record in state.get("files", {}).items():
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path) or os.path.getsize(path) != record.get("size"):
+            return f"{path} does not have the recorded size {record.get('size')}"
+    return None
+
+
+def record_files(repo_path: str, temp_dir: str) -> tuple[int, dict[str, dict[str, int]]]:
+    """
+    Revision of the working copy, and the last changed revision and size of every file
+    """
+    directory = os.path.join(temp_dir, repo_path.strip("/"))
+    info = svn_xml("info", "--depth", "files", directory)
+    revision = 0
+    files = {}
+    for entry in info.iter("entry"):
+        if entry.get("kind") == "dir":
+            revision = max(revision, int(entry.get("revision")))
+            continue
+        name = os.path.basename(entry.get("path"))
+        files[name] = {
+            "revision": int(entry.find("commit").get("revision")),
+            "size": os.path.getsize(os.path.join(directory, name)),
+        }
+    return revision, files
+
+
+def changed_since_verified(state: dict[str, Any]) -> list[str]:
+    """
+    Files added or changed since the last verified revision, all the files when none was verified
+    """
+    verified_files = state.get("verified", {}).get("files", {})
+    return sorted(
+        name for name, record in state["files"].items() if verified_files.get(name) != record
+    )
+
+
+def fetch_incremental(
+    repo_url: str, repo_path: str, temp_dir: str, revision: str = "HEAD"
+) -> list[str]:
+    """
+    Update the working copy restored from a cache, or check it out when there is none or it is damaged
+
+    The revision and size of every file are recorded in the working copy, to detect damages
+    on the next run and to tell the files changed since the last verified revision.
+
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :param temp_dir: checkout directory of the repo, restored from the cache
+    :param revision: revision to update to
+    :return: files changed since the last verified revision
+    """
+    state = read_state(temp_dir)
+    damage = None
+    if os.path.isdir(os.path.join(temp_dir, ".svn")):
+        damage = working_copy_damage(repo_url, repo_path, temp_dir, state)
+        if damage is None:
+            console.print(
+                f"[blue]Updating the working copy from revision {state.get('revision')} to {revision}[/]"
+            )
+            try:
+                update(repo_path, temp_dir, revision)
+            except FetchError as e:
+                damage = str(e)
+        if damage is not None:
+            console.print(
+                f"[yellow]Warning: the cached working copy can not be reused, {damage}. "
+                f"Checking out from scratch[/]"
+            )
+    if damage is not None or not os.path.isdir(os.path.join(temp_dir, ".svn")):
+        # Nothing of a damaged working copy is trusted, the files are all verified again
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        state = {}
+        checkout(repo_url, repo_path, temp_dir, revision)
+
+    state["url"] = repo_url
+    state["revision"], state["files"] = record_files(repo_path, temp_dir)
+    write_state(temp_dir, state)
+    return changed_since_verified(state)
+
+
+def mark_verified(temp_dir: str):
+    """
+    Record the files of the working copy as verified, the next fetch only reports the files changed since
+    """
+    state = read_state(temp_dir)
+    if not state.get("files"):
+        raise FetchError(f"No fetch recorded in {temp_dir}")
+    state["verified"] = {"revision": state["revision"], "files": state["files"]}
+    write_state(temp_dir, state)
+
+
+def export(repo_url: str, repo_path: str, temp_dir: str):
+    """
+    Export the files of the release directory, without the svn metadata of a working copy
+    """
+    run_svn(
+        "export",
+        "--force",
+        "--depth",
+        "files",
+        join_url(repo_url, repo_path),
+        os.path.join(temp_dir, repo_path.strip("/")),
+    )
+
+
+def download(repo_url: str, repo_path: str, temp_dir: str, workers: int | None = None):
+    """
+    Download the files of the release directory over http, concurrently and resuming partial files
+    """
+    url = join_url(repo_url, repo_path)
+    directory = os.path.join(temp_dir, repo_path.strip("/"))
+    remote_files = list_remote_files(url)
+    results = download_files(
+        [
+            (url + quote(remote_file.name), os.path.join(directory, remote_file.name), remote_file.size)
+            for remote_file in remote_files
+        ],
+        workers=workers,
+    )
+    for result in results:
+        if result.skipped:
+            console.print(f"[blue]{result.path} already downloaded[/]")
+        elif result.resumed:
+            console.print(f"[blue]{result.path} resumed after {result.resumed} bytes[/]")
+
+
+def directory_size(path: str) -> tuple[int, int]:
+    """
+    Number of files and bytes of the directory, including the svn metadata
+    """
+    files = size = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            files += 1
+            size += os.path.getsize(os.path.join(root, name))
+    return files, size
+
+
+def fetch(
+    repo_url: str,
+    repo_path: str,
+    temp_dir: str,
+    method: str = "checkout",
+    workers: int | None = None,
+    revision: str = "HEAD",
+):
+    """
+    Fetch the release directory of the repo into temp_dir/repo_path, and only that directory
+
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :param temp_dir: directory to fetch the repo into
+    :param method: checkout, export or http
+    :param workers: number of concurrent downloads of the http method
+    :param revision: revision of the checkout method
+    :return: None
+    """
+    if method == "checkout":
+        checkout(repo_url, repo_path, temp_dir, revision)
+    elif method == "export":
+        export(repo_url, repo_path, temp_dir)
+    elif method == "http":
+        download(repo_url, repo_path, temp_dir, workers)
+    else:
+        raise FetchError(f"Unknown fetch method {method}, expected one of {', '.join(FETCH_METHODS)}")
+
+
+def fetch_release(
+    repo_url: str,
+    repo_path: str,
+    temp_dir: str,
+    method: str = "checkout",
+    workers: int | None = None,
+    revision: str = "HEAD",
+    working_copy_cache: bool = False,
+) -> list[str] | None:
+    """
+    Fetch the release directory, updating the cached working copy with the working copy cache
+
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :param temp_dir: directory to fetch the repo into
+    :param method: checkout, export or http
+    :param workers: number of concurrent downloads of the http method
+    :param revision: revision to check out or update to
+    :param working_copy_cache: reuse the working copy of temp_dir, needs the checkout method
+    :return: files changed since the last verified revision with the working copy cache, else None
+    """
+    console.print(f"[blue]Fetching {join_url(repo_url, repo_path)} with {method}[/]")
+    start = time.perf_counter()
+    changed_files = None
+    if working_copy_cache and method == "checkout":
+        changed_files = fetch_incremental(repo_url, repo_path, temp_dir, revision)
+        console.print(
+            f"[blue]{len(changed_files)} files changed since the last verified revision[/]"
+        )
+    else:
+        if working_copy_cache:
+            console.print(
+                f"[yellow]Warning: the working copy cache needs the checkout method, "
+                f"fetching with {method}[/]"
+            )
+        fetch(repo_url, repo_path, temp_dir, method, workers, revision)
+
+    files, size = directory_size(temp_dir)
+    console.print(
+        f"[blue]Fetched {files} files, {size} bytes into {temp_dir} "
+        f"in {time.perf_counter() - start:.1f}s[/]"
+    )
+    return changed_files
+
+
+if __name__ == "__main__":
+    temp_dir = os.environ.get("TEMP_DIR") or "asf-dist"
+    if "--mark-verified" in sys.argv:
+        try:
+            mark_verified(temp_dir)
+        except FetchError as e:
+            console.print(f"[red]Error: {e}[/]")
+            sys.exit(1)
+        console.print(f"[blue]Files of {temp_dir} recorded as verified[/]")
+        sys.exit(0)
+
+    repo_url = os.environ.get("REPO_URL")
+    if not repo_url:
+        console.print(
+            "[red]Error: REPO_URL not set[/]\n"
+            "You must set `REPO_URL` environment variable to run this script"
+        )
+        sys.exit(1)
+
+    repo_path = os.environ.get("REPO_PATH", "")
+    method = os.environ.get("FETCH_METHOD") or "checkout"
+    workers = int(os.environ["DOWNLOAD_WORKERS"]) if os.environ.get("DOWNLOAD_WORKERS") else None
+    revision = os.environ.get("SVN_REVISION") or "HEAD"
+    working_copy_cache = os.environ.get("WORKING_COPY_CACHE", "false").lower() in ("true", "1", "yes")
+
+    try:
+        changed_files = fetch_release(
+            repo_url, repo_path, temp_dir, method, workers, revision, working_copy_cache
+        )
+    except (FetchError, RemoteListingError, DownloadError, OSError) as e:
+        console.print(f"[red]Error: {e}[/]")
+        sys.exit(1)
+
+    if changed_files is not None:
+        changed_files_path = state_path(temp_dir, CHANGED_FILES_NAME)
+        with open(changed_files_path, "w") as changed_files_file:
+            changed_files_file.writelines(f"{name}\n" for name in changed_files)
+        write_github_output(changed_files=os.path.abspath(changed_files_path))
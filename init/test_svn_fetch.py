@@ -0,0 +1,268 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import os
+import shutil
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import quote, unquote
+
+import pytest
+
+from init.svn_fetch import (
+    FetchError,
+    changed_since_verified,
+    directory_size,
+    fetch,
+    fetch_incremental,
+    mark_verified,
+    read_state,
+    state_path,
+    working_copy_damage,
+    write_state,
+)
+
+# Release directories of a dist area, only one of them is fetched
+DIST = {
+    "providers": {
+        "apache_airflow_providers_http-5.0.0.tar.gz": b"http" * 1000,
+        "apache_airflow_providers_http-5.0.0.tar.gz.asc": b"signature",
+        "apache airflow providers ftp-1.0.0.tar.gz": b"ftp" * 1000,
+    },
+    "helm-chart": {"airflow-1.15.0.tgz": b"chart" * 100000},
+}
+
+
+class DistHandler(BaseHTTPRequestHandler):
+    """
+    The dist area at /dist/, listed with PROPFIND and downloaded with GET
+    """
+
+    requests_received: list[tuple[str, str]] = []
+
+    def do_PROPFIND(self):
+        DistHandler.requests_received.append(("PROPFIND", self.path))
+        directory = self.path.strip("/").split("/")[-1]
+        responses = [f"<D:response><D:href>{self.path}</D:href></D:response>"] + [
+            f"<D:response><D:href>{self.path}{quote(name)}</D:href><D:propstat><D:prop>"
+            f"<D:getcontentlength>{len(content)}</D:getcontentlength></D:prop></D:propstat>"
+            "</D:response>"
+            for name, content in DIST[directory].items()
+        ]
+        body = (
+            '<?xml version="1.0" encoding="utf-8"?><D:multistatus xmlns:D="DAV:">'
+            + "".join(responses)
+            + "</D:multistatus>"
+        ).encode()
+        self.send_response(207)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        DistHandler.requests_received.append(("GET", self.path))
+        directory, name = unquote(self.path).strip("/").split("/")[-2:]
+        body = DIST[directory][name]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def dist_server():
+    DistHandler.requests_received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DistHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/dist"
+    server.shutdown()
+    server.server_close()
+
+
+def read_tree(path) -> dict[str, bytes]:
+    return {
+        os.path.relpath(os.path.join(root, name), path): open(os.path.join(root, name), "rb").read()
+        for root, directories, names in os.walk(path)
+        if ".svn" not in root.split(os.sep)
+        for name in names
+    }
+
+
+def test_fetch_with_http(dist_server, tmp_path):
+    temp_dir = str(tmp_path / "asf-dist")
+
+    with patch("init.svn_fetch.console"):
+        fetch(dist_server, "providers/", temp_dir, "http", workers=2)
+
+    assert read_tree(temp_dir) == {
+        os.path.join("providers", name): content for name, content in DIST["providers"].items()
+    }
+    assert directory_size(temp_dir) == (3, sum(map(len, DIST["providers"].values())))
+
+    # The files already downloaded are not downloaded again
+    DistHandler.requests_received.clear()
+    with patch("init.svn_fetch.console"):
+        fetch(dist_server, "providers/", temp_dir, "http")
+    assert DistHandler.requests_received == [("PROPFIND", "/dist/providers/")]
+
+
+def test_fetch_with_unknown_method(tmp_path):
+    with pytest.raises(FetchError, match="Unknown fetch method"):
+        fetch("https://dist.apache.org/repos/dist/dev/airflow", "providers/", str(tmp_path), "rsync")
+
+
+@pytest.fixture
+def dist_repository(tmp_path):
+    if shutil.which("svn") is None or shutil.which("svnadmin") is None:
+        pytest.skip("svn is not installed")
+    repository = tmp_path / "repository"
+    subprocess.run(["svnadmin", "create", str(repository)], check=True)
+    source = tmp_path / "source"
+    for directory, files in DIST.items():
+        (source / directory).mkdir(parents=True)
+        for name, content in files.items():
+            (source / directory / name).write_bytes(content)
+    url = f"file://{repository}"
+    subprocess.run(
+        ["svn", "import", "--non-interactive", "-m", "release", str(source), url],
+        check=True,
+        capture_output=True,
+    )
+    return url
+
+
+@pytest.mark.parametrize("method", ["checkout", "export"])
+def test_fetch_with_svn_only_fetches_repo_path(dist_repository, tmp_path, method):
+    temp_dir = str(tmp_path / "asf-dist")
+
+    fetch(dist_repository, "providers/", temp_dir, method)
+
+    assert read_tree(temp_dir) == {
+        os.path.join("providers", name): content for name, content in DIST["providers"].items()
+    }
+    assert os.path.isdir(os.path.join(temp_dir, ".svn")) == (method == "checkout")
+
+
+def test_changed_since_verified():
+    state = {
+        "files": {
+            "apache_airflow-2.10.4.tar.gz": {"revision": 10, "size": 100},
+            "apache_airflow-2.10.4.tar.gz.asc": {"revision": 12, "size": 10},
+            "apache_airflow-2.10.5.tar.gz": {"revision": 12, "size": 100},
+        }
+    }
+    assert changed_since_verified(state) == sorted(state["files"])
+
+    state["verified"] = {
+        "revision": 11,
+        "files": {
+            "apache_airflow-2.10.4.tar.gz": {"revision": 10, "size": 100},
+            "apache_airflow-2.10.4.tar.gz.asc": {"revision": 10, "size": 10},
+        },
+    }
+    assert changed_since_verified(state) == [
+        "apache_airflow-2.10.4.tar.gz.asc",
+        "apache_airflow-2.10.5.tar.gz",
+    ]
+
+
+def test_read_state_of_corrupt_working_copy(tmp_path):
+    (tmp_path / ".svn").mkdir()
+    assert read_state(str(tmp_path)) == {}
+    (tmp_path / ".svn" / "gh-pub-fetch.json").write_text("{not json")
+    assert read_state(str(tmp_path)) == {}
+    write_state(str(tmp_path), {"url": "file:///repo"})
+    assert read_state(str(tmp_path)) == {"url": "file:///repo"}
+
+
+def test_working_copy_of_another_url_is_damaged(tmp_path):
+    assert working_copy_damage(
+        "https://dist.apache.org/repos/dist/dev/airflow",
+        "providers/",
+        str(tmp_path),
+        {"url": "https://dist.apache.org/repos/dist/release/airflow"},
+    ) == "it was not fetched from https://dist.apache.org/repos/dist/dev/airflow"
+
+
+def test_mark_verified_without_fetch(tmp_path):
+    (tmp_path / ".svn").mkdir()
+    with pytest.raises(FetchError, match="No fetch recorded"):
+        mark_verified(str(tmp_path))
+
+
+def svn_commit(dist_repository, tmp_path, files: dict[str, bytes]):
+    staging = tmp_path / "staging"
+    subprocess.run(
+        ["svn", "checkout", "--non-interactive", f"{dist_repository}/providers", str(staging)],
+        check=True,
+        capture_output=True,
+    )
+    for name, content in files.items():
+        (staging / name).write_bytes(content)
+    subprocess.run(["svn", "add", "--force", str(staging)], check=True, capture_output=True)
+    subprocess.run(
+        ["svn", "commit", "--non-interactive", "-m", "update", str(staging)],
+        check=True,
+        capture_output=True,
+    )
+    shutil.rmtree(staging)
+
+
+def test_fetch_incremental_reports_changed_files(dist_repository, tmp_path):
+    temp_dir = str(tmp_path / "asf-dist")
+
+    with patch("init.svn_fetch.console"):
+        assert fetch_incremental(dist_repository, "providers/", temp_dir) == sorted(
+            DIST["providers"]
+        )
+        mark_verified(temp_dir)
+        assert fetch_incremental(dist_repository, "providers/", temp_dir) == []
+
+        svn_commit(
+            dist_repository, tmp_path, {"apache_airflow_providers_smtp-2.0.0.tar.gz": b"smtp"}
+        )
+        assert fetch_incremental(dist_repository, "providers/", temp_dir) == [
+            "apache_airflow_providers_smtp-2.0.0.tar.gz"
+        ]
+    assert read_state(temp_dir)["verified"]["revision"] < read_state(temp_dir)["revision"]
+
+
+def test_fetch_incremental_checks_out_damaged_working_copy(dist_repository, tmp_path):
+    temp_dir = str(tmp_path / "asf-dist")
+    with patch("init.svn_fetch.console"):
+        fetch_incremental(dist_repository, "providers/", temp_dir)
+    mark_verified(temp_dir)
+    package = os.path.join(temp_dir, "providers", "apache_airflow_providers_http-5.0.0.tar.gz")
+    with open(package, "ab") as f:
+        f.write(b"tampered")
+
+    with patch("init.svn_fetch.console") as mock_console:
+        changed_files = fetch_incremental(dist_repository, "providers/", temp_dir)
+
+    # Nothing verified in the damaged working copy is trusted
+    assert changed_files == sorted(DIST["providers"])
+    assert "can not be reused" in mock_console.print.call_args_list[0].args[0]
+    assert read_tree(temp_dir) == {
+        os.path.join("providers", name): content for name, content in DIST["providers"].items()
+    }
+    assert os.path.exists(state_path(temp_dir))
@@ -27,10 +27,10 @@ import json
 import os
 import sys
 
-import yaml
-from jsonschema.validators import validator_for
 from rich.console import Console
 
+from common.release_config import config_errors, read_file
+
 console = Console(width=200, color_system="standard")
 config_file = os.environ.get("RELEASE_CONFIG_FILE")
 schema_path = os.environ.get("RELEASE_CONFIG_SCHEMA")
@@ -59,21 +59,6 @@ def set_outputs(yml_config):
                     f.write(f"{root_element}-{key}={value}\n")
 
 
-def read_file(path) -> dict:
-    """
-    Read the file and return the data
-    :param path:
-    :return:
-    """
-    if path.endswith(".yml") or path.endswith(".yaml"):
-        with open(path) as file:
-            return yaml.safe_load(file)
-
-    if path.endswith(".json"):
-        with open(path) as file:
-            return json.load(file)
-
-
 def validate_config(yml_config):
     """
     Validate the release config against the schema
@@ -81,19 +66,12 @@ def validate_config(yml_config):
     :param yml_config:
     :return: None
     """
-    exit_code = 0
-
-    with open(schema_path) as schema_file:
-        schema = json.loads(schema_file.read())
-
-    validator = validator_for(schema)
-    validator.check_schema(schema)
+    errors = config_errors(yml_config, schema_path)
 
-    for error in validator(schema).iter_errors(yml_config):
-        exit_code = 1
+    for error in errors:
         console.print(f"[red]Error: {error}[/]")
 
-    if exit_code:
+    if errors:
         console.print("[red]Release config validation failed[/]")
 
 
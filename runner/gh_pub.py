@@ -0,0 +1,361 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# /// script
+# requires-python = ">=3.11"
+# dependencies = [
+#     "rich",
+#     "requests",
+#     "python-gnupg",
+#     "cryptography",
+#     "pyyaml",
+#     "jsonschema",
+#     "packaging",
+# ]
+# ///
+"""
+Run all the checks of a release in one interpreter.
+
+The release config is read once and the release directory is scanned once, the svn, checksum,
+signature and artifact stages share the config and the index of the files in-process, instead of
+a composite action per stage, each with its own python setup, dependencies and directory scan.
+
+The stages run as a dependency graph: the svn check, the hashing of the artifacts and the download
+and import of the KEYS files have no dependency on each other and run concurrently, the signatures
+are verified once the keys are imported and the packages are moved once all the checks passed.
+
+With REPO_URL set the runner fetches the release directory itself, in a checkout stage the checks
+run after, and the KEYS files are prefetched and imported while the release is fetched.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tempfile
+from collections.abc import Callable, Iterable
+from functools import partial
+from typing import Any
+
+from rich.console import Console
+
+from artifacts.publish_packages_finder import PublishPackagesFinder
+from checksum.checksum_check import manifest_path, run_checksum_check
+from common.artifact_index import COMPANION_KINDS, ArtifactIndex, load_changed_files
+from common.download import DownloadError
+from common.manifest import load_manifest
+from common.release_config import config_errors, read_file
+from common.remote_listing import RemoteListingError
+from common.verification_cache import cache_disabled
+from init.svn_fetch import FetchError, fetch_release
+from runner.scheduler import Stage, StageResult, report_timeline, run_stages
+from signature.signature_check import (
+    SigningKeys,
+    prefetch_signing_keys,
+    prepare_signing_keys,
+    run_signature_check,
+)
+from svn.svn_check import fail_on_orphaned_companions, required_companions, run_svn_check
+
+console = Console(width=400, color_system="standard")
+
+
+def run_artifact_stage(
+    artifact_config: dict[str, Any],
+    artifact_index: ArtifactIndex,
+    manifest: dict[str, dict[str, Any]],
+) -> bool:
+    """
+    Move the verified packages to the dist folder, from the index of the checks
+
+    :param artifact_config: artifact config from the release config
+    :param artifact_index: index of the files of the release directory
+    :param manifest: artifacts verified by the checksum check, by name
+    :return: True when the packages were moved
+    """
+    finder = PublishPackagesFinder()
+    finder.artifacts_config = artifact_config
+    finder.artifact_index = artifact_index
+    finder.verified_manifest = manifest
+    finder.run()
+    return True
+
+
+class Release:
+    """
+    Index of the release directory and the files changed since the last verified revision,
+    set by the checkout stage when the runner fetches the release itself
+    """
+
+    __slots__ = ("artifact_index", "changed_files")
+
+    def __init__(
+        self,
+        artifact_index: ArtifactIndex | None = None,
+        changed_files: set[str] | None = None,
+    ):
+        self.artifact_index = artifact_index
+        self.changed_files = changed_files
+
+
+def checkout_release(
+    release: Release,
+    repo_url: str,
+    repo_path: str,
+    temp_dir: str,
+    companion_kinds: Iterable[str] = COMPANION_KINDS,
+    use_cache: bool = True,
+    **fetch_options: Any,
+) -> bool:
+    """
+    Fetch the release directory and index its files, the checks open the files through the index
+    so the working directory of the other stages is left alone
+
+    :param release: the index and the changed files are set on it
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :param temp_dir: directory to fetch the repo into
+    :param companion_kinds: kinds of the companion files of the index
+    :param use_cache: only check the signatures of the files changed since the last verified
+        revision of the cached working copy
+    :param fetch_options: method, workers, revision and working_copy_cache of fetch_release
+    :return: True when the release directory was fetched and has files
+    """
+    try:
+        changed_files = fetch_release(repo_url, repo_path, temp_dir, **fetch_options)
+    except (FetchError, RemoteListingError, DownloadError, OSError) as e:
+        console.print(f"[red]Error: {e}[/]")
+        return False
+
+    release.artifact_index = ArtifactIndex.from_directory(
+        os.path.join(temp_dir, repo_path), companion_kinds=companion_kinds
+    )
+    if changed_files is not None and use_cache:
+        release.changed_files = set(changed_files)
+
+    if not release.artifact_index.files:
+        console.print(f"[red]Error: No files found in SVN directory at {repo_path}[/]")
+        return False
+    return True
+
+
+def build_stages(
+    config: dict[str, Any],
+    release: Release,
+    use_cache: bool = True,
+    manifest_dir: str | None = None,
+    required_kinds: list[str] | None = None,
+    checkout: Callable[[], bool] | None = None,
+    fail_on_orphans: bool = False,
+) -> list[Stage]:
+    """
+    Build the graph of the configured stages
+
+    With a checkout stage the KEYS files are prefetched and imported while the release is checked
+    out, all the other stages run after the checkout.
+
+    :param config: the release config
+    :param release: index of the release directory, set by the checkout stage with a checkout
+    :param use_cache: skip the artifacts verified in a previous run
+    :param manifest_dir: directory of the manifest of the verified artifacts, a temporary
+        directory when not set
+    :param required_kinds: kinds of the companions every data file must have, eg: ["asc", "sha512"]
+    :param checkout: fetches the release directory and sets the index of the release, None when
+        the release directory is already there
+    :param fail_on_orphans: fail the svn check on the companion files without their data file
+    :return: the stages, every stage listed after the stages it runs after
+    """
+    checks = config.get("checks") or {}
+    manifest_dir = manifest_dir or tempfile.mkdtemp(prefix="gh-pub-manifest-")
+    signature_config: list[dict[str, Any]] = checks.get("signature") or []
+    manifest: dict[str, dict[str, Any]] = {}
+    signing_keys: list[SigningKeys | None] = []
+    stages = []
+
+    after_checkout = []
+    if checkout is not None:
+        stages.append(Stage("checkout", checkout))
+        after_checkout = ["checkout"]
+
+    if checks.get("svn"):
+        stages.append(
+            Stage(
+                "svn",
+                lambda: run_svn_check(
+                    checks["svn"], release.artifact_index, required_kinds, fail_on_orphans
+                ),
+                after=after_checkout,
+            )
+        )
+
+    if checks.get("checksum"):
+
+        def checksum_stage() -> bool:
+            if not run_checksum_check(
+                checks["checksum"],
+                release.artifact_index,
+                checks.get("signature"),
+                use_cache,
+                manifest_dir,
+                # Forked workers would copy the threads of the other stages
+                executor="thread",
+            ):
+                return False
+            manifest.update(load_manifest(manifest_path(manifest_dir)))
+            return True
+
+        stages.append(Stage("checksum", checksum_stage, after=after_checkout))
+        # The native signature checks run in the same read as the checksums
+        signature_config = [
+            check for check in signature_config if check.get("method") != "native"
+        ]
+
+    if signature_config:
+
+        def keys_stage() -> bool:
+            if checkout is not None:
+                # The artifacts are not there yet, all the keys of the KEYS files are imported
+                signing_keys.extend(
+                    prefetch_signing_keys(check, use_cache) for check in signature_config
+                )
+                return True
+
+            signature_index = release.artifact_index
+            if release.changed_files is not None:
+                signature_index = signature_index.subset(release.changed_files)
+            signing_keys.extend(
+                prepare_signing_keys(check, signature_index, use_cache)
+                for check in signature_config
+            )
+            return True
+
+        stages.append(Stage("keys", keys_stage))
+        # The cached signature results are looked up by the digests of the manifest
+        signature_after = ["keys", *after_checkout]
+        if use_cache and checks.get("checksum"):
+            signature_after.append("checksum")
+        stages.append(
+            Stage(
+                "signature",
+                lambda: run_signature_check(
+                    signature_config,
+                    release.artifact_index,
+                    use_cache,
+                    manifest or None,
+                    release.changed_files,
+                    signing_keys,
+                ),
+                after=signature_after,
+            )
+        )
+
+    if checks.get("artifact"):
+        stages.append(
+            Stage(
+                "artifact",
+                lambda: run_artifact_stage(
+                    checks["artifact"], release.artifact_index, manifest
+                ),
+                after=[stage.name for stage in stages],
+            )
+        )
+    return stages
+
+
+def report_stages(results: list[StageResult]):
+    """
+    Print the timeline of the stages and the wall time of the run
+    """
+    report_timeline(results)
+    console.print(
+        f"[blue]{len(results)} stages ran in {max((result.end for result in results), default=0):.2f}s[/]"
+    )
+
+
+if __name__ == "__main__":
+    config_file = os.environ.get("RELEASE_CONFIG_FILE")
+
+    if not config_file:
+        console.print(
+            "[red]Error:  RELEASE_CONFIG_FILE not set[/]\n"
+            "You must set `RELEASE_CONFIG_FILE` environment variable to run this script"
+        )
+        sys.exit(1)
+
+    release_config = read_file(config_file)
+    if not release_config:
+        console.print(f"[red]Error: Unable to read the release config {config_file}[/]")
+        sys.exit(1)
+
+    if os.environ.get("RELEASE_CONFIG_SCHEMA"):
+        errors = config_errors(release_config, os.environ["RELEASE_CONFIG_SCHEMA"])
+        for error in errors:
+            console.print(f"[red]Error: {error}[/]")
+        if errors:
+            console.print("[red]Release config validation failed[/]")
+            sys.exit(1)
+
+    required_kinds = required_companions()
+    companion_kinds = COMPANION_KINDS | set(required_kinds)
+    use_cache = not cache_disabled(sys.argv)
+    release = Release()
+    checkout = None
+
+    if os.environ.get("REPO_URL"):
+        checkout = partial(
+            checkout_release,
+            release,
+            os.environ["REPO_URL"],
+            os.environ.get("REPO_PATH", ""),
+            os.path.abspath(os.environ.get("TEMP_DIR") or "asf-dist"),
+            companion_kinds,
+            use_cache,
+            method=os.environ.get("FETCH_METHOD") or "checkout",
+            workers=int(os.environ["DOWNLOAD_WORKERS"])
+            if os.environ.get("DOWNLOAD_WORKERS")
+            else None,
+            revision=os.environ.get("SVN_REVISION") or "HEAD",
+            working_copy_cache=os.environ.get("WORKING_COPY_CACHE", "false").lower()
+            in ("true", "1", "yes"),
+        )
+    else:
+        release.artifact_index = ArtifactIndex.from_directory(companion_kinds=companion_kinds)
+        if not release.artifact_index.files:
+            console.print(
+                f"[red]Error: No files found in SVN directory at {os.environ.get('REPO_PATH')}[/]"
+            )
+            sys.exit(1)
+
+        # Only the files changed since the last verified revision of a cached working copy
+        if use_cache:
+            release.changed_files = load_changed_files(os.environ.get("CHANGED_FILES"))
+
+    results = run_stages(
+        build_stages(
+            release_config,
+            release,
+            use_cache=use_cache,
+            manifest_dir=os.environ.get("MANIFEST_DIR"),
+            required_kinds=required_kinds,
+            checkout=checkout,
+            fail_on_orphans=fail_on_orphaned_companions(),
+        )
+    )
+    report_stages(results)
+
+    if not all(result.passed for result in results):
+        sys.exit(1)
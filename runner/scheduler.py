@@ -0,0 +1,196 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+"""
+Run the stages of the checks as a dependency graph with asyncio.
+
+Every stage runs in a worker thread as soon as the stages it depends on passed, so stages with no
+dependency on each other overlap, eg: the download and import of the KEYS file with the hashing of
+the artifacts. A stage whose dependency failed or was skipped is skipped. The timeline of the
+stages is printed with the critical path, the chain of stages that decided the wall time.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable, Iterable
+
+from rich.console import Console
+
+console = Console(width=400, color_system="standard")
+
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+TIMELINE_WIDTH = 40
+
+
+class Stage:
+    """
+    A stage of the checks with the names of the stages it runs after
+    """
+
+    __slots__ = ("name", "run", "after")
+
+    def __init__(self, name: str, run: Callable[[], bool], after: Iterable[str] = ()):
+        self.name = name
+        self.run = run
+        self.after = tuple(after)
+
+
+class StageResult:
+    """
+    Status of a stage with its start and end, in seconds from the start of the graph
+    """
+
+    __slots__ = ("name", "status", "start", "end", "after")
+
+    def __init__(
+        self, name: str, status: str, start: float, end: float, after: Iterable[str] = ()
+    ):
+        self.name = name
+        self.status = status
+        self.start = start
+        self.end = end
+        self.after = tuple(after)
+
+    @property
+    def passed(self) -> bool:
+        return self.status == PASSED
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+def run_stage(stage: Stage) -> bool:
+    """
+    Run a stage, a stage that exits or raises is reported as failed instead of ending the run
+    """
+    try:
+        return bool(stage.run())
+    except SystemExit as e:
+        return e.code in (None, 0)
+    except Exception as e:
+        console.print(f"[red]Error: {stage.name} stage failed: {e}[/]")
+        return False
+
+
+async def run_graph(stages: list[Stage]) -> list[StageResult]:
+    """
+    Run the stages, every stage as soon as the stages it runs after passed
+
+    :param stages: the stages, every stage listed after the stages it runs after
+    :return: results of the stages, in the order of the stages
+    """
+    started = time.perf_counter()
+    tasks: dict[str, asyncio.Task[StageResult]] = {}
+
+    async def run(stage: Stage) -> StageResult:
+        dependencies = await asyncio.gather(*(tasks[name] for name in stage.after))
+        if not all(dependency.passed for dependency in dependencies):
+            now = time.perf_counter() - started
+            return StageResult(stage.name, SKIPPED, now, now, stage.after)
+
+        console.print(f"[blue]Running the {stage.name} stage[/]")
+        start = time.perf_counter() - started
+        passed = await asyncio.to_thread(run_stage, stage)
+        return StageResult(
+            stage.name,
+            PASSED if passed else FAILED,
+            start,
+            time.perf_counter() - started,
+            stage.after,
+        )
+
+    for stage in stages:
+        unknown = [name for name in stage.after if name not in tasks]
+        if unknown:
+            raise ValueError(f"Stage {stage.name} runs after unknown stages {unknown}")
+        tasks[stage.name] = asyncio.create_task(run(stage))
+
+    return [await tasks[stage.name] for stage in stages]
+
+
+def run_stages(stages: list[Stage]) -> list[StageResult]:
+    """
+    Run the graph of stages in a new event loop, see run_graph
+    """
+    return asyncio.run(run_graph(stages))
+
+
+def critical_path(results: list[StageResult]) -> list[StageResult]:
+    """
+    Chain of the stages that decided the wall time, from the stage that ended last back through
+    the dependency that ended last of every stage
+
+    :param results: results of the stages
+    :return: the stages of the critical path, in the order they ran
+    """
+    by_name = {result.name: result for result in results}
+    path = []
+    result = max(results, key=lambda result: result.end, default=None)
+    while result is not None:
+        path.append(result)
+        result = max(
+            (by_name[name] for name in result.after),
+            key=lambda dependency: dependency.end,
+            default=None,
+        )
+    return path[::-1]
+
+
+def timeline(results: list[StageResult], width: int = TIMELINE_WIDTH) -> list[str]:
+    """
+    Lines of the timeline of the stages, every stage drawn as a bar over the wall time
+
+    :param results: results of the stages
+    :param width: width of the bars in characters
+    :return: one line per stage
+    """
+    total = max((result.end for result in results), default=0) or 1
+    name_width = max((len(result.name) for result in results), default=0)
+    lines = []
+    for result in results:
+        bar = " " * width
+        if result.status != SKIPPED:
+            begin = min(int(result.start / total * width), width - 1)
+            end = max(round(result.end / total * width), begin + 1)
+            bar = " " * begin + "#" * (end - begin) + " " * (width - end)
+        lines.append(
+            f"{result.name:<{name_width}} |{bar}| {result.start:6.2f}s - {result.end:6.2f}s "
+            f"{result.status}"
+        )
+    return lines
+
+
+def report_timeline(results: list[StageResult]):
+    """
+    Print the timeline of the stages and the critical path
+    """
+    for line in timeline(results):
+        color = "blue" if line.endswith(PASSED) else "red"
+        console.print(f"[{color}]{line}[/]", highlight=False)
+    path = critical_path(results)
+    if path:
+        console.print(
+            f"[blue]Critical path: {' -> '.join(result.name for result in path)} "
+            f"in {path[-1].end:.2f}s[/]",
+            highlight=False,
+        )
@@ -0,0 +1,257 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import hashlib
+import os
+from unittest.mock import patch
+
+import pytest
+
+from checksum import checksum_check
+from checksum.checksum_check import manifest_path
+from common.artifact_index import ArtifactIndex
+from common.manifest import load_manifest
+from runner.gh_pub import Release, build_stages, checkout_release
+from runner.scheduler import run_stages
+from svn import svn_check
+
+CONFIG = {
+    "checks": {
+        "svn": [
+            {
+                "id": "extension",
+                "description": "Validate svn package extensions",
+                "identifiers": [{"type": "regex", "pattern": ".*(tar.gz|tar.gz.sha512)$"}],
+            }
+        ],
+        "checksum": [
+            {"id": "checksum", "description": "Validate check sum", "algorithm": "sha512"}
+        ],
+        "signature": [
+            {
+                "id": "signature",
+                "description": "Validate signatures",
+                "method": "native",
+                "keys": "https://example.com/KEYS",
+            }
+        ],
+        "artifact": {
+            "id": "artifact",
+            "description": "Find artifacts to publish",
+            "exclude": [{"type": "regex", "pattern": ".*(.sha512)$"}],
+        },
+    }
+}
+
+RESULT_LISTS = (
+    checksum_check.invalid_checksums,
+    checksum_check.orphaned_checksum_files,
+    checksum_check.invalid_signature_files,
+    svn_check.unknown_files,
+    svn_check.unknown_file_extensions,
+    svn_check.empty_files,
+    svn_check.missing_companions,
+)
+
+
+@pytest.fixture
+def release_dir(tmp_path, monkeypatch):
+    release = tmp_path / "release"
+    release.mkdir()
+    for name in ("package1-1.0.0.tar.gz", "package2-1.0.0.tar.gz"):
+        data = name.encode()
+        (release / name).write_bytes(data)
+        (release / f"{name}.sha512").write_text(
+            f"{hashlib.sha512(data).hexdigest()}  {name}\n"
+        )
+    for results in RESULT_LISTS:
+        results.clear()
+    monkeypatch.chdir(release)
+    monkeypatch.setenv("DIST_PATH", str(tmp_path / "dist"))
+    yield release
+    for results in RESULT_LISTS:
+        results.clear()
+
+
+def run_without_signatures(artifact_index, tmp_path):
+    return run_stages(
+        build_stages(
+            {"checks": {**CONFIG["checks"], "signature": []}},
+            Release(artifact_index),
+            use_cache=False,
+            manifest_dir=str(tmp_path / "manifest"),
+        )
+    )
+
+
+def test_run_stages_shares_one_index(release_dir, tmp_path):
+    with patch.object(ArtifactIndex, "from_directory") as from_directory:
+        results = run_without_signatures(
+            ArtifactIndex(sorted(os.listdir(release_dir))), tmp_path
+        )
+
+    from_directory.assert_not_called()
+    assert [result.name for result in results] == ["svn", "checksum", "artifact"]
+    assert all(result.passed for result in results)
+    assert sorted(os.listdir(tmp_path / "dist")) == [
+        "package1-1.0.0.tar.gz",
+        "package2-1.0.0.tar.gz",
+    ]
+
+
+def test_run_stages_on_the_index_of_another_directory(release_dir, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    results = run_without_signatures(ArtifactIndex.from_directory(str(release_dir)), tmp_path)
+
+    assert all(result.passed for result in results)
+    assert sorted(os.listdir(tmp_path / "dist")) == [
+        "package1-1.0.0.tar.gz",
+        "package2-1.0.0.tar.gz",
+    ]
+    assert sorted(load_manifest(manifest_path(str(tmp_path / "manifest")))) == [
+        "package1-1.0.0.tar.gz",
+        "package2-1.0.0.tar.gz",
+    ]
+
+
+def test_run_stages_skips_the_artifact_stage_when_a_check_failed(release_dir, tmp_path):
+    (release_dir / "package2-1.0.0.tar.gz").write_bytes(b"tampered")
+
+    results = run_without_signatures(ArtifactIndex.from_directory(), tmp_path)
+
+    assert [(result.name, result.status) for result in results] == [
+        ("svn", "passed"),
+        ("checksum", "failed"),
+        ("artifact", "skipped"),
+    ]
+    assert not (tmp_path / "dist").exists()
+
+
+def test_build_stages_leaves_native_signatures_to_the_checksum_stage(release_dir, tmp_path):
+    stages = build_stages(
+        CONFIG, Release(ArtifactIndex.from_directory()), use_cache=False, manifest_dir=str(tmp_path)
+    )
+
+    assert [(stage.name, stage.after) for stage in stages] == [
+        ("svn", ()),
+        ("checksum", ()),
+        ("artifact", ("svn", "checksum")),
+    ]
+    with patch("runner.gh_pub.run_checksum_check", return_value=False) as checksum_check:
+        stages[1].run()
+    assert checksum_check.call_args.args[2] == CONFIG["checks"]["signature"]
+
+
+@pytest.mark.parametrize(
+    "use_cache, signature_after",
+    [
+        pytest.param(False, ("keys",), id="without_cache"),
+        pytest.param(True, ("keys", "checksum"), id="with_cache_after_the_manifest"),
+    ],
+)
+def test_build_stages_imports_the_keys_while_hashing(
+    release_dir, tmp_path, use_cache, signature_after
+):
+    gpg_check = {**CONFIG["checks"]["signature"][0], "method": "gpg"}
+    config = {"checks": {**CONFIG["checks"], "signature": [gpg_check]}}
+
+    stages = build_stages(
+        config,
+        Release(ArtifactIndex.from_directory()),
+        use_cache=use_cache,
+        manifest_dir=str(tmp_path),
+    )
+
+    assert [(stage.name, stage.after) for stage in stages] == [
+        ("svn", ()),
+        ("checksum", ()),
+        ("keys", ()),
+        ("signature", signature_after),
+        ("artifact", ("svn", "checksum", "keys", "signature")),
+    ]
+    with patch(
+        "runner.gh_pub.prepare_signing_keys", return_value="signing keys"
+    ) as prepare_signing_keys, patch(
+        "runner.gh_pub.run_signature_check", return_value=True
+    ) as signature_check:
+        stages[2].run()
+        stages[3].run()
+    assert prepare_signing_keys.call_args.args[0] == gpg_check
+    assert signature_check.call_args.args[0] == [gpg_check]
+    assert signature_check.call_args.args[5] == ["signing keys"]
+
+
+def test_build_stages_prefetches_the_keys_during_the_checkout(tmp_path):
+    gpg_check = {**CONFIG["checks"]["signature"][0], "method": "gpg"}
+    config = {"checks": {**CONFIG["checks"], "signature": [gpg_check]}}
+    release = Release()
+
+    stages = build_stages(
+        config,
+        release,
+        use_cache=False,
+        manifest_dir=str(tmp_path),
+        checkout=lambda: True,
+    )
+
+    assert [(stage.name, stage.after) for stage in stages] == [
+        ("checkout", ()),
+        ("svn", ("checkout",)),
+        ("checksum", ("checkout",)),
+        ("keys", ()),
+        ("signature", ("keys", "checkout")),
+        ("artifact", ("checkout", "svn", "checksum", "keys", "signature")),
+    ]
+    with patch(
+        "runner.gh_pub.prefetch_signing_keys", return_value=None
+    ) as prefetch_signing_keys, patch("runner.gh_pub.prepare_signing_keys") as prepare_signing_keys:
+        stages[3].run()
+    prefetch_signing_keys.assert_called_once_with(gpg_check, False)
+    prepare_signing_keys.assert_not_called()
+
+
+def test_checkout_release_indexes_the_release_directory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    release_path = tmp_path / "asf-dist" / "providers"
+
+    def fetch_release(repo_url, repo_path, temp_dir, **fetch_options):
+        release_path.mkdir(parents=True)
+        (release_path / "package1-1.0.0.tar.gz").write_text("package")
+        (release_path / "package1-1.0.0.tar.gz.asc").write_text("signature")
+        return ["package1-1.0.0.tar.gz.asc"]
+
+    release = Release()
+    with patch("runner.gh_pub.fetch_release", side_effect=fetch_release):
+        assert checkout_release(
+            release,
+            "https://dist.apache.org/repos/dist/dev/airflow",
+            "providers",
+            str(tmp_path / "asf-dist"),
+            working_copy_cache=True,
+        )
+
+    assert os.getcwd() == str(tmp_path)
+    assert release.artifact_index.directory == str(release_path)
+    assert release.artifact_index.path("package1-1.0.0.tar.gz") == str(
+        release_path / "package1-1.0.0.tar.gz"
+    )
+    assert sorted(release.artifact_index.files) == [
+        "package1-1.0.0.tar.gz",
+        "package1-1.0.0.tar.gz.asc",
+    ]
+    assert release.changed_files == {"package1-1.0.0.tar.gz.asc"}
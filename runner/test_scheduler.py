@@ -0,0 +1,126 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+import threading
+
+import pytest
+
+from runner.scheduler import (
+    Stage,
+    StageResult,
+    critical_path,
+    run_stages,
+    timeline,
+)
+
+
+def test_run_stages_runs_independent_stages_concurrently():
+    # Both stages only pass when the other one is running at the same time
+    barrier = threading.Barrier(2, timeout=5)
+
+    def wait_for_the_other_stage() -> bool:
+        barrier.wait()
+        return True
+
+    results = run_stages(
+        [Stage("checksum", wait_for_the_other_stage), Stage("keys", wait_for_the_other_stage)]
+    )
+
+    assert [(result.name, result.status) for result in results] == [
+        ("checksum", "passed"),
+        ("keys", "passed"),
+    ]
+
+
+def test_run_stages_waits_for_the_dependencies():
+    order = []
+
+    def stage(name: str):
+        def run() -> bool:
+            order.append(name)
+            return True
+
+        return run
+
+    results = run_stages(
+        [
+            Stage("keys", stage("keys")),
+            Stage("signature", stage("signature"), after=["keys"]),
+            Stage("artifact", stage("artifact"), after=["keys", "signature"]),
+        ]
+    )
+
+    assert order == ["keys", "signature", "artifact"]
+    assert results[1].start >= results[0].end
+    assert results[2].start >= results[1].end
+
+
+def test_run_stages_skips_the_stages_after_a_failed_stage():
+    def fail():
+        raise SystemExit(1)
+
+    def raise_error():
+        raise RuntimeError("boom")
+
+    results = run_stages(
+        [
+            Stage("svn", lambda: True),
+            Stage("checksum", fail),
+            Stage("keys", raise_error),
+            Stage("signature", lambda: True, after=["keys"]),
+            Stage("artifact", lambda: True, after=["svn", "checksum", "signature"]),
+        ]
+    )
+
+    assert [(result.name, result.status) for result in results] == [
+        ("svn", "passed"),
+        ("checksum", "failed"),
+        ("keys", "failed"),
+        ("signature", "skipped"),
+        ("artifact", "skipped"),
+    ]
+
+
+def test_run_stages_rejects_unknown_dependencies():
+    with pytest.raises(ValueError, match="unknown stages"):
+        run_stages([Stage("artifact", lambda: True, after=["svn"])])
+
+
+def test_critical_path_follows_the_dependency_that_ended_last():
+    results = [
+        StageResult("svn", "passed", 0.0, 0.5),
+        StageResult("checksum", "passed", 0.0, 3.0),
+        StageResult("keys", "passed", 0.0, 1.0),
+        StageResult("signature", "passed", 1.0, 2.0, after=["keys"]),
+        StageResult("artifact", "passed", 3.0, 3.5, after=["svn", "checksum", "signature"]),
+    ]
+
+    assert [result.name for result in critical_path(results)] == ["checksum", "artifact"]
+
+
+def test_timeline():
+    results = [
+        StageResult("checksum", "passed", 0.0, 2.0),
+        StageResult("keys", "passed", 0.0, 1.0),
+        StageResult("artifact", "skipped", 2.0, 2.0, after=["checksum", "keys"]),
+    ]
+
+    assert timeline(results, width=4) == [
+        "checksum |####|   0.00s -   2.00s passed",
+        "keys     |##  |   0.00s -   1.00s passed",
+        "artifact |    |   2.00s -   2.00s skipped",
+    ]
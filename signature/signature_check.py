@@ -21,58 +21,672 @@
 #     "rich",
 #     "requests",
 #     "python-gnupg",
+#     "cryptography",
 # ]
 # ///
+import hashlib
 import json
 import os
+import shutil
 import sys
 import tempfile
+import time
+from collections.abc import Collection
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
 from typing import Any
 
 import gnupg
 import requests
 from rich.console import Console
 
-console = Console(width=400, color_system="standard")
+from common.artifact_index import SIGNATURE_KIND, ArtifactIndex, load_changed_files
+from common.http import DEFAULT_TIMEOUT, create_session
+from common.openpgp import (
+    NO_PUBLIC_KEY,
+    KeyIndex,
+    Keyring,
+    OpenPGPError,
+    SignatureFile,
+    Verification,
+    weak_signature,
+)
+from common.manifest import load_manifest
+from common.verification_cache import VerificationCache, cache_dir, cache_disabled
 
-svn_files = os.listdir()
-temp_signature_key_file_path = tempfile.NamedTemporaryFile().name
+console = Console(width=400, color_system="standard")
 
 invalid_signature_files = []
 
 
-def download_keys(key_url: str):
-    response = requests.get(key_url)
+# Name of the file in the keyring directory with the sha256 of the imported KEYS file
+IMPORTED_KEYS_MARKER = "imported-keys.sha256"
+
+CACHE_FILE_NAME = "signature-cache.json"
+
+# Digests of the manifest of the checksum step a data file can be identified by, best first
+MANIFEST_ALGORITHMS = ("sha512", "sha256")
+
+
+class KeysDownloadError(Exception):
+    """
+    The KEYS file cannot be downloaded
+    """
+
+
+@cache
+def http_session() -> requests.Session:
+    return create_session()
+
+
+def keys_cache_dir(key_url: str) -> str:
+    """
+    Cache directory of a KEYS url, it holds the KEYS file, its http validators and the keyring
+    """
+    url_hash = hashlib.sha256(key_url.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir(), "keys", url_hash)
+
+
+def read_keys_metadata(metadata_path: str) -> dict[str, str]:
+    try:
+        with open(metadata_path) as metadata_file:
+            metadata = json.load(metadata_file)
+    except (OSError, ValueError):
+        return {}
+    return metadata if isinstance(metadata, dict) else {}
+
+
+def download_keys(key_url: str, use_cache: bool = False) -> str:
+    """
+    Download the KEYS file
+
+    With the cache the KEYS file is kept between runs and downloaded again only when it changed
+    on the server, the request is revalidated with the ETag and Last-Modified of the cached copy.
+
+    :param key_url: url of the KEYS file
+    :param use_cache: keep the KEYS file in the cache directory, without the cache every call
+        downloads to a temporary file of its own, checks of other stages may run concurrently
+    :return: path of the downloaded KEYS file
+    :raises KeysDownloadError: when the KEYS file cannot be downloaded
+    """
+    headers = {}
+    keys_file_path = None
+
+    if use_cache:
+        directory = keys_cache_dir(key_url)
+        os.makedirs(directory, exist_ok=True)
+        keys_file_path = os.path.join(directory, "KEYS")
+        metadata_path = os.path.join(directory, "KEYS.json")
+        metadata = read_keys_metadata(metadata_path)
+        if os.path.exists(keys_file_path):
+            if metadata.get("etag"):
+                headers["If-None-Match"] = metadata["etag"]
+            if metadata.get("last_modified"):
+                headers["If-Modified-Since"] = metadata["last_modified"]
+
+    try:
+        response = http_session().get(key_url, headers=headers, timeout=DEFAULT_TIMEOUT)
+    except requests.RequestException as e:
+        raise KeysDownloadError(f"Unable to download signature file from {key_url}: {e}") from e
+
+    if response.status_code == 304 and headers:
+        console.print(f"[blue]KEYS file {key_url} not modified, using the cached copy[/]")
+        return keys_file_path
+
     if response.status_code != 200:
-        console.print(
-            f"[red]Error: Unable to download signature file from {key_url}: received: {response.status_code}[/]"
+        raise KeysDownloadError(
+            f"Unable to download signature file from {key_url}: received: {response.status_code}"
         )
-        sys.exit(1)
 
-    with open(temp_signature_key_file_path, "w") as key_file:
-        key_file.write(response.text)
+    with tempfile.NamedTemporaryFile(
+        "wb",
+        prefix="KEYS-",
+        dir=os.path.dirname(keys_file_path) if keys_file_path else None,
+        delete=False,
+    ) as key_file:
+        key_file.write(response.content)
+    if keys_file_path is None:
+        return key_file.name
+    os.replace(key_file.name, keys_file_path)
 
+    if use_cache:
+        with open(metadata_path, "w") as metadata_file:
+            json.dump(
+                {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                },
+                metadata_file,
+            )
 
-def validate_signature_with_gpg(signature_check: dict[str, Any]):
-    key_url = signature_check.get("keys")
+    return keys_file_path
 
-    download_keys(key_url)
-    gpg = gnupg.GPG()
-    with open(temp_signature_key_file_path, "rb") as key_file:
-        gpg.import_keys(key_file.read())
 
-    for file in svn_files:
-        if file.endswith(".asc"):
-            with open(file, "rb") as singed_file:
-                status = gpg.verify_file(
-                    fileobj_or_path=singed_file, data_filename=file.replace(".asc", "")
-                )
-            if not status.valid:
-                invalid_signature_files.append(
-                    {"file": file, "status": status.valid, "problems": status.problems}
+def import_keys(
+    keys_file_path: str, gnupghome: str | None = None, keys: bytes | None = None
+) -> gnupg.GPG:
+    """
+    Import the KEYS file into a gpg keyring
+
+    With a gnupghome the keyring is kept between runs, the keys are imported again only when the
+    imported keys changed. The keyring is then rebuilt from scratch, so a key removed from the
+    KEYS file is removed from the keyring as well.
+
+    :param keys_file_path: path of the KEYS file
+    :param gnupghome: directory of the keyring, the default gpg home when None
+    :param keys: keys to import instead of the whole KEYS file, see select_signing_keys
+    :return: gnupg.GPG
+    """
+    if keys is None:
+        with open(keys_file_path, "rb") as key_file:
+            keys = key_file.read()
+
+    if gnupghome is None:
+        gpg = gnupg.GPG()
+        gpg.import_keys(keys)
+        return gpg
+
+    keys_sha = hashlib.sha256(keys).hexdigest()
+    marker_path = os.path.join(gnupghome, IMPORTED_KEYS_MARKER)
+    try:
+        with open(marker_path) as marker_file:
+            imported_sha = marker_file.read().strip()
+    except OSError:
+        imported_sha = None
+
+    if imported_sha == keys_sha:
+        console.print("[blue]Signing keys unchanged, reusing the imported keyring[/]")
+        return gnupg.GPG(gnupghome=gnupghome)
+
+    shutil.rmtree(gnupghome, ignore_errors=True)
+    os.makedirs(gnupghome, mode=0o700)
+    gpg = gnupg.GPG(gnupghome=gnupghome)
+    gpg.import_keys(keys)
+    with open(marker_path, "w") as marker_file:
+        marker_file.write(keys_sha)
+    return gpg
+
+
+def select_signing_keys(
+    keys_file_path: str, artifact_index: ArtifactIndex
+) -> tuple[bytes | None, dict[str, str]]:
+    """
+    Select the keys of the KEYS file that made the signatures of the artifacts
+
+    The issuers are read from the signature packets of the .asc files and looked up in an index
+    of the KEYS file, so only the few keys of the release managers are imported instead of the
+    keys of every committer.
+
+    :param keys_file_path: path of the KEYS file
+    :param artifact_index: index of the files of the SVN directory
+    :return: the selected keys as binary OpenPGP packets, None to import the whole KEYS file when
+        the issuers can not be told, and the unknown issuer key id by signature file
+    """
+    try:
+        key_index = KeyIndex.from_file(keys_file_path)
+    except OpenPGPError as e:
+        console.print(f"[yellow]Unable to index the KEYS file, importing all the keys: {e}[/]")
+        return None, {}
+
+    selected: set[int] = set()
+    unknown_issuers: dict[str, str] = {}
+    for file, data_file in artifact_index.with_companion(SIGNATURE_KIND):
+        signature_file = SignatureFile(artifact_index.path(file))
+        if data_file not in artifact_index or signature_file.error is not None:
+            # Orphaned and malformed signatures are reported by the verification
+            continue
+        for signature in signature_file.signatures:
+            if signature.key_id is None:
+                # Without an issuer any key may have made the signature
+                return None, {}
+            keys = key_index.find(signature)
+            if not keys:
+                unknown_issuers[file] = signature.key_id
+            selected |= keys
+
+    console.print(
+        f"[blue]Selected {len(selected)} of the {len(key_index)} keys of the KEYS file[/]"
+    )
+    return key_index.export(selected), unknown_issuers
+
+
+def report_unknown_issuers(unknown_issuers: dict[str, str]):
+    for file, key_id in unknown_issuers.items():
+        console.print(f"[red]Error: {file} is signed by {key_id}, a key missing from the KEYS file[/]")
+        invalid_signature_files.append(
+            {
+                "file": file,
+                "status": False,
+                "problems": [{"status": NO_PUBLIC_KEY, "keyid": key_id}],
+            }
+        )
+
+
+class SignatureResultCache:
+    """
+    Valid signatures of previous runs, keyed by the digest of the data file, the digest of the
+    signature file and the digest of the keys of its signer in the KEYS file. Data files missing
+    from the manifest of the checksum step are keyed by their identity on disk instead, so a
+    cache lookup never reads a whole artifact.
+
+    Any change of the artifact, of its signature or of the key of its signer, eg: a revocation
+    added to the KEYS file, leads to a new key and the signature is verified again. An entry
+    also expires with the signing key or the signature, whichever expires first. Invalid
+    signatures are never cached, they are verified again on every run.
+    """
+
+    __slots__ = ("cache", "method", "key_index", "manifest", "pending")
+
+    def __init__(
+        self,
+        cache: VerificationCache,
+        method: str,
+        keys_file_path: str,
+        manifest: dict[str, dict[str, Any]] | None = None,
+    ):
+        self.cache = cache
+        self.method = method
+        try:
+            self.key_index: KeyIndex | None = KeyIndex.from_file(keys_file_path)
+        except OpenPGPError:
+            self.key_index = None
+        self.manifest = manifest or {}
+        # Cache key, signature file and signer keys of the signatures looked up, by file
+        self.pending: dict[str, tuple[str, SignatureFile, bytes]] = {}
+
+    def signer_keys(self, signature_file: SignatureFile) -> bytes | None:
+        """
+        Keys of the KEYS file that may have made the signatures, None when they can not be told
+        """
+        if self.key_index is None or signature_file.error is not None:
+            return None
+        if any(signature.key_id is None for signature in signature_file.signatures):
+            return None
+        indexes = set()
+        for signature in signature_file.signatures:
+            indexes |= self.key_index.find(signature)
+        return self.key_index.export(indexes) if indexes else None
+
+    def data_key(self, data_file: str) -> str:
+        """
+        Digest of the data file, from the manifest of the checksum step when it verified the file,
+        otherwise the size, mtime and inode of the file, any change of the file changes one of them
+        """
+        stat = os.stat(data_file)
+        entry = self.manifest.get(os.path.basename(data_file))
+        if entry is not None and entry.get("size") == stat.st_size:
+            for algorithm in MANIFEST_ALGORITHMS:
+                if entry["digests"].get(algorithm):
+                    return f"{algorithm}:{entry['digests'][algorithm]}"
+        return (
+            f"stat:{os.path.abspath(data_file)}:"
+            f"{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}"
+        )
+
+    def lookup(self, file: str, data_file: str, now: float | None = None) -> dict[str, Any] | None:
+        """
+        Result of a previous run for the signature file, None when it must be verified
+        """
+        signature_file = SignatureFile(file)
+        signer_keys = self.signer_keys(signature_file)
+        if signer_keys is None:
+            return None
+        with open(file, "rb") as signature:
+            signature_digest = hashlib.sha256(signature.read()).hexdigest()
+        key = (
+            f"signature:{self.method}:{self.data_key(data_file)}:{signature_digest}:"
+            f"{hashlib.sha256(signer_keys).hexdigest()}"
+        )
+        self.pending[file] = (key, signature_file, signer_keys)
+
+        value = self.cache.get(key)
+        if value is None:
+            return None
+        valid_until = value.get("valid_until")
+        if valid_until is not None and (time.time() if now is None else now) >= valid_until:
+            self.cache.delete(key)
+            return None
+        return value
+
+    def store(self, file: str, status: gnupg.Verify | Verification):
+        if not status.valid or file not in self.pending:
+            return
+        key, signature_file, signer_keys = self.pending.pop(file)
+        self.cache.set(
+            key,
+            {
+                "username": status.username,
+                "valid_until": self.valid_until(signature_file, signer_keys),
+            },
+        )
+
+    @staticmethod
+    def valid_until(signature_file: SignatureFile, signer_keys: bytes) -> int | None:
+        """
+        Time the signature stops being valid, when a signature or a possible signing key expires
+        """
+        keyring = Keyring.from_bytes(signer_keys)
+        expirations = []
+        for signature in signature_file.signatures:
+            if signature.expires_after:
+                expirations.append(signature.created + signature.expires_after)
+            for key in keyring.lookup(signature):
+                expirations.extend(
+                    candidate.expires
+                    for candidate in (key, key.primary)
+                    if candidate is not None and candidate.expires is not None
                 )
-            else:
-                console.print(f"[blue]File {file} signed by {status.username}[/]")
+        return min(expirations, default=None)
+
+
+def verify_signature(
+    verifier: gnupg.GPG | Keyring, file: str, data_file: str
+) -> gnupg.Verify | Verification:
+    if isinstance(verifier, Keyring):
+        return verifier.verify_file(file, data_file)
+    # gpg accepts SHA-1 data signatures, the native verification rejects them
+    weak = weak_signature(file)
+    if weak is not None:
+        return weak
+    with open(file, "rb") as singed_file:
+        return verifier.verify_file(fileobj_or_path=singed_file, data_filename=data_file)
+
+
+def verify_signatures(
+    verifier: gnupg.GPG | Keyring,
+    artifact_index: ArtifactIndex,
+    workers: int | None = None,
+    skip: Collection[str] = (),
+    cache: SignatureResultCache | None = None,
+):
+    """
+    Verify the signatures of all the artifacts with a pool of workers
+
+    python-gnupg runs a gpg process for every signature, the workers only wait for the processes,
+    so many signatures are verified concurrently against the same read-only keyring. The native
+    Keyring verifies in-process, its workers mostly hash the data files, which releases the GIL.
+    The results are reported in the order of the files, independent of the order they finish in.
+
+    :param verifier: gnupg.GPG with the imported keys, or the Keyring of the KEYS file
+    :param artifact_index: index of the files of the SVN directory
+    :param workers: number of signatures verified concurrently, 1 verifies them one by one
+    :param skip: signature files already reported, eg: signed by an unknown key
+    :param cache: valid signatures of previous runs, they are not verified again
+    :return: None
+    """
+    for file in artifact_index.orphaned_companions(SIGNATURE_KIND):
+        invalid_signature_files.append(
+            {"file": file, "status": False, "problems": ["data file missing"]}
+        )
+
+    signatures = [
+        (file, data_file)
+        for file, data_file in artifact_index.with_companion(SIGNATURE_KIND)
+        if data_file in artifact_index and file not in skip
+    ]
+    path = artifact_index.path
+    cached: dict[str, dict[str, Any]] = {}
+    if cache is not None:
+        for file, data_file in signatures:
+            value = cache.lookup(path(file), path(data_file))
+            if value is not None:
+                cached[file] = value
+        console.print(f"[blue]Skipping {len(cached)} signatures verified in a previous run[/]")
+
+    files = [file for file, _ in signatures if file not in cached]
+    data_files = [path(data_file) for file, data_file in signatures if file not in cached]
+    paths = [path(file) for file in files]
+
+    if workers == 1 or len(files) <= 1:
+        statuses = map(partial(verify_signature, verifier), paths, data_files)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            statuses = list(pool.map(partial(verify_signature, verifier), paths, data_files))
+    statuses_by_file = dict(zip(files, statuses))
+
+    for file, _ in signatures:
+        if file in cached:
+            console.print(f"[blue]File {file} signed by {cached[file]['username']}[/]")
+            continue
+        status = statuses_by_file[file]
+        if cache is not None:
+            cache.store(path(file), status)
+        if not status.valid:
+            invalid_signature_files.append(
+                {"file": file, "status": status.valid, "problems": status.problems}
+            )
+        else:
+            console.print(f"[blue]File {file} signed by {status.username}[/]")
+
+
+class SigningKeys:
+    """
+    Keys of a signature check, downloaded and imported, ready to verify the signatures.
+    The unknown issuers of keys prefetched before the checkout are None until they are looked up.
+    """
+
+    __slots__ = ("keys_file_path", "verifier", "unknown_issuers")
+
+    def __init__(
+        self,
+        keys_file_path: str,
+        verifier: gnupg.GPG | Keyring,
+        unknown_issuers: dict[str, str] | None,
+    ):
+        self.keys_file_path = keys_file_path
+        self.verifier = verifier
+        self.unknown_issuers = unknown_issuers
+
+
+def prepare_signing_keys(
+    signature_check: dict[str, Any],
+    artifact_index: ArtifactIndex,
+    use_cache: bool = False,
+) -> SigningKeys:
+    """
+    Download the KEYS file of the check and import the keys of the signers of the artifacts,
+    into a gpg keyring for the gpg method and into an in-process Keyring for the native method
+
+    :param signature_check: signature check from the release config
+    :param artifact_index: index of the files of the SVN directory
+    :param use_cache: keep the KEYS file and the gpg keyring in the cache directory
+    :return: SigningKeys
+    """
+    key_url = signature_check.get("keys")
+    keys_file_path = download_keys(key_url, use_cache=use_cache)
+    keys, unknown_issuers = select_signing_keys(keys_file_path, artifact_index)
+
+    if signature_check.get("method") == "native":
+        if keys is None:
+            verifier = Keyring.from_file(keys_file_path)
+        else:
+            verifier = Keyring.from_bytes(keys)
+    else:
+        gnupghome = os.path.join(keys_cache_dir(key_url), "gnupg") if use_cache else None
+        verifier = import_keys(keys_file_path, gnupghome, keys)
+
+    return SigningKeys(keys_file_path, verifier, unknown_issuers)
+
+
+def prefetch_signing_keys(
+    signature_check: dict[str, Any], use_cache: bool = False
+) -> SigningKeys | None:
+    """
+    Download the KEYS file of the check and import all its keys, before the artifacts are checked
+    out, so the download and the import are not on the critical path of the checks. The issuers
+    of the signatures are looked up once the artifacts are there, by the signature check.
+
+    :param signature_check: signature check from the release config
+    :param use_cache: keep the KEYS file and the gpg keyring in the cache directory
+    :return: SigningKeys, None when the prefetch failed, the signature check then downloads and
+        imports the keys itself
+    """
+    key_url = signature_check.get("keys")
+    try:
+        keys_file_path = download_keys(key_url, use_cache=use_cache)
+        if not use_cache:
+            # The temporary KEYS file is shared by all the checks, keep a copy for this check
+            with tempfile.NamedTemporaryFile(suffix="-KEYS", delete=False) as keys_copy:
+                with open(keys_file_path, "rb") as keys_file:
+                    shutil.copyfileobj(keys_file, keys_copy)
+            keys_file_path = keys_copy.name
+
+        if signature_check.get("method") == "native":
+            verifier = Keyring.from_file(keys_file_path)
+        else:
+            # All the keys are imported, apart from the keyring of the selected keys
+            gnupghome = (
+                os.path.join(keys_cache_dir(key_url), "gnupg-prefetch") if use_cache else None
+            )
+            verifier = import_keys(keys_file_path, gnupghome)
+    except KeysDownloadError as e:
+        console.print(
+            f"[yellow]Warning: Unable to prefetch the keys of {key_url}, "
+            f"the signature check downloads and imports them again: {e}[/]"
+        )
+        return None
+
+    console.print(f"[blue]Prefetched the keys of {key_url}[/]")
+    return SigningKeys(keys_file_path, verifier, None)
+
+
+def lookup_unknown_issuers(signing_keys: SigningKeys, artifact_index: ArtifactIndex):
+    """
+    Look up the issuers of the signatures missing from the KEYS file, for keys prefetched before
+    the artifacts were checked out
+    """
+    if signing_keys.unknown_issuers is None:
+        _, signing_keys.unknown_issuers = select_signing_keys(
+            signing_keys.keys_file_path, artifact_index
+        )
+
+
+def validate_signature_with_gpg(
+    signature_check: dict[str, Any],
+    artifact_index: ArtifactIndex | None = None,
+    use_cache: bool = False,
+    result_cache: VerificationCache | None = None,
+    manifest: dict[str, dict[str, Any]] | None = None,
+    signing_keys: SigningKeys | None = None,
+):
+    if artifact_index is None:
+        artifact_index = ArtifactIndex.from_directory()
+
+    if signing_keys is None:
+        signing_keys = prepare_signing_keys(
+            {**signature_check, "method": "gpg"}, artifact_index, use_cache
+        )
+    lookup_unknown_issuers(signing_keys, artifact_index)
+    report_unknown_issuers(signing_keys.unknown_issuers)
+
+    verify_signatures(
+        signing_keys.verifier,
+        artifact_index,
+        workers=signature_check.get("workers"),
+        skip=signing_keys.unknown_issuers,
+        cache=SignatureResultCache(result_cache, "gpg", signing_keys.keys_file_path, manifest)
+        if result_cache is not None
+        else None,
+    )
+
+
+def validate_signature_natively(
+    signature_check: dict[str, Any],
+    artifact_index: ArtifactIndex | None = None,
+    use_cache: bool = False,
+    result_cache: VerificationCache | None = None,
+    manifest: dict[str, dict[str, Any]] | None = None,
+    signing_keys: SigningKeys | None = None,
+):
+    """
+    Verify the signatures in-process against the KEYS file, without gpg
+
+    The keys of the issuers are parsed once into a keyring indexed by fingerprint and key id,
+    there is no process per signature and no keyring on disk.
+    """
+    if artifact_index is None:
+        artifact_index = ArtifactIndex.from_directory()
+
+    if signing_keys is None:
+        signing_keys = prepare_signing_keys(
+            {**signature_check, "method": "native"}, artifact_index, use_cache
+        )
+    lookup_unknown_issuers(signing_keys, artifact_index)
+    report_unknown_issuers(signing_keys.unknown_issuers)
+
+    verify_signatures(
+        signing_keys.verifier,
+        artifact_index,
+        workers=signature_check.get("workers"),
+        skip=signing_keys.unknown_issuers,
+        cache=SignatureResultCache(
+            result_cache, "native", signing_keys.keys_file_path, manifest
+        )
+        if result_cache is not None
+        else None,
+    )
+
+
+def run_signature_check(
+    signature_check_config: list[dict[str, Any]],
+    artifact_index: ArtifactIndex,
+    use_cache: bool = True,
+    manifest: dict[str, dict[str, Any]] | None = None,
+    changed_files: set[str] | None = None,
+    signing_keys: list[SigningKeys] | None = None,
+) -> bool:
+    """
+    Run the signature checks on the files of the release directory and report the errors
+
+    :param signature_check_config: list of signature checks from the release config
+    :param artifact_index: index of the files of the release directory
+    :param use_cache: keep the KEYS file and the valid signatures of previous runs
+    :param manifest: artifacts verified by the checksum check, by name
+    :param changed_files: only check these files, None to check all the files
+    :param signing_keys: keys of the checks prepared in advance, in the order of the checks,
+        None to download and import them here, as for a check whose keys failed to prefetch
+    :return: True when all the signatures are valid
+    """
+    # Valid signatures of previous runs are not verified again, unless the caches are disabled
+    result_cache = None
+    if use_cache:
+        result_cache = VerificationCache(os.path.join(cache_dir(), CACHE_FILE_NAME))
+
+    if changed_files is not None:
+        artifact_index = artifact_index.subset(changed_files)
+        console.print(
+            f"[blue]Checking the {len(artifact_index)} files changed since the last verified revision[/]"
+        )
+
+    for index, check in enumerate(signature_check_config):
+        console.print(f"[blue]{check.get('description')}[/]")
+        check_keys = signing_keys[index] if signing_keys else None
+        if signing_keys and check_keys is None:
+            console.print(
+                f"[yellow]Warning: The keys of {check.get('keys')} were not prefetched, "
+                f"downloading and importing them now[/]"
+            )
+        if check.get("method") == "gpg":
+            validate_signature_with_gpg(
+                check, artifact_index, use_cache, result_cache, manifest, check_keys
+            )
+        elif check.get("method") == "native":
+            validate_signature_natively(
+                check, artifact_index, use_cache, result_cache, manifest, check_keys
+            )
+
+    if result_cache is not None:
+        result_cache.save()
+
+    if invalid_signature_files:
+        for error in invalid_signature_files:
+            console.print(
+                f"[red]Error: Invalid signature found for {error.get('file')} status: {error.get('status')} problems: {error.get('problems')}[/]"
+            )
+        return False
+
+    console.print("[blue]All signatures are valid[/]")
+    return True
 
 
 if __name__ == "__main__":
@@ -87,22 +701,27 @@ if __name__ == "__main__":
         )
         sys.exit(1)
 
-    if not svn_files:
+    artifact_index = ArtifactIndex.from_directory()
+
+    if not artifact_index.files:
         console.print(
             f"[red]Error: No files found in SVN directory at {os.environ.get('REPO_PATH')}[/]"
         )
         sys.exit(1)
 
-    for check in signature_check_config:
-        console.print(f"[blue]{check.get('description')}[/]")
-        if check.get("method") == "gpg":
-            validate_signature_with_gpg(check)
+    use_cache = not cache_disabled(sys.argv)
+    manifest = None
+    if os.environ.get("VERIFIED_MANIFEST"):
+        manifest = load_manifest(os.environ["VERIFIED_MANIFEST"])
 
-    if invalid_signature_files:
-        for error in invalid_signature_files:
-            console.print(
-                f"[red]Error: Invalid signature found for {error.get('file')} status: {error.get('status')} problems: {error.get('problems')}[/]"
-            )
+    # Only the files changed since the last verified revision of a cached working copy
+    changed_files = load_changed_files(os.environ.get("CHANGED_FILES")) if use_cache else None
+    try:
+        passed = run_signature_check(
+            signature_check_config, artifact_index, use_cache, manifest, changed_files
+        )
+    except KeysDownloadError as e:
+        console.print(f"[red]Error: {e}[/]")
+        sys.exit(1)
+    if not passed:
         sys.exit(1)
-
-    console.print("[blue]All signatures are valid[/]")
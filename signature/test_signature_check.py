@@ -15,22 +15,42 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+import hashlib
+import os
 import tempfile
-from unittest.mock import patch
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import ANY, patch
 
 import gnupg
+import pytest
 
+from common.artifact_index import ArtifactIndex
+from common.manifest import ManifestWriter, load_manifest
+from common.openpgp import Keyring
+from common.verification_cache import VerificationCache
 from signature.signature_check import (
+    KeysDownloadError,
+    SignatureResultCache,
+    download_keys,
+    import_keys,
     invalid_signature_files,
-    svn_files,
-    temp_signature_key_file_path,
+    prefetch_signing_keys,
+    run_signature_check,
+    select_signing_keys,
+    validate_signature_natively,
     validate_signature_with_gpg,
+    verify_signature,
+    verify_signatures,
 )
 
+temp_signature_key_file_path = tempfile.NamedTemporaryFile().name
+
 
 @patch("signature.signature_check.download_keys")
 def test_sign_file(mock_download_keys):
-    mock_download_keys.return_value = None
+    mock_download_keys.return_value = temp_signature_key_file_path
     gpg = gnupg.GPG()
     input_data = gpg.gen_key_input(
         name_email="test@gmail.com",
@@ -52,14 +72,15 @@ def test_sign_file(mock_download_keys):
         detach=True,
         output=sig_file,
     )
-    svn_files.extend([sample_file, sig_file])
-    validate_signature_with_gpg({"keys": temp_signature_key_file_path})
+    validate_signature_with_gpg(
+        {"keys": temp_signature_key_file_path}, ArtifactIndex([sample_file, sig_file])
+    )
     assert not invalid_signature_files
 
 
 @patch("signature.signature_check.download_keys")
 def test_sign_file_should_fail_when_not_signed(mock_download_keys):
-    mock_download_keys.return_value = None
+    mock_download_keys.return_value = temp_signature_key_file_path
     gpg = gnupg.GPG()
     input_data = gpg.gen_key_input(
         name_email="test@gmail.com",
@@ -77,6 +98,560 @@ def test_sign_file_should_fail_when_not_signed(mock_download_keys):
     sig_file = sample_file + ".asc"
     with open(sig_file, "wb") as f:
         f.write(b"")
-    svn_files.extend([sample_file, sig_file])
-    validate_signature_with_gpg({"keys": temp_signature_key_file_path})
+    validate_signature_with_gpg(
+        {"keys": temp_signature_key_file_path}, ArtifactIndex([sample_file, sig_file])
+    )
     assert invalid_signature_files
+
+
+@patch("signature.signature_check.download_keys")
+def test_signature_without_data_file_is_reported(mock_download_keys):
+    mock_download_keys.return_value = temp_signature_key_file_path
+    invalid_signature_files.clear()
+    with open(temp_signature_key_file_path, "w") as f:
+        f.write("")
+
+    sig_file = tempfile.NamedTemporaryFile().name + ".asc"
+    with open(sig_file, "wb") as f:
+        f.write(b"")
+    validate_signature_with_gpg(
+        {"keys": temp_signature_key_file_path}, ArtifactIndex([sig_file])
+    )
+    assert invalid_signature_files == [
+        {"file": sig_file, "status": False, "problems": ["data file missing"]}
+    ]
+
+
+class KeysHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for the KEYS file server, supports ETag revalidation and fails the first requests
+    when asked to
+    """
+
+    keys = b""
+    failures = 0
+    requests_received: list[dict[str, str]] = []
+
+    def do_GET(self):
+        KeysHandler.requests_received.append(dict(self.headers))
+        if KeysHandler.failures:
+            KeysHandler.failures -= 1
+            self.send_response(503)
+            self.end_headers()
+            return
+
+        etag = f'"{hashlib.sha256(KeysHandler.keys).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(KeysHandler.keys)))
+        self.end_headers()
+        self.wfile.write(KeysHandler.keys)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def keys_server(monkeypatch, tmp_path):
+    monkeypatch.setenv("GH_PUB_CACHE_DIR", str(tmp_path / "cache"))
+    KeysHandler.keys = b""
+    KeysHandler.failures = 0
+    KeysHandler.requests_received = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeysHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/KEYS"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(scope="module")
+def signing_home(tmp_path_factory):
+    return str(tmp_path_factory.mktemp("gnupg"))
+
+
+@pytest.fixture(scope="module")
+def signing_keys(signing_home):
+    gpg = gnupg.GPG(gnupghome=signing_home)
+    keys = []
+    for email in ("first@apache.org", "second@apache.org"):
+        key = gpg.gen_key(gpg.gen_key_input(name_email=email, passphrase="test"))
+        keys.append((key.fingerprint, gpg.export_keys(key.fingerprint).encode()))
+    return keys
+
+
+def test_download_keys_revalidates_cached_copy(keys_server):
+    KeysHandler.keys = b"KEYS content"
+
+    keys_file_path = download_keys(keys_server, use_cache=True)
+    with open(keys_file_path, "rb") as keys_file:
+        assert keys_file.read() == b"KEYS content"
+
+    assert download_keys(keys_server, use_cache=True) == keys_file_path
+    assert len(KeysHandler.requests_received) == 2
+    assert KeysHandler.requests_received[1]["If-None-Match"] == (
+        f'"{hashlib.sha256(b"KEYS content").hexdigest()}"'
+    )
+
+    KeysHandler.keys = b"new KEYS content"
+    download_keys(keys_server, use_cache=True)
+    with open(keys_file_path, "rb") as keys_file:
+        assert keys_file.read() == b"new KEYS content"
+
+
+def test_download_keys_without_cache_is_unconditional(keys_server):
+    KeysHandler.keys = b"KEYS content"
+    first_path = download_keys(keys_server)
+    KeysHandler.keys = b"other KEYS content"
+    second_path = download_keys(keys_server)
+    assert "If-None-Match" not in KeysHandler.requests_received[1]
+    # Every call has a file of its own, a concurrent download does not overwrite it
+    assert first_path != second_path
+    with open(first_path, "rb") as keys_file:
+        assert keys_file.read() == b"KEYS content"
+
+
+def test_download_keys_retries(keys_server):
+    KeysHandler.keys = b"KEYS content"
+    KeysHandler.failures = 2
+    with patch("urllib3.util.retry.Retry.sleep"):
+        keys_file_path = download_keys(keys_server, use_cache=True)
+    with open(keys_file_path, "rb") as keys_file:
+        assert keys_file.read() == b"KEYS content"
+    assert len(KeysHandler.requests_received) == 3
+
+
+def test_download_keys_fails_on_error(keys_server):
+    KeysHandler.failures = 100
+    with patch("urllib3.util.retry.Retry.sleep"), pytest.raises(KeysDownloadError):
+        download_keys(keys_server, use_cache=True)
+
+
+def test_import_keys_reuses_keyring(tmp_path, signing_keys):
+    (fingerprint, public_key), _ = signing_keys
+    keys_file_path = tmp_path / "KEYS"
+    keys_file_path.write_bytes(public_key)
+    gnupghome = str(tmp_path / "gnupg")
+
+    gpg = import_keys(str(keys_file_path), gnupghome)
+    assert [key["fingerprint"] for key in gpg.list_keys()] == [fingerprint]
+
+    with patch("gnupg.GPG.import_keys") as mock_import_keys:
+        gpg = import_keys(str(keys_file_path), gnupghome)
+    mock_import_keys.assert_not_called()
+    assert [key["fingerprint"] for key in gpg.list_keys()] == [fingerprint]
+
+
+def test_import_keys_rebuilds_keyring_when_keys_change(tmp_path, signing_keys):
+    (first_fingerprint, first_key), (second_fingerprint, second_key) = signing_keys
+    keys_file_path = tmp_path / "KEYS"
+    gnupghome = str(tmp_path / "gnupg")
+
+    keys_file_path.write_bytes(first_key + second_key)
+    gpg = import_keys(str(keys_file_path), gnupghome)
+    assert sorted(key["fingerprint"] for key in gpg.list_keys()) == sorted(
+        [first_fingerprint, second_fingerprint]
+    )
+
+    keys_file_path.write_bytes(second_key)
+    gpg = import_keys(str(keys_file_path), gnupghome)
+    assert [key["fingerprint"] for key in gpg.list_keys()] == [second_fingerprint]
+
+
+def sign(gpg: gnupg.GPG, fingerprint: str, data_file: str, *extra_args: str):
+    # Pass an open file, python-gnupg closes the files it opens before it finished reading them
+    with open(data_file, "rb") as f:
+        gpg.sign_file(
+            f,
+            keyid=fingerprint,
+            passphrase="test",
+            detach=True,
+            output=data_file + ".asc",
+            extra_args=list(extra_args),
+        )
+
+
+def sign_files(gnupghome, fingerprint, directory, count):
+    gpg = gnupg.GPG(gnupghome=gnupghome)
+    files = []
+    for number in range(count):
+        data_file = os.path.join(directory, f"apache_airflow_providers_{number}-1.0.0.tar.gz")
+        with open(data_file, "w") as f:
+            f.write(f"package {number}")
+        sign(gpg, fingerprint, data_file)
+        files.extend([data_file, data_file + ".asc"])
+    return files
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_verify_signatures_with_pool(tmp_path, signing_keys, signing_home, workers):
+    invalid_signature_files.clear()
+    (fingerprint, public_key), _ = signing_keys
+    files = sign_files(signing_home, fingerprint, str(tmp_path), 6)
+    # Break the signature of two packages
+    for data_file in files[4:8:2]:
+        with open(data_file, "a") as f:
+            f.write("tampered")
+    keys_file_path = tmp_path / "KEYS"
+    keys_file_path.write_bytes(public_key)
+    gpg = import_keys(str(keys_file_path), str(tmp_path / "gnupg"))
+
+    with patch("signature.signature_check.console") as mock_console:
+        verify_signatures(gpg, ArtifactIndex(files), workers=workers)
+
+    assert [error["file"] for error in invalid_signature_files] == files[5:9:2]
+    assert [call.args[0].split(" signed by ")[0] for call in mock_console.print.call_args_list] == [
+        f"[blue]File {file}" for file in files[1::2] if file not in files[5:9:2]
+    ]
+
+
+def generate_key(gpg: gnupg.GPG, email: str, **key_input) -> str:
+    return gpg.gen_key(gpg.gen_key_input(name_email=email, passphrase="test", **key_input)).fingerprint
+
+
+@pytest.fixture(scope="module")
+def signed_artifacts(tmp_path_factory):
+    """
+    KEYS file and signed artifacts, one for every outcome of a signature verification
+    """
+    directory = tmp_path_factory.mktemp("artifacts")
+    gpg = gnupg.GPG(gnupghome=str(tmp_path_factory.mktemp("gnupg")))
+    rsa = generate_key(gpg, "rsa@apache.org")
+    eddsa = generate_key(gpg, "eddsa@apache.org", key_type="EDDSA", key_curve="ed25519")
+    subkey = generate_key(
+        gpg, "subkey@apache.org", key_usage="cert", subkey_type="RSA", subkey_usage="sign"
+    )
+    revoked = generate_key(gpg, "revoked@apache.org")
+    unknown = generate_key(gpg, "unknown@apache.org")
+
+    past_home = str(tmp_path_factory.mktemp("gnupg"))
+    past_gpg = gnupg.GPG(gnupghome=past_home, options=["--faked-system-time", "20200101T000000"])
+    expired = generate_key(past_gpg, "expired@apache.org", expire_date="1d")
+
+    cases = {
+        "rsa": (gpg, rsa),
+        "eddsa": (gpg, eddsa),
+        "subkey": (gpg, subkey),
+        "revoked": (gpg, revoked),
+        "unknown": (gpg, unknown),
+        "expired": (past_gpg, expired),
+        "sha256": (gpg, rsa, "--digest-algo", "SHA256"),
+        "sha1": (gpg, rsa, "--digest-algo", "SHA1"),
+        "textmode": (gpg, eddsa, "--textmode"),
+        "textmode_cr_cr_lf": (gpg, rsa, "--textmode"),
+        "textmode_nul_before_lf": (gpg, rsa, "--textmode"),
+        "textmode_trailing_cr": (gpg, rsa, "--textmode"),
+        "tampered": (gpg, rsa),
+    }
+    # Line endings that gpg canonicalizes beyond <LF> to <CR><LF>
+    contents = {
+        "textmode_cr_cr_lf": b"hello\r\r\nworld\n",
+        "textmode_nul_before_lf": b"hello\x00\nworld\x00\r\n",
+        "textmode_trailing_cr": b"hello\nworld\r",
+    }
+    artifacts = {}
+    for case, (signer, fingerprint, *extra_args) in cases.items():
+        data_file = str(directory / f"apache_airflow_{case}-1.0.0.tar.gz")
+        with open(data_file, "wb") as f:
+            f.write(contents.get(case, f"content of {case}\nsecond line\n".encode()))
+        sign(signer, fingerprint, data_file, *extra_args)
+        artifacts[case] = (data_file + ".asc", data_file)
+    with open(artifacts["tampered"][1], "a") as f:
+        f.write("tampered")
+
+    # gpg writes a revocation certificate for every new key, armored with a ":" prefix
+    revocation = os.path.join(gpg.gnupghome, "openpgp-revocs.d", f"{revoked}.rev")
+    with open(revocation) as revocation_file:
+        gpg.import_keys(revocation_file.read().replace(":-----", "-----"))
+
+    keys_file_path = directory / "KEYS"
+    keys_file_path.write_text(
+        gpg.export_keys([rsa, eddsa, subkey, revoked]) + past_gpg.export_keys(expired)
+    )
+    return str(keys_file_path), artifacts
+
+
+def summary(status) -> tuple[bool, str | None, str | None]:
+    last_problem = status.problems[-1]["status"] if status.problems else None
+    return status.valid, status.username if status.valid else None, last_problem
+
+
+def test_native_and_gpg_verification_agree(tmp_path, signed_artifacts):
+    keys_file_path, artifacts = signed_artifacts
+    gpg = import_keys(keys_file_path, str(tmp_path / "gnupg"))
+    keyring = Keyring.from_file(keys_file_path)
+
+    native = {case: summary(verify_signature(keyring, *files)) for case, files in artifacts.items()}
+    assert native == {
+        case: summary(verify_signature(gpg, *files)) for case, files in artifacts.items()
+    }
+    assert native == {
+        "rsa": (True, "Autogenerated Key <rsa@apache.org>", None),
+        "eddsa": (True, "Autogenerated Key <eddsa@apache.org>", None),
+        "subkey": (True, "Autogenerated Key <subkey@apache.org>", None),
+        "revoked": (False, None, "signing key was revoked"),
+        "unknown": (False, None, "no public key"),
+        "expired": (False, None, "signing key has expired"),
+        "sha256": (True, "Autogenerated Key <rsa@apache.org>", None),
+        "sha1": (False, None, "signature error"),
+        "textmode": (True, "Autogenerated Key <eddsa@apache.org>", None),
+        "textmode_cr_cr_lf": (True, "Autogenerated Key <rsa@apache.org>", None),
+        "textmode_nul_before_lf": (True, "Autogenerated Key <rsa@apache.org>", None),
+        "textmode_trailing_cr": (True, "Autogenerated Key <rsa@apache.org>", None),
+        "tampered": (False, None, "signature bad"),
+    }
+
+
+@patch("signature.signature_check.download_keys")
+def test_validate_signature_natively(mock_download_keys, signed_artifacts):
+    invalid_signature_files.clear()
+    keys_file_path, artifacts = signed_artifacts
+    mock_download_keys.return_value = keys_file_path
+    files = [file for case in ("rsa", "eddsa", "tampered") for file in artifacts[case]]
+
+    with patch("signature.signature_check.console") as mock_console:
+        validate_signature_natively(
+            {"method": "native", "keys": "https://example.com/KEYS", "workers": 2},
+            ArtifactIndex(files),
+        )
+
+    assert invalid_signature_files == [
+        {
+            "file": artifacts["tampered"][0],
+            "status": False,
+            "problems": [{"status": "signature bad", "keyid": ANY}],
+        }
+    ]
+    printed = [call.args[0] for call in mock_console.print.call_args_list]
+    assert len([line for line in printed if " signed by " in line]) == 2
+
+
+@patch("signature.signature_check.download_keys")
+def test_prefetched_keys_are_used_once_the_artifacts_are_there(
+    mock_download_keys, tmp_path, signed_artifacts
+):
+    invalid_signature_files.clear()
+    keys_file_path, artifacts = signed_artifacts
+    mock_download_keys.return_value = keys_file_path
+    check = {"method": "gpg", "keys": "https://example.com/KEYS"}
+
+    with patch("signature.signature_check.console"), patch(
+        "signature.signature_check.import_keys",
+        side_effect=lambda path, home=None, keys=None: import_keys(
+            path, str(tmp_path / "gnupg"), keys
+        ),
+    ) as mock_import_keys:
+        signing_keys = prefetch_signing_keys(check)
+        # All the keys are imported before the issuers of the signatures are known
+        assert mock_import_keys.call_args.args[2:] == ()
+        assert signing_keys.unknown_issuers is None
+
+        files = [file for case in ("unknown", "rsa") for file in artifacts[case]]
+        validate_signature_with_gpg(
+            check, ArtifactIndex(files), signing_keys=signing_keys
+        )
+
+    mock_download_keys.assert_called_once()
+    assert signing_keys.unknown_issuers == {artifacts["unknown"][0]: ANY}
+    assert invalid_signature_files == [
+        {
+            "file": artifacts["unknown"][0],
+            "status": False,
+            "problems": [{"status": "no public key", "keyid": ANY}],
+        }
+    ]
+
+
+@patch(
+    "signature.signature_check.download_keys",
+    side_effect=KeysDownloadError("Unable to download signature file"),
+)
+def test_failed_prefetch_falls_back_to_the_signature_check(mock_download_keys, signed_artifacts):
+    invalid_signature_files.clear()
+    keys_file_path, artifacts = signed_artifacts
+    check = {"method": "native", "keys": "https://example.com/KEYS"}
+
+    with patch("signature.signature_check.console") as mock_console:
+        signing_keys = prefetch_signing_keys(check)
+        assert signing_keys is None
+
+        mock_download_keys.side_effect = None
+        mock_download_keys.return_value = keys_file_path
+        assert run_signature_check(
+            [check], ArtifactIndex(artifacts["rsa"]), use_cache=False, signing_keys=[None]
+        )
+
+    printed = [call.args[0] for call in mock_console.print.call_args_list]
+    assert any("Unable to prefetch the keys" in line for line in printed)
+    assert any("were not prefetched" in line for line in printed)
+    assert mock_download_keys.call_count == 2
+
+
+@pytest.mark.parametrize("error", [SystemExit(1), RuntimeError("bug")])
+def test_prefetch_does_not_hide_other_failures(error):
+    with patch("signature.signature_check.download_keys", side_effect=error), pytest.raises(
+        type(error)
+    ):
+        prefetch_signing_keys({"method": "native", "keys": "https://example.com/KEYS"})
+
+
+def test_select_signing_keys(signed_artifacts):
+    keys_file_path, artifacts = signed_artifacts
+    files = [file for case in ("rsa", "sha256", "subkey", "unknown") for file in artifacts[case]]
+
+    with patch("signature.signature_check.console"):
+        keys, unknown_issuers = select_signing_keys(keys_file_path, ArtifactIndex(files))
+
+    assert sorted(key.username for key in Keyring.from_bytes(keys).keys if not key.primary) == [
+        "Autogenerated Key <rsa@apache.org>",
+        "Autogenerated Key <subkey@apache.org>",
+    ]
+    assert unknown_issuers == {artifacts["unknown"][0]: ANY}
+
+
+@patch("signature.signature_check.download_keys")
+def test_validate_signature_with_gpg_reports_unknown_issuers_first(
+    mock_download_keys, tmp_path, signed_artifacts
+):
+    invalid_signature_files.clear()
+    keys_file_path, artifacts = signed_artifacts
+    mock_download_keys.return_value = keys_file_path
+    files = [file for case in ("unknown", "rsa") for file in artifacts[case]]
+
+    with patch("signature.signature_check.console") as mock_console, patch(
+        "signature.signature_check.import_keys",
+        side_effect=lambda path, home, keys: import_keys(path, str(tmp_path / "gnupg"), keys),
+    ), patch(
+        "signature.signature_check.verify_signature", wraps=verify_signature
+    ) as mock_verify_signature:
+        validate_signature_with_gpg({"keys": "https://example.com/KEYS"}, ArtifactIndex(files))
+
+    assert invalid_signature_files == [
+        {
+            "file": artifacts["unknown"][0],
+            "status": False,
+            "problems": [{"status": "no public key", "keyid": ANY}],
+        }
+    ]
+    # The unknown issuer is reported before any signature is verified, and not verified again
+    printed = [call.args[0] for call in mock_console.print.call_args_list]
+    assert printed[0].startswith("[blue]Selected 1 of the 5 keys")
+    assert printed[1].startswith(f"[red]Error: {artifacts['unknown'][0]} is signed by")
+    assert [call.args[1] for call in mock_verify_signature.call_args_list] == [artifacts["rsa"][0]]
+
+
+def verify_with_cache(method, keys_file_path, files, cache_path, manifest=None, now=None):
+    """
+    Verify the signatures with a result cache, return the signature files verified again
+    """
+    invalid_signature_files.clear()
+    verifier = Keyring.from_file(keys_file_path) if method == "native" else gnupg.GPG(
+        gnupghome=os.path.join(os.path.dirname(cache_path), "gnupg")
+    )
+    result_cache = VerificationCache(cache_path)
+    cache = SignatureResultCache(result_cache, method, keys_file_path, manifest)
+    with patch("signature.signature_check.console"), patch(
+        "signature.signature_check.time.time", return_value=now or time.time()
+    ), patch(
+        "signature.signature_check.verify_signature", wraps=verify_signature
+    ) as mock_verify_signature:
+        verify_signatures(verifier, ArtifactIndex(files), cache=cache)
+    result_cache.save()
+    return [call.args[1] for call in mock_verify_signature.call_args_list]
+
+
+def test_verify_signatures_reuses_cached_results(tmp_path, signed_artifacts):
+    keys_file_path, artifacts = signed_artifacts
+    files = [file for case in ("rsa", "expired", "tampered") for file in artifacts[case]]
+    cache_path = str(tmp_path / "signature-cache.json")
+
+    assert verify_with_cache("native", keys_file_path, files, cache_path) == files[::2]
+    # Only the valid signature is cached, the invalid ones are verified on every run
+    assert verify_with_cache("native", keys_file_path, files, cache_path) == files[2::2]
+    assert [error["file"] for error in invalid_signature_files] == files[2::2]
+    # The results of one method are not reused by the other
+    import_keys(keys_file_path, str(tmp_path / "gnupg"))
+    assert verify_with_cache("gpg", keys_file_path, files, cache_path) == files[::2]
+
+
+def test_signature_cache_entry_expires_with_signing_key(tmp_path, signing_home):
+    gpg = gnupg.GPG(gnupghome=signing_home)
+    fingerprint = generate_key(gpg, "expiring@apache.org", expire_date="2d")
+    files = sign_files(signing_home, fingerprint, str(tmp_path), 1)
+    keys_file_path = tmp_path / "KEYS"
+    keys_file_path.write_text(gpg.export_keys(fingerprint))
+    cache_path = str(tmp_path / "signature-cache.json")
+
+    assert verify_with_cache("native", str(keys_file_path), files, cache_path) == files[1:]
+    assert verify_with_cache("native", str(keys_file_path), files, cache_path) == []
+    three_days_later = time.time() + 3 * 24 * 60 * 60
+    assert verify_with_cache(
+        "native", str(keys_file_path), files, cache_path, now=three_days_later
+    ) == files[1:]
+
+
+def test_signature_cache_is_invalidated_by_revocation(tmp_path, signing_home):
+    gpg = gnupg.GPG(gnupghome=signing_home)
+    fingerprint = generate_key(gpg, "revoked-later@apache.org")
+    files = sign_files(signing_home, fingerprint, str(tmp_path), 1)
+    keys_file_path = tmp_path / "KEYS"
+    keys_file_path.write_text(gpg.export_keys(fingerprint))
+    cache_path = str(tmp_path / "signature-cache.json")
+    assert verify_with_cache("native", str(keys_file_path), files, cache_path) == files[1:]
+
+    revocation = os.path.join(signing_home, "openpgp-revocs.d", f"{fingerprint}.rev")
+    with open(revocation) as revocation_file:
+        gpg.import_keys(revocation_file.read().replace(":-----", "-----"))
+    keys_file_path.write_text(gpg.export_keys(fingerprint))
+
+    assert verify_with_cache("native", str(keys_file_path), files, cache_path) == files[1:]
+    assert invalid_signature_files[0]["problems"][-1]["status"] == "signing key was revoked"
+
+
+def test_signature_cache_uses_manifest_digests(tmp_path, signed_artifacts):
+    keys_file_path, artifacts = signed_artifacts
+    signature_file, data_file = artifacts["rsa"]
+    with open(data_file, "rb") as data:
+        content = data.read()
+    with ManifestWriter(str(tmp_path)) as manifest_writer:
+        manifest_writer.add(
+            os.path.basename(data_file),
+            len(content),
+            {"sha512": hashlib.sha512(content).hexdigest()},
+        )
+    cache = SignatureResultCache(
+        VerificationCache(str(tmp_path / "signature-cache.json")),
+        "native",
+        keys_file_path,
+        load_manifest(manifest_writer.path),
+    )
+
+    with patch("builtins.open", wraps=open) as mock_open:
+        assert cache.lookup(signature_file, data_file) is None
+    assert data_file not in [call.args[0] for call in mock_open.call_args_list]
+    assert cache.pending[signature_file][0].split(":")[2:4] == [
+        "sha512",
+        hashlib.sha512(content).hexdigest(),
+    ]
+
+
+def test_signature_cache_does_not_read_data_files_missing_from_the_manifest(
+    tmp_path, signed_artifacts
+):
+    keys_file_path, artifacts = signed_artifacts
+    signature_file, data_file = artifacts["rsa"]
+    cache = SignatureResultCache(
+        VerificationCache(str(tmp_path / "signature-cache.json")), "native", keys_file_path
+    )
+
+    with patch("builtins.open", wraps=open) as mock_open:
+        assert cache.lookup(signature_file, data_file) is None
+    assert data_file not in [call.args[0] for call in mock_open.call_args_list]
+    stat = os.stat(data_file)
+    assert cache.pending[signature_file][0].split(":")[2] == "stat"
+    assert f":{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}:" in cache.pending[signature_file][0]
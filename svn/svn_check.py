@@ -19,6 +19,7 @@
 # requires-python = ">=3.11"
 # dependencies = [
 #     "rich",
+#     "requests",
 # ]
 # ///
 from __future__ import annotations
@@ -27,16 +28,21 @@ import json
 import os
 import re
 import sys
+from collections import Counter
+from collections.abc import Iterable
 from typing import Any
 
 from rich.console import Console
 
-console = Console(width=400, color_system="standard")
+from common.artifact_index import COMPANION_KINDS, ArtifactIndex
+from common.remote_listing import RemoteListingError, join_url, list_remote_files
 
-svn_files = os.listdir()
+console = Console(width=400, color_system="standard")
 
 unknown_files = []
 unknown_file_extensions = []
+empty_files = []
+missing_companions = []
 
 
 def check_with_regex(file_to_check: str, pattern: str, check_type: str) -> bool | None:
@@ -59,62 +65,400 @@ def check_with_regex(file_to_check: str, pattern: str, check_type: str) -> bool
     return None
 
 
+def accepts_match(file_to_check: str, matched: str | None, check_type: str) -> bool:
+    """
+    Check the part of the file name matched by an identifier, the same way as check_with_regex
+
+    :param file_to_check: file name
+    :param matched: the first group of the pattern, eg: "tar.gz" for ".*(tar.gz)$"
+    :param check_type: Type of check to perform, eg: extension, package_name
+    :return: bool
+    """
+    if matched is None:
+        return False
+    if check_type == "extension":
+        return file_to_check.endswith(matched)
+    elif check_type == "package_name":
+        return matched in file_to_check
+    return False
+
+
+# A pattern referring to its own groups can not be embedded in a merged pattern
+GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
+# Characters with a special meaning in a pattern, a pattern using them is not a list of suffixes
+SPECIAL_CHARACTERS = frozenset("\\.^$*+?{}[]|()")
+
+# Key of the suffix trie for the "." of a pattern, any character but a newline
+ANY_CHARACTER = None
+
+# Key of the suffix trie for the end of a suffix, its value is the index of the rule
+SUFFIX_END = ""
+
+
+def lower_to_suffixes(pattern: str) -> list[tuple[str | None, ...]] | None:
+    """
+    Suffixes matched by a pattern of alternatives anchored at the end, eg: ".*(tar.gz|whl)$"
+
+    :param pattern: pattern of a regex identifier
+    :return: the characters of every alternative, ANY_CHARACTER for ".", None when the pattern
+        is not a plain alternation of suffixes
+    """
+    if not (pattern.startswith(".*(") and pattern.endswith(")$")):
+        return None
+
+    suffixes = []
+    suffix: list[str | None] = []
+    characters = iter(pattern[3:-2])
+    for character in characters:
+        if character == "\\":
+            escaped = next(characters, None)
+            if escaped is None or (escaped.isascii() and escaped.isalnum()):
+                return None
+            suffix.append(escaped)
+        elif character == ".":
+            suffix.append(ANY_CHARACTER)
+        elif character == "|":
+            suffixes.append(tuple(suffix))
+            suffix = []
+        elif character in SPECIAL_CHARACTERS:
+            return None
+        else:
+            suffix.append(character)
+    suffixes.append(tuple(suffix))
+    return suffixes
+
+
+class SuffixState:
+    """
+    Nodes of the suffix trie reached by the same reversed end of a file name
+    """
+
+    __slots__ = ("nodes", "index", "transitions")
+
+    def __init__(self, nodes: list[dict[str | None, Any]]):
+        self.nodes = nodes
+        # Lowest index of the rules with a suffix ending at one of the nodes
+        self.index: int | None = min(
+            (node[SUFFIX_END] for node in nodes if SUFFIX_END in node), default=None
+        )
+        self.transitions: dict[str, SuffixState] = {}
+
+
+class SuffixTrie:
+    """
+    Suffixes of all the rules in a trie of their reversed characters, to find the suffixes of a
+    file name by walking the name backwards once, however many suffixes are configured.
+
+    A "." of a pattern may follow more than one branch of the trie, the sets of nodes reached
+    are turned into states on first use, so every character of a name costs one lookup.
+    """
+
+    __slots__ = ("root", "states", "start")
+
+    def __init__(self):
+        self.root: dict[str | None, Any] = {}
+        self.states: dict[tuple[int, ...], SuffixState] = {}
+        self.start: SuffixState | None = None
+
+    def add(self, suffix: Iterable[str | None], index: int):
+        node = self.root
+        for character in reversed(tuple(suffix)):
+            node = node.setdefault(character, {})
+        node[SUFFIX_END] = min(node.get(SUFFIX_END, index), index)
+        self.states.clear()
+        self.start = None
+
+    def state(self, nodes: list[dict[str | None, Any]]) -> SuffixState:
+        key = tuple(id(node) for node in nodes)
+        state = self.states.get(key)
+        if state is None:
+            state = self.states[key] = SuffixState(nodes)
+        return state
+
+    def step(self, state: SuffixState, character: str) -> SuffixState:
+        nodes = [
+            child
+            for node in state.nodes
+            for child in (
+                node.get(character),
+                node.get(ANY_CHARACTER) if character != "\n" else None,
+            )
+            if child is not None
+        ]
+        next_state = state.transitions[character] = self.state(nodes)
+        return next_state
+
+    def match(self, file_to_check: str) -> tuple[int, str] | None:
+        """
+        Lowest index of the rules with a suffix of the file, and its shortest suffix of the file
+        """
+        if self.start is None:
+            self.start = self.state([self.root])
+        state = self.start
+        best = None if state.index is None else (state.index, 0)
+        for depth, character in enumerate(reversed(file_to_check), 1):
+            state = state.transitions.get(character) or self.step(state, character)
+            if not state.nodes:
+                break
+            if state.index is not None and (best is None or state.index < best[0]):
+                best = (state.index, depth)
+        if best is None:
+            return None
+        index, depth = best
+        return index, file_to_check[len(file_to_check) - depth :]
+
+
+class Rule:
+    """
+    An identifier of the svn check, compiled once.
+
+    A suffix identifier and a regex identifier that only lists suffixes, eg: ".*(tar.gz|whl)$",
+    are matched with the suffix trie of the rule engine instead of a regular expression.
+    """
+
+    __slots__ = ("index", "type", "pattern", "regex", "suffixes", "group")
+
+    def __init__(self, index: int, identifier: dict[str, Any]):
+        self.index = index
+        self.type: str = identifier["type"]
+        self.pattern: str | None = identifier.get("pattern")
+        self.regex: re.Pattern | None = None
+        self.suffixes: list[tuple[str | None, ...]] | None
+        if self.type == "suffix":
+            self.suffixes = [tuple(suffix) for suffix in identifier["suffixes"]]
+        else:
+            self.suffixes = lower_to_suffixes(self.pattern)
+            if self.suffixes is None:
+                self.regex = re.compile(self.pattern)
+        # Number of the first group of the pattern in the merged pattern of the rule engine
+        self.group: int | None = None
+
+    def match(self, file_to_check: str) -> str | None:
+        """
+        Part of the file matched by the regular expression of the rule
+        """
+        match = self.regex.match(file_to_check)
+        if match is None:
+            return None
+        return match.group(1 if self.regex.groups else 0)
+
+    def __str__(self):
+        if self.pattern is None:
+            return f"{self.type} {'|'.join(''.join(suffix) for suffix in self.suffixes)}"
+        return f"{self.type} {self.pattern}"
+
+    def __repr__(self):
+        return f"Rule({self.index}, {self.type!r}, {str(self).partition(' ')[2]!r})"
+
+
+class RuleEngine:
+    """
+    The identifiers of a check compiled into a suffix trie and a single pattern, to classify
+    every file with one walk of its name and one match instead of one match per identifier.
+
+    The suffixes are looked up in a trie, whatever the number of suffixes. The other patterns
+    are merged into an alternation, tried in the order of the identifiers, every pattern in its
+    own group so the group of the last match tells which rule matched. When the patterns can not
+    be merged, eg: a pattern uses a backreference, they are tried one by one.
+    """
+
+    __slots__ = ("check_type", "rules", "regex_rules", "suffix_trie", "merged", "rule_of_group")
+
+    def __init__(self, identifiers: list[dict[str, Any]], check_type: str):
+        self.check_type = check_type
+        self.rules = {
+            index: Rule(index, identifier)
+            for index, identifier in enumerate(identifiers)
+            if identifier.get("type") in ("regex", "suffix")
+        }
+        self.regex_rules = [rule for rule in self.rules.values() if rule.regex is not None]
+
+        self.suffix_trie: SuffixTrie | None = None
+        for rule in self.rules.values():
+            if rule.suffixes is not None:
+                if self.suffix_trie is None:
+                    self.suffix_trie = SuffixTrie()
+                for suffix in rule.suffixes:
+                    self.suffix_trie.add(suffix, rule.index)
+
+        self.rule_of_group: dict[int, Rule] = {}
+        self.merged = self.merge()
+
+    def merge(self) -> re.Pattern | None:
+        if len(self.regex_rules) < 2 or any(
+            GROUP_REFERENCE.search(rule.pattern) for rule in self.regex_rules
+        ):
+            return None
+
+        parts = []
+        group = 0
+        for rule in self.regex_rules:
+            group += 1
+            self.rule_of_group[group] = rule
+            rule.group = group + 1 if rule.regex.groups else group
+            parts.append(f"({rule.pattern})")
+            group += rule.regex.groups
+        try:
+            return re.compile("|".join(parts))
+        except re.error:
+            # eg: global flags or group names used by more than one pattern
+            self.rule_of_group.clear()
+            return None
+
+    def classify(self, file_to_check: str) -> Rule | None:
+        """
+        First rule accepting the file, None when no rule accepts it
+        """
+        suffix_rule = None
+        if self.suffix_trie is not None:
+            match = self.suffix_trie.match(file_to_check)
+            if match is not None and accepts_match(file_to_check, match[1], self.check_type):
+                suffix_rule = self.rules[match[0]]
+
+        regex_rule = self.classify_with_regex(file_to_check)
+        if suffix_rule is None or (regex_rule is not None and regex_rule.index < suffix_rule.index):
+            return regex_rule
+        return suffix_rule
+
+    def classify_with_regex(self, file_to_check: str) -> Rule | None:
+        remaining = self.regex_rules
+        if self.merged is not None:
+            match = self.merged.match(file_to_check)
+            if match is None:
+                return None
+            rule = self.rule_of_group[match.lastindex]
+            if accepts_match(file_to_check, match.group(rule.group), self.check_type):
+                return rule
+            # The alternation stops at the first matching pattern, the next ones may accept the file
+            remaining = self.regex_rules[self.regex_rules.index(rule) + 1 :]
+
+        for rule in remaining:
+            if accepts_match(file_to_check, rule.match(file_to_check), self.check_type):
+                return rule
+        return None
+
+    def classify_all(self, files: Iterable[str]) -> dict[str, Rule | None]:
+        """
+        Rule accepting every file, in the order of the files
+        """
+        return {file: self.classify(file) for file in files}
+
+
 def check_files_with_identifiers(
     identifiers: list[dict[str, Any]], dist_svn_files: list[str], check_type: str
-):
+) -> dict[str, Rule]:
     """
     Check the files with the identifiers, an identifier can be a regex pattern to identify the file extension or package name
 
     :param identifiers: An array of identifiers to use for checking, eg: [{"type": "regex", "pattern": ".*(tar.gz)$"}]
+        or [{"type": "suffix", "suffixes": ["tar.gz", "tar.gz.asc"]}]
     :param dist_svn_files: List of files from the SVN directory
     :param check_type: Type of check to perform, eg: extension, package_name
-    :return: None
+    :return: the rule that matched every known file
     """
-
-    dist_svn_files_copy = dist_svn_files.copy()
-
-    for identifier in identifiers:
-        if identifier.get("type") == "regex":
-            regex_pattern = identifier.get("pattern")
-            [
-                dist_svn_files_copy.remove(file)
-                for file in dist_svn_files
-                if check_with_regex(file, regex_pattern, check_type)
-            ]
+    matched_rules = RuleEngine(identifiers, check_type).classify_all(dist_svn_files)
+    unknown = [file for file, rule in matched_rules.items() if rule is None]
 
     if check_type == "extension":
-        unknown_file_extensions.extend(dist_svn_files_copy)
+        unknown_file_extensions.extend(unknown)
 
     elif check_type == "package_name":
-        unknown_files.extend(dist_svn_files_copy)
+        unknown_files.extend(unknown)
 
+    return {file: rule for file, rule in matched_rules.items() if rule is not None}
 
-if __name__ == "__main__":
-    svn_check_config: list[dict[str, Any]] = json.loads(
-        os.environ.get("SVN_CHECK_CONFIG")
+
+def report_matched_rules(matched_rules: dict[str, Rule]):
+    """
+    Print the number of files matched by every rule
+    """
+    counts = Counter(matched_rules.values())
+    for rule, count in sorted(counts.items(), key=lambda item: item[0].index):
+        console.print(f"[blue]{count} files matched {rule}[/]")
+
+
+def list_remote_artifacts(repo_url: str, repo_path: str) -> list[str]:
+    """
+    List the files of the release directory from the remote listing, before anything is checked out
+
+    :param repo_url: url of the svn repo, eg: https://dist.apache.org/repos/dist/dev/airflow
+    :param repo_path: path of the release directory in the repo, eg: providers/
+    :return: names of the files
+    """
+    url = join_url(repo_url, repo_path)
+    remote_files = list_remote_files(url)
+    total_size = sum(remote_file.size or 0 for remote_file in remote_files)
+    console.print(
+        f"[blue]Pre-flight: {len(remote_files)} files, {total_size} bytes listed at {url}[/]"
     )
+    empty_files.extend(
+        remote_file.name for remote_file in remote_files if remote_file.size == 0
+    )
+    return [remote_file.name for remote_file in remote_files]
 
-    if not svn_check_config:
-        console.print(
-            "[red]Error:  SVN_CHECK_CONFIG not set[/]\n"
-            "You must set `SVN_CHECK_CONFIG` environment variable to run this script"
-        )
-        sys.exit(1)
 
-    if not svn_files:
-        console.print(
-            f"[red]Error: No files found in SVN directory at {os.environ.get('REPO_PATH')}[/]"
+def check_companions(artifact_index: ArtifactIndex, required_kinds: list[str]):
+    """
+    Check every data file has the required companion files
+
+    :param artifact_index: index of the files
+    :param required_kinds: kinds of the companions every data file must have, eg: ["asc", "sha512"]
+    :return: None
+    """
+    for file in artifact_index.data_files():
+        record = artifact_index.get(file)
+        missing_companions.extend(
+            f"{file}.{kind}" for kind in required_kinds if kind not in record.companions
         )
-        sys.exit(1)
 
+
+def run_svn_check(
+    svn_check_config: list[dict[str, Any]],
+    artifact_index: ArtifactIndex,
+    required_kinds: list[str] | None = None,
+    fail_on_orphaned_companions: bool = False,
+) -> bool:
+    """
+    Run the svn checks on the files of the release directory and report the errors
+
+    :param svn_check_config: list of svn checks from the release config
+    :param artifact_index: index of the files of the release directory
+    :param required_kinds: kinds of the companions every data file must have, eg: ["asc", "sha512"]
+    :param fail_on_orphaned_companions: fail on the companion files without their data file,
+        they are only reported as warnings by default
+    :return: True when all the checks passed
+    """
     for check in svn_check_config:
         console.print(f"[blue]{check.get('description')}[/]")
-        check_files_with_identifiers(
-            check.get("identifiers"), svn_files, check.get("id")
+        matched_rules = check_files_with_identifiers(
+            check.get("identifiers"), artifact_index.files, check.get("id")
         )
+        report_matched_rules(matched_rules)
 
     exit_code = 0
 
+    orphaned_companions = artifact_index.orphaned_companions()
+    if orphaned_companions:
+        for error in orphaned_companions:
+            if fail_on_orphaned_companions:
+                console.print(f"[red]Error: data file missing for companion file {error}[/]")
+            else:
+                console.print(f"[yellow]Warning: data file missing for companion file {error}[/]")
+        if fail_on_orphaned_companions:
+            exit_code = 1
+
+    check_companions(artifact_index, required_kinds or [])
+    if missing_companions:
+        for error in missing_companions:
+            console.print(f"[red]Error: companion file missing {error}[/]")
+        exit_code = 1
+
+    if empty_files:
+        for error in empty_files:
+            console.print(f"[red]Error: empty file found {error}[/]")
+        exit_code = 1
+
     if unknown_files:
         for error in unknown_files:
             console.print(f"[red]Error: unknown file found {error}[/]")
@@ -127,6 +471,66 @@ if __name__ == "__main__":
 
     if exit_code != 0:
         console.print("[red]SVN check failed[/]")
-        sys.exit(exit_code)
+        return False
 
     console.print("[blue]SVN check passed successfully[/]")
+    return True
+
+
+def required_companions() -> list[str]:
+    """
+    Kinds of the companions every data file must have, from REQUIRED_COMPANIONS eg: "asc,sha512"
+    """
+    return [
+        kind.strip()
+        for kind in os.environ.get("REQUIRED_COMPANIONS", "").split(",")
+        if kind.strip()
+    ]
+
+
+def fail_on_orphaned_companions() -> bool:
+    """
+    Whether the companion files without their data file fail the check, from
+    FAIL_ON_ORPHANED_COMPANIONS
+    """
+    return os.environ.get("FAIL_ON_ORPHANED_COMPANIONS", "false").lower() in ("true", "1", "yes")
+
+
+if __name__ == "__main__":
+    svn_check_config: list[dict[str, Any]] = json.loads(
+        os.environ.get("SVN_CHECK_CONFIG")
+    )
+
+    if not svn_check_config:
+        console.print(
+            "[red]Error:  SVN_CHECK_CONFIG not set[/]\n"
+            "You must set `SVN_CHECK_CONFIG` environment variable to run this script"
+        )
+        sys.exit(1)
+
+    required_kinds = required_companions()
+    # The pre-flight checks the remote listing of the release directory, before the checkout
+    if "--remote" in sys.argv:
+        try:
+            svn_files = list_remote_artifacts(
+                os.environ.get("REPO_URL", ""), os.environ.get("REPO_PATH", "")
+            )
+        except (RemoteListingError, OSError) as e:
+            console.print(f"[red]Error: {e}[/]")
+            sys.exit(1)
+        artifact_index = ArtifactIndex(svn_files, COMPANION_KINDS | set(required_kinds))
+    else:
+        artifact_index = ArtifactIndex.from_directory(
+            companion_kinds=COMPANION_KINDS | set(required_kinds)
+        )
+
+    if not artifact_index.files:
+        console.print(
+            f"[red]Error: No files found in SVN directory at {os.environ.get('REPO_PATH')}[/]"
+        )
+        sys.exit(1)
+
+    if not run_svn_check(
+        svn_check_config, artifact_index, required_kinds, fail_on_orphaned_companions()
+    ):
+        sys.exit(1)
@@ -15,11 +15,23 @@
 # specific language governing permissions and limitations
 # under the License.
 #
+from unittest.mock import patch
+
 import pytest
 
+from common.artifact_index import ArtifactIndex
+from common.remote_listing import RemoteFile
 from svn.svn_check import (
+    ANY_CHARACTER,
+    RuleEngine,
+    check_companions,
     check_files_with_identifiers,
     check_with_regex,
+    empty_files,
+    list_remote_artifacts,
+    lower_to_suffixes,
+    missing_companions,
+    run_svn_check,
     unknown_file_extensions,
     unknown_files,
 )
@@ -172,3 +184,217 @@ def test_check_files_with_multiple_identifiers_for_invalid_package_name():
     assert unknown_files == [
         "apache_air-2.10.3.tar.gz",
     ]
+
+
+def test_check_files_with_identifiers_reports_matched_rules():
+    unknown_files.clear()
+    all_files = [
+        "apache-airflow-2.10.3-source.tar.gz",
+        "apache_airflow-2.10.3.tar.gz",
+        "apache_air-2.10.3.tar.gz",
+    ]
+    identifiers = [
+        {"type": "regex", "pattern": ".*(apache-airflow.*)$"},
+        {"type": "regex", "pattern": ".*(apache_airflow.*)$"},
+    ]
+    matched_rules = check_files_with_identifiers(identifiers, all_files, "package_name")
+    assert {file: rule.index for file, rule in matched_rules.items()} == {
+        "apache-airflow-2.10.3-source.tar.gz": 0,
+        "apache_airflow-2.10.3.tar.gz": 1,
+    }
+    assert unknown_files == ["apache_air-2.10.3.tar.gz"]
+
+
+@pytest.mark.parametrize(
+    "patterns, merged",
+    [
+        pytest.param([".+(tar.gz)$", ".+(whl)$", ".+(sha512)$"], True, id="merged"),
+        pytest.param([".+(tar.gz)$"], False, id="single"),
+        pytest.param([r"(\w)\1.*(tar.gz)$", ".+(whl)$"], False, id="backreference"),
+        pytest.param(["(?i).*(tar.gz)$", ".+(whl)$"], False, id="global_flags"),
+        pytest.param([".*(?P<ext>tar.gz)$", ".*(?P<ext>whl)$"], False, id="duplicate_names"),
+        pytest.param([".*(tar.gz|whl)$", ".+(sha512)$"], False, id="suffixes_and_regex"),
+    ],
+)
+def test_rule_engine_agrees_with_check_with_regex(patterns, merged):
+    files = [
+        "aa-2.10.3.tar.gz",
+        "apache-airflow-2.10.3-py3-none-any.whl",
+        "apache-airflow-2.10.3.tar.gz.sha512",
+        "apache-airflow-2.10.3.tar.jpeg",
+    ]
+    engine = RuleEngine(
+        [{"type": "regex", "pattern": pattern} for pattern in patterns], "extension"
+    )
+    assert (engine.merged is not None) == merged
+    for file in files:
+        rule = engine.classify(file)
+        expected = next(
+            (
+                index
+                for index, pattern in enumerate(patterns)
+                if check_with_regex(file, pattern, "extension")
+            ),
+            None,
+        )
+        assert (rule and rule.index) == expected
+
+
+def test_rule_engine_tries_next_rules_when_match_is_rejected():
+    # The first pattern matches the file but its group is not the extension of the file
+    engine = RuleEngine(
+        [
+            {"type": "regex", "pattern": ".*(tar)"},
+            {"type": "regex", "pattern": ".+(gz)$"},
+        ],
+        "extension",
+    )
+    assert engine.merged is not None
+    assert engine.classify("apache-airflow-2.10.3.tar.gz").index == 1
+    assert engine.classify("apache-airflow-2.10.3.tar").index == 0
+    assert engine.classify("apache-airflow-2.10.3.zip") is None
+
+
+@pytest.mark.parametrize(
+    "pattern, suffixes",
+    [
+        pytest.param(
+            ".*(tar.gz|whl)$",
+            [("t", "a", "r", ANY_CHARACTER, "g", "z"), ("w", "h", "l")],
+            id="alternatives",
+        ),
+        pytest.param(r".*(tar\.gz)$", [tuple("tar.gz")], id="escaped_dot"),
+        pytest.param(".*(apache_airflow.*)$", None, id="repeat"),
+        pytest.param(".*(tar.gz)", None, id="not_anchored"),
+        pytest.param(r".*(\d.whl)$", None, id="character_class"),
+        pytest.param("apache.*(tar.gz)$", None, id="prefix"),
+    ],
+)
+def test_lower_to_suffixes(pattern, suffixes):
+    assert lower_to_suffixes(pattern) == suffixes
+
+
+@pytest.mark.parametrize(
+    "files",
+    [
+        pytest.param(
+            [
+                "apache-airflow-2.10.3-source.tar.gz",
+                "apache-airflow-2.10.3-py3-none-any.whl.asc",
+                "apache-airflow-2.10.3-py3-none-any.whl.sha512",
+                "apache-airflow-2.10.3.tar.gz",
+            ],
+            id="valid",
+        ),
+        pytest.param(
+            [
+                "apache-airflow-2.10.3-source.tar.gz",
+                "apache-airflow-2.10.3-py3-none-any.whl.asc123",
+                "apache-airflow-2.10.3-py3-none-any.whl.sha512",
+                "apache-airflow-2.10.3.tar.jpeg",
+                "apache-airflow-2.10.3.tar_gz",
+                "tar.gz",
+                "",
+            ],
+            id="invalid",
+        ),
+    ],
+)
+def test_suffix_trie_agrees_with_check_with_regex(files):
+    pattern = ".*(py3-none-any.whl|tar.gz.sha512|tar.gz.asc|tar.gz|py3-none-any.whl.asc|py3-none-any.whl.sha512)$"
+    engine = RuleEngine([{"type": "regex", "pattern": pattern}], "extension")
+    assert engine.suffix_trie is not None and not engine.regex_rules
+    assert [file for file in files if engine.classify(file) is None] == [
+        file for file in files if not check_with_regex(file, pattern, "extension")
+    ]
+
+
+def test_check_files_with_suffix_identifiers():
+    unknown_file_extensions.clear()
+    all_files = [
+        "apache-airflow-2.10.3-source.tar.gz",
+        "apache-airflow-2.10.3-py3-none-any.whl.asc",
+        "apache-airflow-2.10.3.tar_gz",
+        "apache-airflow-2.10.3.zip",
+    ]
+    identifiers = [
+        {"type": "suffix", "suffixes": ["tar.gz", "tar.gz.asc"]},
+        {"type": "regex", "pattern": ".+(zip)$"},
+        {"type": "suffix", "suffixes": ["gz", "py3-none-any.whl.asc"]},
+    ]
+    matched_rules = check_files_with_identifiers(identifiers, all_files, "extension")
+    # A suffix is matched literally, the first identifier accepting a file is reported
+    assert {file: rule.index for file, rule in matched_rules.items()} == {
+        "apache-airflow-2.10.3-source.tar.gz": 0,
+        "apache-airflow-2.10.3-py3-none-any.whl.asc": 2,
+        "apache-airflow-2.10.3.tar_gz": 2,
+        "apache-airflow-2.10.3.zip": 1,
+    }
+    assert not unknown_file_extensions
+
+
+@patch("svn.svn_check.list_remote_files")
+def test_list_remote_artifacts(mock_list_remote_files):
+    empty_files.clear()
+    mock_list_remote_files.return_value = [
+        RemoteFile("apache_airflow-2.10.4.tar.gz", 1024),
+        RemoteFile("apache_airflow-2.10.4.tar.gz.asc", 0),
+        RemoteFile("apache_airflow-2.10.4.tar.gz.sha512"),
+    ]
+
+    with patch("svn.svn_check.console"):
+        files = list_remote_artifacts("https://dist.apache.org/repos/dist/dev/airflow", "providers/")
+
+    mock_list_remote_files.assert_called_once_with(
+        "https://dist.apache.org/repos/dist/dev/airflow/providers/"
+    )
+    assert files == [
+        "apache_airflow-2.10.4.tar.gz",
+        "apache_airflow-2.10.4.tar.gz.asc",
+        "apache_airflow-2.10.4.tar.gz.sha512",
+    ]
+    # A size missing from the listing is not an empty file
+    assert empty_files == ["apache_airflow-2.10.4.tar.gz.asc"]
+
+
+def test_check_companions():
+    missing_companions.clear()
+    artifact_index = ArtifactIndex(
+        [
+            "apache_airflow-2.10.4.tar.gz",
+            "apache_airflow-2.10.4.tar.gz.asc",
+            "apache_airflow-2.10.4.tar.gz.sha512",
+            "apache_airflow-2.10.4-py3-none-any.whl",
+            "apache_airflow-2.10.4-py3-none-any.whl.asc",
+        ]
+    )
+    check_companions(artifact_index, ["asc", "sha512"])
+    assert missing_companions == ["apache_airflow-2.10.4-py3-none-any.whl.sha512"]
+
+
+@pytest.mark.parametrize("fail_on_orphaned_companions", [False, True])
+def test_run_svn_check_reports_orphaned_companions(fail_on_orphaned_companions):
+    for results in (empty_files, missing_companions, unknown_files, unknown_file_extensions):
+        results.clear()
+    artifact_index = ArtifactIndex(
+        ["apache_airflow-2.10.4.tar.gz", "apache_airflow-2.10.3.tar.gz.asc"]
+    )
+    config = [
+        {
+            "id": "extension",
+            "description": "Check the extensions",
+            "identifiers": [{"type": "regex", "pattern": r".*(tar.gz|tar.gz.asc)$"}],
+        }
+    ]
+
+    with patch("svn.svn_check.console") as mock_console:
+        passed = run_svn_check(
+            config, artifact_index, fail_on_orphaned_companions=fail_on_orphaned_companions
+        )
+
+    assert passed is not fail_on_orphaned_companions
+    level = "[red]Error" if fail_on_orphaned_companions else "[yellow]Warning"
+    assert (
+        f"{level}: data file missing for companion file apache_airflow-2.10.3.tar.gz.asc[/]"
+        in [call.args[0] for call in mock_console.print.call_args_list]
+    )